@@ -0,0 +1,81 @@
+"""
+Memory benchmark for idle games.
+
+    python -m benchmarks.bench_game_memory --games 100000 1000000
+
+For each size a fresh process fills an InMemoryGameStore with idle games
+(half still waiting for an opponent, half a few moves in) and reports the
+Python heap cost per game (tracemalloc) and the process RSS.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import resource
+import tracemalloc
+
+from src.games.store import InMemoryGameStore
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def fill(store, games: int, seed: int = 1) -> None:
+    rng = random.Random(seed)
+    for n in range(games):
+        chat_id = -(1_000_000_000 + n)
+        game = store.create(chat_id, 100_000_000 + n, f"player{n}")
+        if n % 2:
+            store.join(game, 200_000_000 + n, f"rival{n}")
+            for _ in range(rng.randint(0, 4)):
+                store.play(game, game.current_player_id(), rng.choice(game.board.empty_cells()))
+
+
+def measure(games: int, trace: bool) -> dict:
+    gc.collect()
+    before_rss = rss_bytes()
+    if trace:
+        tracemalloc.start()
+    store = InMemoryGameStore()
+    fill(store, games)
+    gc.collect()
+    result = {"games": len(store), "rss": rss_bytes(), "rss_delta": rss_bytes() - before_rss}
+    if trace:
+        result["heap"], _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result
+
+
+def _child(games: int, trace: bool, results) -> None:
+    results.put(measure(games, trace))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--no-trace", action="store_true", help="skip tracemalloc (faster for large sizes)")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    for games in args.games:
+        results = context.Queue()
+        process = context.Process(target=_child, args=(games, not args.no_trace, results))
+        process.start()
+        result = results.get()
+        process.join()
+        line = (f"{games:>9,} games: RSS {result['rss'] / 2**20:7.1f} MiB "
+                f"(+{result['rss_delta'] / games:5.0f} B/game)")
+        if "heap" in result:
+            line += f", heap {result['heap'] / games:5.0f} B/game"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
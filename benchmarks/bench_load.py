@@ -0,0 +1,150 @@
+"""
+End-to-end load test against a local stand-in for the Bot API.
+
+    python -m benchmarks.bench_load --chats 2000
+    python -m benchmarks.bench_load --chats 2000 --latency-ms 40 --jitter-ms 40 --rate-limit 0.01
+    python -m benchmarks.bench_load --chats 1000 --json load-history.jsonl
+    python -m benchmarks.bench_load --chats 20 --spectators 1000
+
+Builds the real Application (handlers, per-chat sequencer, outbound queue)
+on an OfflineRequest that answers every Bot API call locally, with optional
+latency and 429s. Each simulated chat plays one game start to finish:
+/start, X opens the WebApp, O joins, then the players alternate legal
+moves. Half the chats play with the inline board (join and cell buttons,
+select-then-move clicks), half through the WebApp. Chats run concurrently
+and closed-loop: a player sends its next update once the previous one has
+been handled.
+
+Latency is measured per update from decoding it to the end of its handler,
+awaited Bot API calls included. Players read game id and version straight
+from the store instead of waiting for the (rate-limited) board edit, so the
+numbers measure the bot rather than Telegram's edit limits.
+
+--spectators N has N more users /watch every game once O has joined, so
+move latency can be compared with and without a crowd.
+
+--json appends one result line per run, tagged with the git commit, so runs
+can be compared across commits.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import statistics
+import subprocess
+import time
+from typing import List, Optional
+
+from src.bot.application import create_application, drain_updates
+from src.cluster.fake import LoadHarness, OfflineRequest
+from src.config.settings import CONCURRENT_UPDATES
+from src.utils.logger import logger
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    request = OfflineRequest(
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+        rate_limit=args.rate_limit, seed=args.seed
+    )
+    application = create_application(request, updater=False, concurrent_updates=args.concurrent_updates)
+    application.bot_data["metrics_port"] = args.metrics_port
+    harness = LoadHarness(application, args.max_moves, args.think_ms / 1000, seed=args.seed,
+                          spectators=args.spectators)
+
+    await application.initialize()
+    try:
+        await application.post_init(application)
+        await application.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(harness.play_chat(n, buttons=n % 2 == 0) for n in range(args.chats)))
+        elapsed = time.perf_counter() - started
+        await drain_updates(application)
+        outbox = application.bot_data["outbox"].stats()
+        broadcasts = application.bot_data["broadcaster"].stats()
+    finally:
+        if application.running:
+            await application.stop()
+        await application.post_stop(application)
+        await application.shutdown()
+        await application.post_shutdown(application)
+
+    every = sorted(itertools.chain.from_iterable(harness.latencies.values()))
+    return {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "chats": args.chats,
+        "spectators": args.spectators,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "rate_limit": args.rate_limit,
+        "updates": len(every),
+        "seconds": round(elapsed, 3),
+        "updates_per_s": round(len(every) / elapsed, 1),
+        "p50_ms": round(statistics.median(every) * 1000, 3) if every else None,
+        "p99_ms": round(percentile(every, 0.99) * 1000, 3) if every else None,
+        "by_kind": {
+            kind: {"count": len(values),
+                   "p50_ms": round(statistics.median(values) * 1000, 3),
+                   "p99_ms": round(percentile(sorted(values), 0.99) * 1000, 3)}
+            for kind, values in sorted(harness.latencies.items())
+        },
+        "timeouts": harness.timeouts,
+        "games_finished": harness.finished,
+        "api_calls": dict(sorted(request.calls.items())),
+        "api_429s": request.limited,
+        "outbox": {key: outbox[key] for key in ("sent", "coalesced", "dropped", "retried", "failed")},
+        "spectator_broadcasts": broadcasts["broadcasts"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--max-moves", type=int, default=40, help="moves per game before giving up on a win")
+    parser.add_argument("--spectators", type=int, default=0, help="users watching each game")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a player's moves")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Bot API call latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra latency per call, up to")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of sends answered with 429")
+    parser.add_argument("--concurrent-updates", type=int, default=CONCURRENT_UPDATES)
+    parser.add_argument("--metrics-port", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="append the result as one JSON line")
+    parser.add_argument("--verbose", action="store_true", help="keep INFO logging on (default: errors only)")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.ERROR)
+    result = asyncio.run(run(args))
+
+    print(f"{result['updates']} updates from {args.chats} chats in {result['seconds']:.2f}s: "
+          f"{result['updates_per_s']:.0f} updates/s")
+    print(f"latency p50 {result['p50_ms']:.2f} ms   p99 {result['p99_ms']:.2f} ms")
+    for kind, stats in result["by_kind"].items():
+        print(f"  {kind:<7} {stats['count']:>7}   p50 {stats['p50_ms']:8.2f} ms   p99 {stats['p99_ms']:8.2f} ms")
+    print(f"games finished {result['games_finished']}, timeouts {result['timeouts']}, "
+          f"429s {result['api_429s']}")
+    print(f"api calls {result['api_calls']}")
+    print(f"outbox {result['outbox']}")
+    if args.spectators:
+        print(f"spectator broadcasts {result['spectator_broadcasts']}")
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Logging overhead benchmark.
+
+    python -m benchmarks.bench_logging --calls 50000
+
+Runs a click-sized handler (callback parse, keyboard lookup, one INFO
+record) on the event loop and reports p50/p99 latency for:
+
+  none      logging disabled
+  sync      the previous setup: FileHandler + console, f-string message
+  queue     queue + writer thread, JSON records, lazy formatting
+  sampled   queue as above, keeping 1 in 10 click records
+
+Console output goes to /dev/null so only the logging work is measured.
+--stall-every/--stall-ms make every Nth file write block, as a disk under
+writeback pressure does; that is where writing on the event loop hurts.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from src.bot.keyboards.game_keyboard import create_keyboard_with_highlight, parse_cell_data
+from src.games.logic.bitboard import Bitboard
+from src.utils import logger as log_module
+from src.utils.logger import setup_logger
+
+
+def add_stalls(handler: logging.Handler, every: int, seconds: float) -> None:
+    """Make every Nth emit on handler block for seconds."""
+    emit = handler.emit
+    count = itertools.count(1)
+
+    def stalling_emit(record):
+        emit(record)
+        if next(count) % every == 0:
+            time.sleep(seconds)
+    handler.emit = stalling_emit
+
+
+def file_handlers(logger: logging.Logger) -> list:
+    listener = log_module._listeners.get(logger.name)
+    handlers = listener.handlers if listener is not None else logger.handlers
+    return [handler for handler in handlers if isinstance(handler, logging.FileHandler)]
+
+
+def sync_logger(path: str, devnull) -> logging.Logger:
+    logger = logging.getLogger("bench.sync")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    file_handler = logging.FileHandler(path, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    console_handler = logging.StreamHandler(devnull)
+    console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
+    return logger
+
+
+def queue_logger(name: str, path: str, sample: str, devnull) -> logging.Logger:
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        return setup_logger(name, path, json_records=True, sample=sample)
+    finally:
+        sys.stdout = stdout
+
+
+async def run(logger: logging.Logger, calls: int, lazy: bool) -> list:
+    board = Bitboard(0b0000_0000_0010_0001, 0b0000_0100_0000_0000)
+    latencies = []
+    for n in range(calls):
+        data = f"1a15040258200.{n % 30:x}.{n % 16:x}"
+        started = time.perf_counter()
+        game_id, version, cell = parse_cell_data(data)
+        create_keyboard_with_highlight(board, divmod(cell, 4), None, game_id=game_id, version=version)
+        user_id = 10_000_000 + n % 500
+        if lazy:
+            logger.info("Received button click from user %s with data: %s", user_id, data,
+                        extra={"event": "click", "chat_id": -1, "user_id": user_id})
+        else:
+            logger.info(f"Received button click from user {user_id} with data: {data}")
+        latencies.append(time.perf_counter() - started)
+        if n % 32 == 0:
+            await asyncio.sleep(0)  # let the writer thread run, as between updates
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50_000)
+    parser.add_argument("--stall-every", type=int, default=0, help="block every Nth file write (0: never)")
+    parser.add_argument("--stall-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-logging-")
+    devnull = open(os.devnull, "w")
+    none = logging.getLogger("bench.none")
+    none.disabled = True
+    setups = [
+        ("none", none, True),
+        ("sync", sync_logger(os.path.join(directory, "sync.log"), devnull), False),
+        ("queue", queue_logger("bench.queue", os.path.join(directory, "queue.log"), "", devnull), True),
+        ("sampled", queue_logger("bench.sampled", os.path.join(directory, "sampled.log"), "click=10", devnull), True),
+    ]
+    for name, logger, lazy in setups:
+        if args.stall_every:
+            for handler in file_handlers(logger):
+                add_stalls(handler, args.stall_every, args.stall_ms / 1000)
+        latencies = sorted(asyncio.run(run(logger, args.calls, lazy)))
+        p50 = statistics.median(latencies) * 1e6
+        p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+        dropped = sum(getattr(handler, "dropped", 0) for handler in logger.handlers)
+        print(f"{name:<8} p50 {p50:7.1f} µs   p99 {p99:7.1f} µs   max {latencies[-1] * 1e6:9.1f} µs"
+              + (f"   ({dropped} records dropped)" if dropped else ""))
+    print(f"log files in {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Matchmaker throughput with a large queue.
+
+    python -m benchmarks.bench_matchmaking --players 50000
+    python -m benchmarks.bench_matchmaking --players 50000 --spread 10000000   # nobody matches: a big queue
+
+Runs the Matchmaker on a simulated clock: players arrive at
+--arrivals-per-s with normally distributed ratings, a --cancel fraction
+leave again, and a match pass runs every MATCH_INTERVAL of simulated time.
+Reports the cost of enqueue and cancel per call, the cost of each pass
+(p50/p99/max), queue size, and how long matched players waited.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from src.config.settings import (
+    DEFAULT_RATING, MATCH_BASE_WINDOW, MATCH_INTERVAL, MATCH_MAX_WINDOW, MATCH_WIDEN_SECONDS, MATCH_WINDOW_STEP
+)
+from src.games.matchmaking import Matchmaker
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(args) -> dict:
+    rng = random.Random(args.seed)
+    clock = SimulatedClock()
+    matchmaker = Matchmaker(MATCH_BASE_WINDOW, MATCH_WINDOW_STEP, MATCH_MAX_WINDOW, MATCH_WIDEN_SECONDS,
+                            clock=clock)
+    gap = 1.0 / args.arrivals_per_s
+    enqueue_seconds = cancel_seconds = 0.0
+    cancels = 0
+    passes, waits, queued = [], [], []
+    next_pass = MATCH_INTERVAL
+    for user_id in range(args.players):
+        clock.now = user_id * gap
+        while next_pass <= clock.now:
+            started = time.perf_counter()
+            matches = matchmaker.match_pass(next_pass)
+            passes.append(time.perf_counter() - started)
+            waits.extend(wait for match in matches for wait in match.waits())
+            queued.append(len(matchmaker))
+            next_pass += MATCH_INTERVAL
+        rating = rng.gauss(DEFAULT_RATING, args.spread)
+        started = time.perf_counter()
+        match = matchmaker.enqueue(user_id, user_id, "", rating)
+        enqueue_seconds += time.perf_counter() - started
+        if match is not None:
+            waits.extend(match.waits())
+        if user_id and rng.random() < args.cancel:
+            started = time.perf_counter()
+            matchmaker.cancel(rng.randrange(user_id))
+            cancel_seconds += time.perf_counter() - started
+            cancels += 1
+
+    return {
+        "players": args.players,
+        "enqueue_us": enqueue_seconds / args.players * 1e6,
+        "cancel_us": cancel_seconds / max(cancels, 1) * 1e6,
+        "passes": len(passes),
+        "pass_p50_ms": statistics.median(passes) * 1000 if passes else 0.0,
+        "pass_p99_ms": percentile(passes, 0.99) * 1000 if passes else 0.0,
+        "pass_max_ms": max(passes) * 1000 if passes else 0.0,
+        "queued_max": max(queued, default=0),
+        "queued_end": len(matchmaker),
+        "matched": matchmaker.matched * 2,
+        "wait_p50_s": statistics.median(waits) if waits else 0.0,
+        "wait_p99_s": percentile(waits, 0.99) if waits else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=50_000)
+    parser.add_argument("--arrivals-per-s", type=float, default=1000.0)
+    parser.add_argument("--spread", type=float, default=400.0, help="standard deviation of ratings")
+    parser.add_argument("--cancel", type=float, default=0.05, help="chance each arrival is followed by a /leave")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(f"{result['players']} players, {result['matched']} matched, "
+          f"queue max {result['queued_max']}, left waiting {result['queued_end']}")
+    print(f"enqueue {result['enqueue_us']:.2f} us   cancel {result['cancel_us']:.2f} us")
+    print(f"{result['passes']} passes: p50 {result['pass_p50_ms']:.3f} ms   "
+          f"p99 {result['pass_p99_ms']:.3f} ms   max {result['pass_max_ms']:.3f} ms")
+    print(f"wait p50 {result['wait_p50_s']:.1f} s   p99 {result['wait_p99_s']:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
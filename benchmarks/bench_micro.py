@@ -0,0 +1,280 @@
+"""
+Microbenchmarks for the per-update hot functions, with regression checks.
+
+    python -m benchmarks.bench_micro --save        # record a baseline
+    python -m benchmarks.bench_micro               # compare against it
+    python -m benchmarks.bench_micro --threshold 5 --only keyboard_render,state_json
+
+Every benchmark runs over the same corpus of positions taken from
+self-play: the engine plays both sides at a shallow depth, with some random
+moves mixed in so the corpus covers more than one line of play. Each is
+timed for several rounds and the fastest round is kept, as ns per call.
+
+Shared and frequency-scaled CPUs make raw timings drift by tens of percent
+between runs, so each round also times a fixed pure-Python reference loop,
+and benchmarks are compared by their cost relative to it. A run is
+compared with the baseline JSON (--baseline); a benchmark that looks
+relatively slower by more than --threshold percent is measured again
+(--confirm times) and the run exits with status 1 only if it stays slower.
+--save stores the median of 1 + --confirm measurements, so one lucky fast
+run does not become the bar.
+Baselines are only comparable on the same Python version.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from benchmarks.bench_load import git_commit
+from src.bot.keyboards.game_keyboard import create_keyboard_with_highlight, keyboard_cache
+from src.games.logic.ai import Searcher, TranspositionTable
+from src.games.logic.game_logic import check_winner, find_winning_pattern, get_valid_moves, is_board_full
+from src.games.models.game_state import GameState
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "micro_baseline.json")
+
+
+class Position(NamedTuple):
+    """A position from self-play and the move that was played in it."""
+    x: int
+    o: int
+    player: str
+    phase: str
+    placed_x: int
+    placed_o: int
+    version: int
+    position: int
+    selected: Optional[int]
+
+
+def self_play_corpus(games: int, seed: int = 1, randomness: float = 0.3, depth: int = 2) -> List[Position]:
+    """Positions (with the move made) from games the engine plays against itself."""
+    rng = random.Random(seed)
+    searcher = Searcher(TranspositionTable(1 << 16))
+    corpus = []
+    for _ in range(games):
+        game = GameState(0)
+        game.player_x, game.player_o = 1, 2
+        game.phase = "placement"
+        for _ in range(40):
+            board = game.board
+            player = game.current_player
+            if rng.random() < randomness:
+                position = rng.choice(board.empty_cells())
+                selected = None
+                if game.phase == "movement":
+                    selected = rng.choice([cell for cell in range(16) if board.owns(player, cell)])
+            else:
+                mover, other = (board.x, board.o) if player == "X" else (board.o, board.x)
+                result = searcher.search(mover, other, budget_ms=1000, max_depth=depth)
+                position, selected = result.dst, result.src
+            corpus.append(Position(board.x, board.o, player, game.phase, game.placed_x, game.placed_o,
+                                   game.version, position, selected))
+            game.handle_webapp_move(game.current_player_id(), position, selected)
+            if game.winner:
+                break
+            game.advance_turn()
+    return corpus
+
+
+def to_game(p: Position) -> GameState:
+    return GameState.restore(-1, p.x, p.o, p.player, p.phase, 1, 2, "Alice", "Bob",
+                             p.placed_x, p.placed_o, version=p.version, game_id=0x1A2B3C)
+
+
+def build_suite(corpus: List[Position]) -> Dict[str, Tuple[Callable[[], None], int]]:
+    """
+    name -> (run, calls): run() makes one pass over the corpus, calling
+    the benchmarked function calls times.
+    """
+    games = [to_game(p) for p in corpus]
+    boards = [game.board for game in games]
+    moves = [(1 if p.player == "X" else 2, p.position, p.selected) for p in corpus]
+    highlights = [None if p.selected is None else divmod(p.selected, 4) for p in corpus]
+    n = len(corpus)
+
+    def over_boards(function):
+        def run():
+            for board in boards:
+                function(board)
+        return run
+
+    def handle_move():
+        # Moves change the game, so each pass plays on fresh copies and
+        # times only the moves
+        fresh = [to_game(p) for p in corpus]
+        started = time.perf_counter()
+        for game, (user_id, position, selected) in zip(fresh, moves):
+            game.handle_webapp_move(user_id, position, selected)
+        return time.perf_counter() - started
+
+    def state_json(packed):
+        def run():
+            for game in games:
+                json.dumps({"type": "gameUpdate", "version": game.version, "state": game.to_dict(packed)},
+                           separators=(",", ":"))
+        return run
+
+    def keyboard(cached):
+        def run():
+            if not cached:
+                keyboard_cache.clear()
+            for game, highlight in zip(games, highlights):
+                create_keyboard_with_highlight(game.board, highlight, None, game_id=game.game_id, version=game.version)
+        return run
+
+    return {
+        "find_winning_pattern": (over_boards(find_winning_pattern), n),
+        "check_winner": (over_boards(check_winner), n),
+        "is_board_full": (over_boards(is_board_full), n),
+        "get_valid_moves": (over_boards(get_valid_moves), n),
+        "handle_webapp_move": (handle_move, n),
+        "state_json": (state_json(False), n),
+        "state_json_packed": (state_json(True), n),
+        "keyboard_render": (keyboard(False), n),
+        "keyboard_cached": (keyboard(True), n),
+    }
+
+
+def reference(iterations: int = 20_000) -> None:
+    """Fixed interpreter workload the benchmarks are measured against."""
+    table = {}
+    total = 0
+    for i in range(iterations):
+        table[i & 255] = i
+        total += table[i & 255] >> 1
+
+
+def _timed(run: Callable, loops: int) -> float:
+    """Seconds for loops passes of run; run may return its own timing."""
+    total = 0.0
+    for _ in range(loops):
+        started = time.perf_counter()
+        timed = run()
+        total += timed if timed is not None else time.perf_counter() - started
+    return total
+
+
+def _loops_for(run: Callable, round_seconds: float) -> int:
+    once = _timed(run, 1)
+    return max(1, round(round_seconds / max(once, 1e-6)))
+
+
+def measure(run: Callable, calls: int, rounds: int, round_seconds: float = 0.05) -> Tuple[float, float]:
+    """
+    Time rounds of run, each next to an equally long round of reference().
+
+    Returns:
+        (fastest ns per call, fastest round / fastest reference round)
+    """
+    run()  # warm up caches and the keyboard cache for keyboard_cached
+    loops = _loops_for(run, round_seconds)
+    reference_loops = _loops_for(reference, round_seconds)
+    best = best_reference = float("inf")
+    # As timeit does: collections would land in whichever round allocated last
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            best_reference = min(best_reference, _timed(reference, reference_loops) / reference_loops)
+            best = min(best, _timed(run, loops) / loops)
+    finally:
+        gc.enable()
+    return best / calls * 1e9, best / best_reference
+
+
+def change(result: dict, before: Optional[dict]) -> Optional[float]:
+    """Percent change in relative cost from before, if there is a before."""
+    if not before:
+        return None
+    return (result["relative"] - before["relative"]) / before["relative"] * 100
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Names of benchmarks more than threshold percent slower than baseline."""
+    return [
+        name for name, result in results.items()
+        if (change(result, baseline.get(name)) or 0.0) > threshold
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200, help="self-play games in the corpus")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed slowdown, percent (raise on busy shared machines)")
+    parser.add_argument("--confirm", type=int, default=2, help="re-measurements before reporting a regression")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    corpus = self_play_corpus(args.games, args.seed)
+    suite = build_suite(corpus)
+    if args.only:
+        names = args.only.split(",")
+        unknown = set(names) - set(suite)
+        if unknown:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+        suite = {name: suite[name] for name in names}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print(f"corpus: {len(corpus)} positions from {args.games} self-play games")
+    for name, (run, calls) in suite.items():
+        if args.save:
+            samples = sorted((measure(run, calls, args.rounds) for _ in range(args.confirm + 1)),
+                             key=lambda sample: sample[1])
+            ns, relative = samples[len(samples) // 2]
+        else:
+            ns, relative = measure(run, calls, args.rounds)
+        result = results[name] = {"ns_per_call": round(ns, 1), "relative": round(relative, 5)}
+        percent = None if args.save else change(result, baseline.get(name))
+        print(f"{name:<22} {ns:10.1f} ns/call  {relative:9.4f} x ref"
+              + (f"  {percent:+7.1f}%" if percent is not None else ""))
+    if "handle_webapp_move" in results:
+        print("(handle_webapp_move excludes building the fresh game copies it plays on)")
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "corpus": {"games": args.games, "seed": args.seed, "positions": len(corpus)},
+                # --only replaces just the benchmarks it ran
+                "results": {**baseline, **results},
+            }, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    regressed = compare(results, baseline, args.threshold)
+    for _ in range(args.confirm):
+        if not regressed:
+            break
+        for name in regressed:
+            run, calls = suite[name]
+            ns, relative = measure(run, calls, args.rounds)
+            if relative < results[name]["relative"]:
+                results[name] = {"ns_per_call": round(ns, 1), "relative": round(relative, 5)}
+            print(f"{name:<22} {ns:10.1f} ns/call  {relative:9.4f} x ref  "
+                  f"{change(results[name], baseline[name]):+7.1f}% (best of retries)")
+        regressed = compare(results, baseline, args.threshold)
+    if regressed:
+        print(f"slower than baseline by more than {args.threshold:g}%: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Replay archive at scale: append, lookups, scans and batch analysis.
+
+    python -m benchmarks.bench_replays
+    python -m benchmarks.bench_replays --games 1000000 --players 50000 --workers 4 --dir /tmp/replay-bench
+
+Archives --games synthetic games (random legal moves between random
+players, a few seconds apart) through a ReplayWriter, then measures
+looking up one player's games through the user index, reading a time
+window, a full sequential scan, and the opening and engine-agreement
+analyses with one process and with --workers.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import time
+from typing import Iterator
+
+from src.games.logic.ai import apply_move, generate_moves
+from src.games.logic.bitboard import winning_mask_through
+from src.games.replays import Replay, ReplayArchive, ReplayWriter
+from src.games.replays.analysis import EngineAgreement, OpeningStats, analyze
+from src.games.store.codec import encode_move
+
+START = 1_700_000_000
+
+
+def synthetic_replays(games: int, players: int, seed: int, max_moves: int = 40) -> Iterator[Replay]:
+    rng = random.Random(seed)
+    for number in range(games):
+        x = o = 0
+        moves = bytearray()
+        winner = None
+        for ply in range(max_moves):
+            mover, other = (x, o) if ply % 2 == 0 else (o, x)
+            src, dst = rng.choice(generate_moves(mover, other))
+            moved = apply_move(mover, (src, dst))
+            moves.append(encode_move(dst, src))
+            if ply % 2 == 0:
+                x = moved
+            else:
+                o = moved
+            if winning_mask_through(moved, dst) is not None:
+                winner = "X" if ply % 2 == 0 else "O"
+                break
+        x_id = rng.randrange(players)
+        o_id = (x_id + 1 + rng.randrange(players - 1)) % players
+        ended = START + number * 3
+        yield Replay(number, x_id // 10, x_id, o_id, ended - 60, ended, winner, winner is None, False, bytes(moves))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200_000)
+    parser.add_argument("--players", type=int, default=20_000)
+    parser.add_argument("--dir", default="/tmp/replay-bench")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--analyzed", type=int, default=20_000, help="games the engine-agreement pass reads")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    shutil.rmtree(args.dir, ignore_errors=True)
+    replays = list(synthetic_replays(args.games, args.players, args.seed))
+    writer = ReplayWriter(args.dir, flush_interval=0.2)
+    samples = []
+    for start in range(0, len(replays), 1000):
+        batch = replays[start:start + 1000]
+        began = time.perf_counter()
+        for replay in batch:
+            writer.append(replay)
+        samples.append((time.perf_counter() - began) / len(batch) * 1e6)
+    started = time.perf_counter()
+    writer.close()
+    size = sum(os.path.getsize(os.path.join(args.dir, name)) for name in os.listdir(args.dir))
+    print(f"append: {statistics.median(samples):.2f} us/game (median of 1000-game batches), "
+          f"worst batch {max(samples):.2f} us; final flush {time.perf_counter() - started:.2f}s")
+    print(f"archive: {size / 1e6:.1f} MB, {size / args.games:.0f} bytes/game with indexes, "
+          f"{statistics.mean(len(replay.moves) for replay in replays):.1f} moves/game")
+    del replays
+
+    started = time.perf_counter()
+    archive = ReplayArchive(args.dir)
+    print(f"open: {len(archive)} games in {(time.perf_counter() - started) * 1e3:.2f} ms")
+    rng = random.Random(args.seed + 1)
+    users = [rng.randrange(args.players) for _ in range(args.queries)]
+    found = 0
+    started = time.perf_counter()
+    for user_id in users:
+        found += sum(1 for _ in archive.by_user(user_id))
+    elapsed = time.perf_counter() - started
+    print(f"by_user: {elapsed / len(users) * 1e6:.1f} us/player ({found / len(users):.1f} games each, decoded)")
+    windows = [START + rng.randrange(args.games) * 3 for _ in range(args.queries)]
+    started = time.perf_counter()
+    for since in windows:
+        sum(1 for _ in archive.between(since, since + 3600))
+    print(f"between (1 hour): {(time.perf_counter() - started) / len(windows) * 1e6:.1f} us/query")
+    started = time.perf_counter()
+    count = sum(1 for _ in archive)
+    elapsed = time.perf_counter() - started
+    print(f"scan: {count} games in {elapsed:.2f}s ({count / elapsed:.0f} games/s)")
+    archive.close()
+
+    for workers in sorted({1, args.workers}):
+        openings = OpeningStats(4)
+        started = time.perf_counter()
+        count = analyze(args.dir, [openings], workers=workers)
+        elapsed = time.perf_counter() - started
+        print(f"openings, {workers} workers: {count / elapsed:.0f} games/s "
+              f"({len(openings.openings)} distinct positions)")
+        agreement = EngineAgreement(None, args.depth)
+        started = time.perf_counter()
+        count = analyze(args.dir, [agreement], workers=workers, until=START + args.analyzed * 3,
+                        chunk_records=max(args.analyzed // (4 * workers), 1))
+        elapsed = time.perf_counter() - started
+        print(f"engine agreement (depth {args.depth}), {workers} workers: {count / elapsed:.0f} games/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Player statistics at scale: 1M players, 10M recorded games.
+
+    python -m benchmarks.bench_stats
+    python -m benchmarks.bench_stats --players 100000 --games 1000000 --journal /tmp/stats-bench
+
+Folds --games synthetic results into per-player totals (players have a
+hidden strength, so ratings spread out, and mostly play in a home chat of
+--chat-size players), builds the rank indexes from them as recovery does,
+then measures the live operations on top: recording a result (index
+upkeep included), /rank, /top and a chat leaderboard. With --journal it
+also times writing a snapshot of the totals and recovering a
+JournaledStatsStore from it.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import time
+from typing import Callable, Iterator
+
+from src.games.stats import GameResult, InMemoryStatsStore, JournaledStatsStore
+from src.games.stats.base import fold_result
+from src.games.stats.journal import Totals, write_snapshot
+from src.games.store.journal import _path
+
+
+def synthetic_results(players: int, games: int, chat_size: int, seed: int) -> Iterator[GameResult]:
+    rng = random.Random(seed)
+    strength = [rng.gauss(0, 1) for _ in range(players)]
+    for _ in range(games):
+        first = rng.randrange(players)
+        if rng.random() < 0.8:
+            # A game in first's home chat
+            home = first - first % chat_size
+            second = home + rng.randrange(min(chat_size, players - home))
+        else:
+            second = rng.randrange(players)
+        if second == first:
+            second = (first + 1) % players
+        if rng.random() < 1 / (1 + 10 ** (strength[second] - strength[first])):
+            winner, loser = first, second
+        else:
+            winner, loser = second, first
+        yield GameResult(first // chat_size, winner, loser, 5 + rng.randrange(12), rng.random() < 0.05)
+
+
+def per_call_us(function: Callable[[], object], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--games", type=int, default=10_000_000)
+    parser.add_argument("--chat-size", type=int, default=10, help="players per home chat")
+    parser.add_argument("--live", type=int, default=100_000, help="results recorded through the live store")
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--journal", metavar="DIR", help="also time snapshot write and recovery here")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    totals = Totals(1200, 32)
+    started = time.perf_counter()
+    for result in synthetic_results(args.players, args.games, args.chat_size, args.seed):
+        fold_result(totals.players, totals.chat_wins, result, totals.initial_rating, totals.k_factor)
+    totals.results = args.games
+    folded = time.perf_counter() - started
+    print(f"folded {args.games} results into {len(totals.players)} players in {folded:.1f}s "
+          f"({folded / args.games * 1e6:.2f} us/result, generation included)")
+
+    store = InMemoryStatsStore()
+    started = time.perf_counter()
+    store._load(totals.players, totals.chat_wins, totals.results)
+    print(f"built rank indexes in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(args.seed + 1)
+    live = list(synthetic_results(args.players, args.live, args.chat_size, args.seed + 2))
+    samples = []
+    for start in range(0, len(live), 1000):
+        batch = live[start:start + 1000]
+        began = time.perf_counter()
+        for result in batch:
+            store.record(result)
+        samples.append((time.perf_counter() - began) / len(batch) * 1e6)
+    print(f"record: {statistics.median(samples):.2f} us/result (median of 1000-result batches), "
+          f"worst batch {max(samples):.2f} us")
+
+    users = [rng.randrange(args.players) for _ in range(args.queries)]
+    users_iter = iter(users)
+    print(f"rank: {per_call_us(lambda: store.rank(next(users_iter)), len(users)):.2f} us")
+    print(f"top 10: {per_call_us(lambda: store.top(10), args.queries):.2f} us   "
+          f"top 10 from #500000: {per_call_us(lambda: store.top(10, 500_000), args.queries):.2f} us")
+    chats = iter([user // args.chat_size for user in users])
+    print(f"chat leaderboard: {per_call_us(lambda: store.chat_top(next(chats), 10), len(users)):.2f} us")
+    best = store.top(1)[0]
+    print(f"#1 {best.user_id}: rating {best.rating:.0f}, {best.wins}W {best.losses}L")
+
+    if args.journal:
+        shutil.rmtree(args.journal, ignore_errors=True)
+        os.makedirs(args.journal)
+        totals.results = store.results
+        started = time.perf_counter()
+        write_snapshot(_path(args.journal, "snapshot", 1), 1, totals)
+        size = os.path.getsize(_path(args.journal, "snapshot", 1))
+        print(f"snapshot: {size / 1e6:.1f} MB written in {time.perf_counter() - started:.2f}s")
+        del store, totals
+        started = time.perf_counter()
+        recovered = JournaledStatsStore(args.journal)
+        print(f"recovery: {len(recovered)} players in {time.perf_counter() - started:.2f}s")
+        recovered.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+A knockout tournament in one group, end to end, against the load harness.
+
+    python -m benchmarks.bench_tournament
+    python -m benchmarks.bench_tournament --players 1024 --latency-ms 40 --jitter-ms 40
+
+Builds the real Application on an OfflineRequest (see bench_load) and
+first plays --players / 2 ordinary WebApp games, each in its own chat, as
+a baseline. Then one group runs a tournament: an organizer sends
+/tournament, --players users /enter, /begin seeds the bracket and starts
+round one, and every match is played to the end through WebApp moves sent
+from the players' private chats, each round's games all at once. A game
+still undecided after --max-moves is ended through the inactivity timeout,
+as an idle player's would be.
+
+Round one has as many games in flight as the baseline, all hosted by the
+same group, so comparing the "match" and "webapp" move latencies shows
+what sharing a chat costs a game.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import statistics
+import time
+
+from src.bot.application import create_application, drain_updates
+from src.bot.handlers.error_handlers import timeout_handler
+from src.bot.webapp_protocol import encode_compact_move
+from src.cluster.fake import LoadHarness, OfflineRequest
+from src.config.settings import CONCURRENT_UPDATES
+from src.games.store import get_store
+from src.games.tournament import get_tournaments
+from src.utils.logger import logger
+from benchmarks.bench_load import git_commit, percentile
+
+GROUP = -3_000_000
+
+
+async def play_match(harness: LoadHarness, game_id: int, users: dict, rng: random.Random) -> bool:
+    """Play one bracket game from the players' private chats; False if it had to time out."""
+    store = get_store(harness.application)
+    for _ in range(harness.max_moves):
+        game = store.get(game_id)
+        if game is None or game.phase not in ("placement", "movement"):
+            return True
+        user = users[game.players[game.current_player]]
+        position, selected = harness._choose(game, rng)
+        await harness.send("match", harness.web_app(user["id"], user, encode_compact_move(position, selected)))
+    await timeout_handler(harness.application, game_id)
+    return False
+
+
+async def run_tournament(harness: LoadHarness, players: int, seed: int) -> dict:
+    application = harness.application
+    store = get_store(application)
+    tournaments = get_tournaments(application)
+    users = {40_000_000 + n: {"id": 40_000_000 + n, "is_bot": False, "first_name": f"P{n}"}
+             for n in range(players)}
+    organizer = next(iter(users.values()))
+
+    await harness.send("command", harness.command(GROUP, organizer, "/tournament"))
+    await asyncio.gather(*(harness.send("enter", harness.command(GROUP, user, "/enter"))
+                           for user in users.values()))
+    started = time.perf_counter()
+    await harness.send("begin", harness.command(GROUP, organizer, "/begin"))
+
+    rng = random.Random(seed)
+    driven, tasks = set(), []
+    while tournaments.get(GROUP) is not None:
+        for game in store.in_chat(GROUP):
+            if game.game_id not in driven:
+                driven.add(game.game_id)
+                tasks.append(asyncio.ensure_future(
+                    play_match(harness, game.game_id, users, random.Random(rng.random()))
+                ))
+        await asyncio.sleep(0.001)
+    decided = await asyncio.gather(*tasks)
+    return {
+        "tournament_seconds": round(time.perf_counter() - started, 3),
+        "matches": len(decided),
+        "matches_timed_out": decided.count(False),
+    }
+
+
+async def run(args) -> dict:
+    request = OfflineRequest(
+        latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, rate_limit=0.0, seed=args.seed
+    )
+    application = create_application(request, updater=False, concurrent_updates=args.concurrent_updates)
+    application.bot_data["metrics_port"] = 0
+    harness = LoadHarness(application, args.max_moves, seed=args.seed)
+
+    await application.initialize()
+    try:
+        await application.post_init(application)
+        await application.start()
+        await asyncio.gather(*(harness.play_chat(n, buttons=False) for n in range(args.players // 2)))
+        result = await run_tournament(harness, args.players, args.seed)
+        await drain_updates(application)
+    finally:
+        if application.running:
+            await application.stop()
+        await application.post_stop(application)
+        await application.shutdown()
+        await application.post_shutdown(application)
+
+    return {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "players": args.players,
+        "latency_ms": args.latency_ms,
+        **result,
+        "by_kind": {
+            kind: {"count": len(values),
+                   "p50_ms": round(statistics.median(values) * 1000, 3),
+                   "p99_ms": round(percentile(sorted(values), 0.99) * 1000, 3)}
+            for kind, values in sorted(harness.latencies.items())
+        },
+        "timeouts": harness.timeouts,
+        "api_calls": dict(sorted(request.calls.items())),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=1024)
+    parser.add_argument("--max-moves", type=int, default=200, help="moves before a match is timed out")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Bot API call latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra latency per call, up to")
+    parser.add_argument("--concurrent-updates", type=int, default=CONCURRENT_UPDATES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="append the result as one JSON line")
+    parser.add_argument("--verbose", action="store_true", help="keep INFO logging on (default: errors only)")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.ERROR)
+    result = asyncio.run(run(args))
+
+    print(f"{args.players}-player tournament: {result['matches']} games in {result['tournament_seconds']:.2f}s "
+          f"({result['matches_timed_out']} timed out)")
+    for kind, stats in result["by_kind"].items():
+        print(f"  {kind:<7} {stats['count']:>7}   p50 {stats['p50_ms']:8.2f} ms   p99 {stats['p99_ms']:8.2f} ms")
+    print(f"update timeouts {result['timeouts']}")
+    print(f"api calls {result['api_calls']}")
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
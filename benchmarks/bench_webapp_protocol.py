@@ -0,0 +1,69 @@
+"""
+WebApp protocol microbenchmark.
+
+    python -m benchmarks.bench_webapp_protocol --messages 200000
+
+Parses the same stream of move messages in three ways: json.loads alone
+(what the handler used to do, with no validation), JSON with schema
+validation, and the compact "~mXY" form. Also compares the size of a full
+state with the board as rows and packed into a string.
+"""
+import argparse
+import json
+import random
+import time
+
+from src.bot.webapp_protocol import encode_compact_move, parse_webapp_data
+from src.games.models.game_state import GameState
+
+
+def move_messages(count: int, seed: int = 1):
+    """(JSON, compact) encodings of count random moves, half of them movements."""
+    rng = random.Random(seed)
+    as_json, as_compact = [], []
+    for n in range(count):
+        position = rng.randrange(16)
+        selected = rng.randrange(16) if n % 2 else None
+        message = {"action": "move", "position": position}
+        if selected is not None:
+            message["selected"] = selected
+        as_json.append(json.dumps(message))
+        as_compact.append(encode_compact_move(position, selected))
+    return as_json, as_compact
+
+
+def rate(parse, messages) -> float:
+    started = time.perf_counter()
+    for data in messages:
+        parse(data)
+    return len(messages) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+
+    as_json, as_compact = move_messages(args.messages)
+    results = [
+        ("json.loads, unvalidated", rate(json.loads, as_json)),
+        ("JSON + schema", rate(parse_webapp_data, as_json)),
+        ("compact", rate(parse_webapp_data, as_compact)),
+    ]
+    for name, per_second in results:
+        print(f"{name:<24} {per_second:>12,.0f} msgs/s ({1e6 / per_second:.2f} µs/msg)")
+    print(f"message size: JSON {sum(map(len, as_json)) / len(as_json):.1f} B, "
+          f"compact {sum(map(len, as_compact)) / len(as_compact):.1f} B")
+
+    game = GameState(-1)
+    game.player_x, game.name_x, game.player_o, game.name_o = 1, "Alice", 2, "Bob"
+    for cell in (0, 5, 10, 15, 3, 12):
+        game.board.place("X" if cell % 2 == 0 else "O", cell)
+    for packed in (False, True):
+        text = json.dumps({"type": "gameUpdate", "version": 7, "state": game.to_dict(packed)},
+                          separators=(",", ":"))
+        print(f"full state, {'packed' if packed else 'rows':<6} board: {len(text)} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import asyncio
+from typing import Optional
+from telegram.ext import (
+    Application,
+    CommandHandler,
+    CallbackQueryHandler,
+    MessageHandler,
+    filters,
+)
+from telegram.request import BaseRequest, HTTPXRequest
+
+from src.config.settings import (
+    BOT_TOKEN, SOLUTION_TABLE_PATH, GAME_STORE_BACKEND, GAME_STORE_PATH,
+    STATS_BACKEND, STATS_PATH, DEFAULT_RATING, RATING_K_FACTOR, REPLAY_ARCHIVE_PATH,
+    CONCURRENT_UPDATES, SEQUENCER_MAILBOX_LIMIT, OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE,
+    OUTBOUND_GROUP_RATE, OUTBOUND_CHAT_BURST, METRICS_LISTEN, METRICS_PORT,
+    SPECTATOR_INTERVAL, SPECTATOR_MAX_PER_GAME, WEBAPP_PACKED_BOARD
+)
+from src.bot.handlers.command_handlers import start, help_command
+from src.bot.handlers.admin_handlers import install_profile_signal, profile_command, remove_profile_signal
+from src.bot.handlers.matchmaking_handlers import create_matchmaker, leave_command, queue_command, run_matchmaking
+from src.bot.handlers.stats_handlers import leaderboard_command, rank_command, top_command
+from src.bot.handlers.spectator_handlers import unwatch_command, watch_command
+from src.bot.handlers.tournament_handlers import begin_command, bracket_command, enter_command, tournament_command
+from src.bot.handlers.callback_handlers import button_click
+from src.bot.handlers.error_handlers import error_handler, create_timeout_scheduler
+from src.bot.handlers.webapp_handlers import handle_webapp_data
+from src.bot.metrics import InstrumentedRequest, MetricsExporter, timed_handler
+from src.bot.broadcast import Broadcaster
+from src.bot.outbox import OutboundScheduler
+from src.bot.sequencer import ChatSequencer, game_sequence_key
+from src.games.logic.solution_table import load_solution_table
+from src.games.replays import open_replay_writer
+from src.games.stats import open_stats_store
+from src.games.store import open_game_store
+from src.games.tournament import Tournaments
+from src.utils.logger import logger
+
+# Update types the handlers below act on (commands and WebApp data arrive as
+# messages); Telegram is asked for nothing else
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+async def init_bot_data(application: Application) -> None:
+    """Initialize bot data storage."""
+    if "store" not in application.bot_data:
+        store = open_game_store(GAME_STORE_BACKEND, GAME_STORE_PATH)
+        application.bot_data["store"] = store
+        logger.info(f"Game store: {GAME_STORE_BACKEND} ({len(store)} games restored)")
+    if "stats" not in application.bot_data:
+        stats = open_stats_store(STATS_BACKEND, STATS_PATH, DEFAULT_RATING, RATING_K_FACTOR)
+        application.bot_data["stats"] = stats
+        logger.info(f"Stats store: {STATS_BACKEND} ({len(stats)} players)")
+    if "replays" not in application.bot_data:
+        application.bot_data["replays"] = open_replay_writer(REPLAY_ARCHIVE_PATH)
+    if "solution_table" not in application.bot_data:
+        table = load_solution_table(SOLUTION_TABLE_PATH)
+        application.bot_data["solution_table"] = table
+        if table:
+            logger.info(f"Solution table mapped from {SOLUTION_TABLE_PATH}")
+        else:
+            logger.warning(f"No solution table at {SOLUTION_TABLE_PATH}; hints and analysis disabled")
+    if "outbox" not in application.bot_data:
+        outbox = OutboundScheduler(
+            application.bot,
+            global_rate=OUTBOUND_GLOBAL_RATE,
+            chat_rate=OUTBOUND_CHAT_RATE,
+            group_rate=OUTBOUND_GROUP_RATE,
+            chat_burst=OUTBOUND_CHAT_BURST,
+        )
+        application.bot_data["outbox"] = outbox
+        outbox.start()
+    if "broadcaster" not in application.bot_data:
+        broadcaster = Broadcaster(
+            application.bot_data["outbox"],
+            interval=SPECTATOR_INTERVAL,
+            max_spectators=SPECTATOR_MAX_PER_GAME,
+            packed_board=WEBAPP_PACKED_BOARD,
+        )
+        application.bot_data["broadcaster"] = broadcaster
+        broadcaster.start()
+    if "timeouts" not in application.bot_data:
+        scheduler = create_timeout_scheduler(application)
+        application.bot_data["timeouts"] = scheduler
+        for game in application.bot_data["store"]:
+            scheduler.schedule(game.game_id)
+        scheduler.start()
+    if "matchmaker" not in application.bot_data:
+        application.bot_data["matchmaker"] = create_matchmaker()
+        # Not application.create_task: Application.stop() would wait for it
+        application.bot_data["matchmaking_task"] = asyncio.get_running_loop().create_task(
+            run_matchmaking(application)
+        )
+    if "tournaments" not in application.bot_data:
+        application.bot_data["tournaments"] = Tournaments()
+    port = application.bot_data.get("metrics_port", METRICS_PORT)
+    if "metrics" not in application.bot_data and port:
+        exporter = MetricsExporter(application)
+        application.bot_data["metrics"] = exporter
+        await exporter.start(METRICS_LISTEN, port)
+    install_profile_signal(application)
+    logger.info("Bot data initialized")
+
+async def stop_bot_data(application: Application) -> None:
+    """Stop background tasks started by init_bot_data while the bot can still send."""
+    remove_profile_signal()
+    matchmaking = application.bot_data.pop("matchmaking_task", None)
+    if matchmaking is not None:
+        matchmaking.cancel()
+    scheduler = application.bot_data.get("timeouts")
+    if scheduler is not None:
+        scheduler.stop()
+    broadcaster = application.bot_data.get("broadcaster")
+    if broadcaster is not None:
+        await broadcaster.stop()
+    outbox = application.bot_data.get("outbox")
+    if outbox is not None:
+        await outbox.stop()
+        logger.info(f"Outbound queue stopped: {outbox.stats()}")
+    exporter = application.bot_data.pop("metrics", None)
+    if exporter is not None:
+        await exporter.stop()
+
+async def shutdown_bot_data(application: Application) -> None:
+    """Release resources held in bot_data."""
+    store = application.bot_data.get("store")
+    if store is not None:
+        store.close()
+    stats = application.bot_data.get("stats")
+    if stats is not None:
+        stats.close()
+    replays = application.bot_data.get("replays")
+    if replays is not None:
+        replays.close()
+
+async def drain_updates(application: Application) -> None:
+    """Wait until every update queued so far has been fully processed."""
+    await application.update_queue.join()
+    processor = application.update_processor
+    if isinstance(processor, ChatSequencer):
+        await processor.drain()
+
+def create_application(
+    request: Optional[BaseRequest] = None,
+    updater: bool = True,
+    concurrent_updates: int = CONCURRENT_UPDATES
+) -> Application:
+    """
+    Build the Application with every handler registered.
+
+    Args:
+        request: Transport for Bot API calls (default: PTB's HTTPX client);
+            calls other than getUpdates are timed for the metrics endpoint
+        updater: False for processes that are fed updates by someone else
+        concurrent_updates: Updates in flight at once; above 1 they are
+            sequenced per game by ChatSequencer
+
+    Returns:
+        Application: Ready to run_polling, run_webhook or to be fed through update_queue
+    """
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(init_bot_data)
+        .post_stop(stop_bot_data)
+        .post_shutdown(shutdown_bot_data)
+    )
+    builder = builder.request(InstrumentedRequest(request or HTTPXRequest(connection_pool_size=256)))
+    if request is not None:
+        builder = builder.get_updates_request(request)
+    if not updater:
+        builder = builder.updater(None)
+    if concurrent_updates > 1:
+        # The key reads the store through the application built just below
+        builder = builder.concurrent_updates(ChatSequencer(
+            concurrent_updates, game_sequence_key(lambda: application.bot_data.get("store")),
+            mailbox_limit=SEQUENCER_MAILBOX_LIMIT
+        ))
+    application = builder.build()
+
+    # Add command handlers
+    application.add_handler(CommandHandler("start", timed_handler("start", start)))
+    application.add_handler(CommandHandler("help", timed_handler("help_command", help_command)))
+    application.add_handler(CommandHandler("profile", timed_handler("profile_command", profile_command)))
+    application.add_handler(CommandHandler("queue", timed_handler("queue_command", queue_command)))
+    application.add_handler(CommandHandler("leave", timed_handler("leave_command", leave_command)))
+    application.add_handler(CommandHandler("rank", timed_handler("rank_command", rank_command)))
+    application.add_handler(CommandHandler("top", timed_handler("top_command", top_command)))
+    application.add_handler(CommandHandler("leaderboard", timed_handler("leaderboard_command", leaderboard_command)))
+    application.add_handler(CommandHandler("watch", timed_handler("watch_command", watch_command)))
+    application.add_handler(CommandHandler("unwatch", timed_handler("unwatch_command", unwatch_command)))
+    application.add_handler(CommandHandler("tournament", timed_handler("tournament_command", tournament_command)))
+    application.add_handler(CommandHandler("enter", timed_handler("enter_command", enter_command)))
+    application.add_handler(CommandHandler("begin", timed_handler("begin_command", begin_command)))
+    application.add_handler(CommandHandler("bracket", timed_handler("bracket_command", bracket_command)))
+
+    # Add callback query handler for game board interactions
+    application.add_handler(CallbackQueryHandler(timed_handler("button_click", button_click)))
+
+    # Add WebApp data handler
+    application.add_handler(MessageHandler(
+        filters.StatusUpdate.WEB_APP_DATA,
+        timed_handler("handle_webapp_data", handle_webapp_data)
+    ))
+
+    # Add error handler
+    application.add_error_handler(error_handler)
+    return application
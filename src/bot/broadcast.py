@@ -0,0 +1,234 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.bot.outbox import SPECTATOR, OutboundScheduler
+from src.games.models.game_state import GameState
+from src.utils.logger import logger
+
+# Spectator messages handed to the outbox before yielding to other tasks
+_YIELD_EVERY = 256
+
+
+class _Channel:
+    """One game's spectators and the state last rendered and sent to them."""
+
+    __slots__ = ("game_id", "spectators", "game", "ended", "rendered", "text", "sent", "next_send", "scheduled")
+
+    def __init__(self, game_id: int):
+        self.game_id = game_id
+        self.spectators: Set[int] = set()
+        self.game: Optional[GameState] = None
+        self.ended: Optional[bool] = None  # timed_out once the game is over
+        self.rendered: Optional[Tuple] = None  # (game id, version, ended) of text
+        self.text = ""
+        self.sent: Optional[Tuple] = None
+        self.next_send = 0.0
+        self.scheduled = False
+
+
+class Broadcaster:
+    """
+    Pushes game states to spectators.
+
+    Handlers call publish() after a move; it only notes the game and
+    schedules its channel, so spectators add O(1) to a move however many
+    there are. A background task does the fan-out, at most once per
+    interval per game: the state current at that moment is serialized
+    once and every spectator is sent the same text, so versions published
+    in between are skipped. Spectator messages go through the outbox at
+    SPECTATOR priority, behind the players' board edits, keyed per
+    spectator: a spectator whose last state is still waiting to be sent
+    gets the newest one in its place instead of a backlog.
+    """
+
+    def __init__(
+        self,
+        outbox: OutboundScheduler,
+        interval: float = 1.0,
+        max_spectators: int = 5000,
+        packed_board: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.outbox = outbox
+        self.interval = interval
+        self.max_spectators = max_spectators
+        self.packed_board = packed_board
+        self._clock = clock
+        self._channels: Dict[int, _Channel] = {}  # game id -> channel
+        self._watching: Dict[int, _Channel] = {}  # spectator id -> channel
+        self._due: List[Tuple[float, int, _Channel]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.broadcasts = 0
+        self.messages = 0
+
+    def __len__(self) -> int:
+        return len(self._watching)
+
+    def spectators(self, game_id: int) -> int:
+        channel = self._channels.get(game_id)
+        return len(channel.spectators) if channel is not None else 0
+
+    def watching(self, user_id: int) -> Optional[int]:
+        """Id of the game user_id is watching, if any"""
+        channel = self._watching.get(user_id)
+        return channel.game_id if channel is not None else None
+
+    def watch(self, game: GameState, user_id: int) -> bool:
+        """
+        Subscribe user_id to game's states, leaving any game they were
+        watching, and send them the current one. False if the game already
+        has max_spectators.
+        """
+        channel = self._channels.get(game.game_id)
+        if channel is None:
+            channel = _Channel(game.game_id)
+        elif user_id not in channel.spectators and len(channel.spectators) >= self.max_spectators:
+            return False
+        if self._watching.get(user_id) is not channel:
+            self.unwatch(user_id)
+        self._channels[game.game_id] = channel
+        channel.spectators.add(user_id)
+        self._watching[user_id] = channel
+        channel.game = game
+        self._send(user_id, self._render(channel))
+        return True
+
+    def unwatch(self, user_id: int) -> Optional[int]:
+        """Stop sending user_id states; returns the id of the game they were watching."""
+        channel = self._watching.pop(user_id, None)
+        if channel is None:
+            return None
+        channel.spectators.discard(user_id)
+        if not channel.spectators and self._channels.get(channel.game_id) is channel:
+            del self._channels[channel.game_id]
+        return channel.game_id
+
+    def publish(self, game: GameState) -> None:
+        """Note that game changed; its spectators get the state within interval seconds."""
+        channel = self._channels.get(game.game_id)
+        if channel is None:
+            return
+        channel.game = game
+        self._schedule(channel)
+
+    def end(self, game: GameState, timed_out: bool = False) -> None:
+        """
+        Send game's spectators its final state and unsubscribe them.
+        """
+        channel = self._channels.pop(game.game_id, None)
+        if channel is None:
+            return
+        for user_id in channel.spectators:
+            if self._watching.get(user_id) is channel:
+                del self._watching[user_id]
+        channel.game = game
+        channel.ended = timed_out
+        self._schedule(channel)
+
+    def release(self, game_id: int) -> List[int]:
+        """
+        Unsubscribe a game's spectators without a final state, because the
+        game is moving to another process; returns them so the new owner
+        can subscribe them again.
+        """
+        channel = self._channels.pop(game_id, None)
+        if channel is None:
+            return []
+        for user_id in channel.spectators:
+            if self._watching.get(user_id) is channel:
+                del self._watching[user_id]
+        return list(channel.spectators)
+
+    def _schedule(self, channel: _Channel) -> None:
+        if channel.scheduled:
+            return
+        channel.scheduled = True
+        heapq.heappush(self._due, (max(self._clock(), channel.next_send), next(self._seq), channel))
+        self._wakeup.set()
+
+    def _render(self, channel: _Channel) -> str:
+        """The channel's current state as JSON, serialized once per version."""
+        game = channel.game
+        key = (game.game_id, game.version, channel.ended)
+        if channel.rendered != key:
+            payload = {
+                "type": "gameUpdate", "version": game.version, "spectator": True,
+                "state": game.to_dict(self.packed_board),
+            }
+            if channel.ended is not None:
+                payload["final"] = {"winner": game.winner, "winningPattern": game.winning_pattern,
+                                    "timedOut": channel.ended}
+            channel.text = json.dumps(payload, separators=(",", ":"))
+            channel.rendered = key
+        return channel.text
+
+    def _send(self, user_id: int, text: str) -> None:
+        self.outbox.enqueue(
+            user_id, partial(self.outbox.bot.send_message, user_id, text), SPECTATOR, key=("spectate", user_id)
+        )
+        self.messages += 1
+
+    async def _fan_out(self, channel: _Channel) -> None:
+        text = self._render(channel)
+        if channel.sent == channel.rendered:
+            return
+        channel.sent = channel.rendered
+        channel.next_send = self._clock() + self.interval
+        self.broadcasts += 1
+        for count, user_id in enumerate(list(channel.spectators), 1):
+            self._send(user_id, text)
+            if count % _YIELD_EVERY == 0:
+                await asyncio.sleep(0)
+
+    async def run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = self._clock()
+            if not self._due or self._due[0][0] > now:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._due[0][0] - now if self._due else None)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            channel = heapq.heappop(self._due)[2]
+            channel.scheduled = False
+            try:
+                await self._fan_out(channel)
+            except Exception as e:
+                logger.error(f"Error broadcasting game {channel.game_id}: {e}")
+
+    def start(self) -> None:
+        """Run the fan-out as a background task on the current event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Send whatever is due now, then stop; call before stopping the outbox."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._due:
+            channel = heapq.heappop(self._due)[2]
+            channel.scheduled = False
+            await self._fan_out(channel)
+
+    def stats(self) -> dict:
+        return {
+            "spectators": len(self._watching),
+            "games": len(self._channels),
+            "broadcasts": self.broadcasts,
+            "messages": self.messages,
+        }
+
+
+def get_broadcaster(context) -> Broadcaster:
+    """Return the spectator broadcaster from a handler context or an Application."""
+    return context.bot_data["broadcaster"]
@@ -0,0 +1,90 @@
+import asyncio
+import signal
+import threading
+from typing import Optional
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+from src.config.settings import (
+    ADMIN_USER_IDS, PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_MAX_SECONDS
+)
+from src.utils.logger import logger
+from src.utils.profiler import capture_profile, stop_capture, top_functions
+
+# Length of a capture started by SIGUSR1
+SIGNAL_PROFILE_SECONDS = 30
+
+
+async def run_profile(seconds: float) -> Optional[tuple]:
+    """
+    Sample the event loop thread for seconds without blocking the loop.
+
+    Returns:
+        (path, profiler) as from capture_profile, or None if one is running
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, capture_profile, seconds, PROFILE_DIR, threading.get_ident(), PROFILE_INTERVAL_MS / 1000
+    )
+
+
+def _start_background(application: Application, coroutine) -> None:
+    # Not application.create_task: Application.stop() waits for those, and a
+    # capture is cut short by remove_profile_signal only after stop returns
+    application.bot_data["profile_task"] = asyncio.get_running_loop().create_task(coroutine)
+
+
+async def _profile_and_report(update: Update, seconds: int) -> None:
+    try:
+        result = await run_profile(seconds)
+        if result is None:
+            await update.effective_message.reply_text("A profile is already being captured.")
+            return
+        path, profiler = result
+        lines = [f"{samples:>5}  {name}" for name, samples in top_functions(profiler.stacks, 10)]
+        await update.effective_message.reply_text(
+            f"Profile written to {path} ({profiler.samples} samples)\n" + "\n".join(lines)
+        )
+    except Exception as e:
+        logger.error(f"Error capturing profile: {e}")
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """
+    Handle /profile [seconds] - capture a CPU profile of this process.
+
+    Only users in ADMIN_USER_IDS may run it; anyone else is ignored. The
+    capture runs in the background and the result is posted when done.
+    """
+    if update.effective_user is None or update.effective_user.id not in ADMIN_USER_IDS:
+        return "denied"
+    try:
+        seconds = int(context.args[0]) if context.args else SIGNAL_PROFILE_SECONDS
+    except ValueError:
+        await update.effective_message.reply_text("Usage: /profile [seconds]")
+        return "invalid"
+    seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+    logger.info(f"Profile of {seconds}s requested by user {update.effective_user.id}")
+    await update.effective_message.reply_text(f"Profiling for {seconds}s...")
+    _start_background(context.application, _profile_and_report(update, seconds))
+
+
+def install_profile_signal(application: Application) -> None:
+    """Start a SIGNAL_PROFILE_SECONDS capture whenever the process gets SIGUSR1."""
+    def on_signal():
+        _start_background(application, run_profile(SIGNAL_PROFILE_SECONDS))
+        logger.info(f"SIGUSR1: profiling for {SIGNAL_PROFILE_SECONDS}s")
+
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, on_signal)
+    except (AttributeError, NotImplementedError, RuntimeError) as e:
+        # No SIGUSR1 on Windows; add_signal_handler only works in the main thread
+        logger.warning(f"Profiling signal not installed: {e}")
+
+
+def remove_profile_signal() -> None:
+    """Remove the SIGUSR1 handler and end any capture so shutdown doesn't wait for it."""
+    stop_capture()
+    try:
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        pass
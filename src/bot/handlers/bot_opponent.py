@@ -0,0 +1,44 @@
+from typing import Optional
+from telegram.ext import ContextTypes
+from src.bot.handlers.error_handlers import schedule_timeout
+from src.config.settings import AI_MOVE_BUDGET_MS, BOT_PLAYER_NAME
+from src.games.logic.ai import SearchResult, choose_move
+from src.games.models.game_state import GameState
+from src.games.store import GameStore, get_store
+from src.utils.logger import logger
+
+
+def add_bot_opponent(store: GameStore, game: GameState, bot_id: int) -> None:
+    """Seat the computer as player O and start the game"""
+    store.join(game, bot_id, BOT_PLAYER_NAME, bot=True)
+
+
+def is_bot_turn(game: GameState) -> bool:
+    return game.bot_player is not None and game.current_player == game.bot_player and not game.winner
+
+
+async def take_bot_turn(context: ContextTypes.DEFAULT_TYPE, chat_id: int, game: GameState) -> Optional[SearchResult]:
+    """
+    Choose and apply the computer's move.
+
+    The search runs in the engine's process pool, so the event loop keeps
+    serving other chats meanwhile. Returns None if the game ended or moved
+    on while the search was running.
+    """
+    result = await choose_move(game, AI_MOVE_BUDGET_MS, context.bot_data.get("solution_table"))
+
+    store = get_store(context)
+    if store.get(game.game_id) is not game or not is_bot_turn(game):
+        return None
+    if not store.play(game, game.players[game.bot_player], result.dst, result.src):
+        logger.error(f"Engine produced an illegal move in chat {chat_id}: {result}")
+        return None
+    game.update_last_action_time()
+    schedule_timeout(context, game.game_id)
+
+    logger.info(
+        "Bot moved in chat %s: depth %s, %.0f nodes/s, TT hit rate %.0f%%",
+        chat_id, result.depth, result.nodes_per_second, result.tt_hit_rate * 100,
+        extra={"event": "bot_move", "chat_id": chat_id}
+    )
+    return result
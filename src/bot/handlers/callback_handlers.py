@@ -1,130 +1,153 @@
+from typing import Optional
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.games.logic.game_logic import check_winner, find_winning_pattern
 from src.games.logic.animations import animate_win
-from src.bot.keyboards.game_keyboard import create_keyboard_with_highlight
-from src.config.settings import MESSAGES, GAME_TIMEOUT_SECONDS
+from src.bot.keyboards.game_keyboard import create_board_keyboard, parse_cell_data
+from src.bot.handlers.bot_opponent import add_bot_opponent, is_bot_turn, take_bot_turn
+from src.bot.handlers.error_handlers import schedule_timeout
+from src.bot.handlers.matchmaking_handlers import join_queue
+from src.bot.handlers.stats_handlers import record_result
+from src.bot.broadcast import get_broadcaster
+from src.bot.outbox import get_outbox
+from src.config.settings import MESSAGES
+from src.games.models.game_state import GameState
+from src.games.store import get_store
 from src.utils.logger import logger
-import asyncio
+from src.utils.tracing import span
 
-async def check_inactivity(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
-    """
-    Check if the game has timed out due to inactivity.
-    Returns True if game was terminated due to timeout.
-    """
-    chat_id = update.effective_chat.id
-    game = context.bot_data["games"].get(chat_id)
-    
-    if not game or game.phase in ["waiting", "finished"]:
-        return False
-        
-    current_time = asyncio.get_event_loop().time()
-    if current_time - game.last_action_time > GAME_TIMEOUT_SECONDS:
-        winner = "O" if game.current_player == "X" else "X"
-        await context.bot.send_message(
-            chat_id=chat_id,
-            text=MESSAGES['timeout_win'].format(
-                winner=winner,
-                winner_name=game.player_names[winner],
-                loser=game.current_player
-            )
-        )
-        del context.bot_data["games"][chat_id]
-        return True
-    return False
-
-
-def create_game_keyboard(board):
-    """Create the game board keyboard"""
-    keyboard = []
-    for i in range(4):
-        row = []
-        for j in range(4):
-            cell = board[i][j]
-            text = cell if cell != " " else "·"
-            row.append(InlineKeyboardButton(text, callback_data=f"{i},{j}"))
-        keyboard.append(row)
-    return InlineKeyboardMarkup(keyboard)
-
-async def button_click(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle all button clicks"""
+async def button_click(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Handle all button clicks; returns "stale" or "error" for the metrics outcome"""
     query = update.callback_query
-    chat_id = update.effective_chat.id
-    user_id = update.effective_user.id
-    user_name = update.effective_user.first_name
 
-    logger.info(f"Received button click from user {user_id} with data: {query.data}")
+    # Clicks on a board from a finished game or an earlier move (including
+    # a second tap before the first redraw) are answered and dropped here.
+    game = None
+    with span("decode"):
+        cell_data = parse_cell_data(query.data)
+    if cell_data is not None:
+        game_id, version, position = cell_data
+        with span("state_lookup"):
+            game = get_store(context).get(game_id)
+        if game is None or game.version != version:
+            await query.answer(MESSAGES['stale_board'])
+            return "stale"
+
+    user_id = update.effective_user.id
+    logger.info(
+        "Received button click from user %s with data: %s", user_id, query.data,
+        extra={"event": "click", "chat_id": update.effective_chat.id, "user_id": user_id}
+    )
 
     try:
         if query.data == "join_game":
             await handle_join_game(update, context)
+        elif query.data == "join_bot":
+            await handle_join_game(update, context, vs_bot=True)
+        elif query.data == "queue":
+            text = join_queue(context, update.effective_chat.id, update.effective_user)
+            await query.answer(text or "Match found!")
+        elif cell_data is not None:
+            await handle_game_move(update, context, position, game)
         else:
-            # Handle game moves
-            await handle_game_move(update, context)
+            # Board drawn before callback data carried a game and version
+            try:
+                row, col = map(int, query.data.split(","))
+            except ValueError:
+                row = col = -1
+            if not (0 <= row < 4 and 0 <= col < 4):
+                await query.answer(MESSAGES['stale_board'])
+                return "stale"
+            await handle_game_move(update, context, row * 4 + col)
 
     except Exception as e:
         logger.error(f"Error in button_click: {e}")
         await query.answer("Error processing your request!")
+        return "error"
 
-async def handle_join_game(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle join game button click"""
+async def handle_join_game(update: Update, context: ContextTypes.DEFAULT_TYPE, vs_bot: bool = False) -> None:
+    """Handle join game button click, or start a game against the bot (creating one if needed)"""
     query = update.callback_query
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
     user_name = update.effective_user.first_name
 
-    logger.info(f"User {user_id} attempting to join game in chat {chat_id}")
+    logger.info(
+        "User %s attempting to join game in chat %s", user_id, chat_id,
+        extra={"event": "join", "chat_id": chat_id, "user_id": user_id}
+    )
 
     try:
-        game = context.bot_data["games"].get(chat_id)
-        if not game:
-            await query.answer("No active game found!")
+        store = get_store(context)
+        with span("state_lookup"):
+            own = store.for_player(user_id)
+            game = own if vs_bot else store.open_game(chat_id, user_id)
+        if vs_bot and own is not None and (own.chat_id != chat_id or own.phase != "waiting"):
+            await query.answer(MESSAGES['already_playing'])
             return
+        if vs_bot and own is None:
+            game = store.create(chat_id, user_id, user_name)
 
-        if game.phase != "waiting":
-            await query.answer("Game already in progress!")
+        if not vs_bot and own is not None:
+            await query.answer(
+                "You can't play against yourself!" if own.phase == "waiting" else MESSAGES['already_playing']
+            )
             return
 
-        if user_id == game.players["X"]:
-            await query.answer("You can't play against yourself!")
+        if not game:
+            await query.answer("No game is waiting for a player!")
             return
 
-        if game.players["O"]:
-            await query.answer("Game is full!")
+        if game.phase != "waiting" or game.players["O"]:
+            await query.answer("Game already in progress!")
             return
 
-        # Join as player O
-        game.players["O"] = user_id
-        game.player_names["O"] = user_name
-        game.phase = "placement"
+        if vs_bot:
+            add_bot_opponent(store, game, context.bot.id)
+        else:
+            # Join as player O
+            store.join(game, user_id, user_name)
+
+        game.update_last_action_time()
+        schedule_timeout(context, game.game_id)
 
         # Create the keyboard using your existing function
-        keyboard = create_keyboard_with_highlight(game.board)
+        keyboard = create_board_keyboard(game)
 
         # Update the message
-        await query.edit_message_text(
+        get_outbox(context).edit_message_text(
+            chat_id,
+            query.message.message_id,
             f"Game started!\n"
             f"Player X: {game.player_names['X']}\n"
             f"Player O: {game.player_names['O']}\n"
             f"Player X's turn (Placement phase: {game.pieces['X']}/4 pieces placed)",
             reply_markup=keyboard
         )
+        get_broadcaster(context).publish(game)
 
         await query.answer("Successfully joined the game!")
-        logger.info(f"Player {user_name} ({user_id}) successfully joined the game")
+        logger.info(
+            "Player %s (%s) successfully joined the game", user_name, user_id,
+            extra={"event": "join", "chat_id": chat_id, "user_id": user_id}
+        )
 
     except Exception as e:
         logger.error(f"Error in handle_join_game: {e}")
         await query.answer("Error joining the game!")
 
-async def handle_game_move(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle game move button clicks"""
+async def handle_game_move(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, position: int, game: Optional[GameState] = None
+) -> None:
+    """Handle a click on board cell position (0-15) of game (default: the clicking player's game)"""
     query = update.callback_query
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
 
     try:
-        game = context.bot_data["games"].get(chat_id)
+        store = get_store(context)
+        if game is None:
+            with span("state_lookup"):
+                game = store.for_player(user_id)
         if not game:
             await query.answer("No active game found!")
             return
@@ -137,35 +160,92 @@ async def handle_game_move(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             await query.answer("Not your turn!")
             return
 
-        # Get row and column from callback data
-        row, col = map(int, query.data.split(","))
+        row, col = divmod(position, 4)
+        player = game.current_player
+
+        # Movement phase: first click selects one of your pieces
+        if game.phase == "movement" and game.board.owns(player, position):
+            game.selected_piece = (row, col)
+            get_outbox(context).edit_message_text(
+                chat_id,
+                query.message.message_id,
+                f"Player {player}'s turn\n"
+                f"Movement phase: choose an empty square for the selected piece",
+                reply_markup=create_board_keyboard(game, highlight_pos=(row, col))
+            )
+            await query.answer()
+            return
 
-        # Handle placement phase
-        if game.phase == "placement":
-            if game.board[row][col] != " ":
-                await query.answer("Space already occupied!")
+        selected = None
+        if game.phase == "movement":
+            if game.selected_piece is None:
+                await query.answer("Select one of your pieces first!")
                 return
+            selected = game.selected_piece[0] * 4 + game.selected_piece[1]
 
-            # Place piece
-            game.board[row][col] = game.current_player
-            game.pieces[game.current_player] += 1
-
-            # Update keyboard
-            keyboard = create_keyboard_with_highlight(game.board)
+        if not store.play(game, user_id, position, selected):
+            await query.answer("Space already occupied!" if game.phase == "placement" else "Invalid move!")
+            return
+        game.selected_piece = None
+        store.set_message(game, query.message.message_id)
+        game.update_last_action_time()
+        schedule_timeout(context, game.game_id)
+
+        # Winner was checked incrementally when the move was applied
+        if game.winner:
+            await query.answer()
+            animate_win(get_outbox(context), game, game.winner, game.winning_pattern)
+            record_result(context, game)
+            store.remove(game.game_id)
+            return
 
-            # Switch player
-            next_player = "O" if game.current_player == "X" else "X"
-            game.current_player = next_player
+        # Update keyboard
+        keyboard = create_board_keyboard(game)
 
-            # Update message
-            await query.edit_message_text(
-                f"Player {next_player}'s turn\n"
-                f"Placement phase: {game.pieces[next_player]}/4 pieces placed",
-                reply_markup=keyboard
-            )
+        # Update message
+        get_outbox(context).edit_message_text(
+            chat_id, query.message.message_id, _turn_text(game), reply_markup=keyboard
+        )
+        get_broadcaster(context).publish(game)
 
         await query.answer()
 
+        if is_bot_turn(game):
+            context.application.create_task(play_bot_turn(context, chat_id, game))
+
     except Exception as e:
         logger.error(f"Error in handle_game_move: {e}")
-        await query.answer("Error processing move!")
\ No newline at end of file
+        await query.answer("Error processing move!")
+
+def _turn_text(game) -> str:
+    """Status line shown above the board for the player to move"""
+    player = game.current_player
+    if game.phase == "placement":
+        status = f"Placement phase: {game.pieces[player]}/4 pieces placed"
+    else:
+        status = "Movement phase: select a piece to move"
+    return f"Player {player}'s turn\n{status}"
+
+async def play_bot_turn(context: ContextTypes.DEFAULT_TYPE, chat_id: int, game) -> None:
+    """Make the computer's move on the inline board"""
+    try:
+        result = await take_bot_turn(context, chat_id, game)
+        if result is None:
+            return
+
+        if game.winner:
+            animate_win(get_outbox(context), game, game.winner, game.winning_pattern)
+            record_result(context, game)
+            get_store(context).remove(game.game_id)
+            return
+
+        get_outbox(context).edit_message_text(
+            chat_id,
+            game.message_id,
+            _turn_text(game),
+            reply_markup=create_board_keyboard(game, highlight_pos=divmod(result.dst, 4))
+        )
+        get_broadcaster(context).publish(game)
+
+    except Exception as e:
+        logger.error(f"Error in play_bot_turn: {e}")
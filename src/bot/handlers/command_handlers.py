@@ -1,34 +1,18 @@
 # src/bot/handlers/command_handlers.py
-from telegram import (
-    Update, 
-    InlineKeyboardButton, 
-    InlineKeyboardMarkup,
-    WebAppInfo
-)
+from typing import Optional
+from telegram import Update
 from telegram.ext import ContextTypes
-from src.games.models.game_state import GameState
+from src.bot.keyboards.game_keyboard import create_game_start_keyboard
 from src.utils.logger import logger
 import traceback
 
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle the /start command - Launch the game WebApp"""
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Handle the /start command - send the start board (WebApp, join, vs bot, matchmaking)"""
     try:
-        # Explicitly create WebApp button
-        web_app = WebAppInfo(url="https://jimpsons.org/tictactoe")
-        
-        keyboard = [[
-            InlineKeyboardButton(
-                text="🎮 Play 4x4 Tic-Tac-Toe", 
-                web_app=web_app
-            )
-        ]]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await update.message.reply_text(
             "🎮 Welcome to 4x4 Tic-Tac-Toe!\n"
-            "Click the button below to start playing:",
-            reply_markup=reply_markup
+            "Open the game, join one, play the bot or find an opponent:",
+            reply_markup=create_game_start_keyboard()
         )
         
         logger.info(f"WebApp game initiated by user {update.effective_user.id}")
@@ -39,6 +23,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text(
             f"Sorry, there was an error starting the game: {str(e)}"
         )
+        return "error"
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle the /help command"""
@@ -56,6 +41,17 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 *Commands:*
 /start - Start a new game
+/queue - Find an opponent of similar rating
+/leave - Stop looking for an opponent
+/rank - Your rating and record
+/top - Highest rated players
+/leaderboard - Most wins in this chat
+/watch - Follow this chat's game in a private chat
+/unwatch - Stop following a game
+/tournament - Open a knockout tournament in this chat
+/enter - Enter this chat's tournament
+/begin - Start the tournament, organizer only
+/bracket - Show how the tournament is going
 /help - Show this help message
 """
     await update.message.reply_text(help_text, parse_mode='MarkdownV2')
\ No newline at end of file
@@ -1,5 +1,6 @@
+from typing import Optional
 from telegram import Update
-from telegram.ext import ContextTypes
+from telegram.ext import Application, ContextTypes
 from telegram.error import (
     TelegramError,
     Forbidden,
@@ -7,12 +8,20 @@ from telegram.error import (
     TimedOut,
     NetworkError
 )
+from src.config.settings import MESSAGES, GAME_TIMEOUT_SECONDS
+from src.utils.deadlines import DeadlineScheduler
+from src.bot.broadcast import get_broadcaster
+from src.bot.metrics import record_error
+from src.bot.outbox import get_outbox
+from src.bot.handlers.stats_handlers import record_result
+from src.games.store import get_store
 from src.utils.logger import logger
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle errors in the bot."""
     try:
         error = context.error
+        record_error(error)
         chat_id = update.effective_chat.id if update else None
 
         if isinstance(error, BadRequest) and "Button_type_invalid" in str(error):
@@ -34,26 +43,52 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     except Exception as e:
         logger.error(f"Error in error handler: {e}")
         
-async def timeout_handler(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle game timeouts."""
-    try:
-        games_to_remove = []
-        for chat_id, game in context.bot_data.get("games", {}).items():
-            if game.phase not in ["finished", "waiting"]:
-                winner = "O" if game.current_player == "X" else "X"
-                try:
-                    await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=f"⏰ Game timed out! Player {winner} ({game.player_names[winner]}) wins by default!"
-                    )
-                    games_to_remove.append(chat_id)
-                except TelegramError as e:
-                    logger.error(f"Error sending timeout message to chat {chat_id}: {e}")
-                    games_to_remove.append(chat_id)
-        
-        # Remove finished games
-        for chat_id in games_to_remove:
-            del context.bot_data["games"][chat_id]
-    
-    except Exception as e:
-        logger.error(f"Error in timeout handler: {e}")
\ No newline at end of file
+def create_timeout_scheduler(application: Application) -> DeadlineScheduler:
+    """
+    Build the per-game inactivity scheduler.
+
+    Each game, in play or still waiting for an opponent, expires at
+    last_action_time + GAME_TIMEOUT_SECONDS. Activity only moves
+    last_action_time; the scheduler notices the later deadline when the
+    old one comes due and re-arms itself.
+    """
+    def game_deadline(game_id: int) -> Optional[float]:
+        game = get_store(application).get(game_id)
+        if not game or game.phase == "finished":
+            return None
+        return game.last_action_time + GAME_TIMEOUT_SECONDS
+
+    async def expire(game_id: int) -> None:
+        await timeout_handler(application, game_id)
+
+    return DeadlineScheduler(game_deadline, expire)
+
+def schedule_timeout(context: ContextTypes.DEFAULT_TYPE, game_id: int) -> None:
+    """Start watching a game for inactivity (call when a game starts)."""
+    scheduler = context.bot_data.get("timeouts")
+    if scheduler is not None:
+        scheduler.schedule(game_id)
+
+async def timeout_handler(application: Application, game_id: int) -> None:
+    """
+    End a game whose current player has been inactive for too long, or
+    that nobody joined in time. A game nobody joined has no result.
+    """
+    game = get_store(application).remove(game_id)
+    if game is None:
+        return
+    if game.phase == "waiting":
+        get_broadcaster(application).end(game, timed_out=True)
+        get_outbox(application).send_message(game.chat_id, MESSAGES['waiting_expired'])
+        return
+    record_result(application, game, timed_out=True)
+
+    winner = "O" if game.current_player == "X" else "X"
+    get_outbox(application).send_message(
+        game.chat_id,
+        MESSAGES['timeout_win'].format(
+            winner=winner,
+            winner_name=game.player_names[winner],
+            loser=game.current_player
+        )
+    )
@@ -0,0 +1,200 @@
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+from telegram import Update, User
+from telegram.ext import Application, ContextTypes
+from src.bot.handlers.error_handlers import schedule_timeout
+from src.bot.keyboards.game_keyboard import create_board_keyboard, create_match_keyboard
+from src.bot.metrics import MATCH_PASS_SECONDS, MATCH_WAIT_SECONDS
+from src.bot.outbox import get_outbox
+from src.cluster.link import get_cluster
+from src.config.settings import (
+    DEFAULT_RATING, MATCH_BASE_WINDOW, MATCH_WINDOW_STEP, MATCH_MAX_WINDOW,
+    MATCH_WIDEN_SECONDS, MATCH_INTERVAL, MESSAGES
+)
+from src.games.matchmaking import Match, Matchmaker, get_matchmaker
+from src.games.stats import get_stats
+from src.games.store import get_store
+from src.utils.logger import logger
+
+_matched_waits = MATCH_WAIT_SECONDS.labels("matched")
+_cancelled_waits = MATCH_WAIT_SECONDS.labels("cancelled")
+
+
+def create_matchmaker() -> Matchmaker:
+    return Matchmaker(
+        base_window=MATCH_BASE_WINDOW,
+        window_step=MATCH_WINDOW_STEP,
+        max_window=MATCH_MAX_WINDOW,
+        widen_every=MATCH_WIDEN_SECONDS,
+    )
+
+
+def player_rating(context, user_id: int) -> float:
+    """Rating the matchmaker pairs user_id by"""
+    player = get_stats(context).get(user_id)
+    return player.rating if player is not None else DEFAULT_RATING
+
+
+async def player_ratings(context, user_ids: Iterable[int]) -> Dict[int, float]:
+    """
+    Ratings of user_ids, as player_rating gives them. On a worker whose
+    cluster keeps the stats elsewhere they are fetched from there.
+    """
+    user_ids = list(user_ids)
+    cluster = get_cluster(context)
+    if cluster is None or cluster.services:
+        return {user_id: player_rating(context, user_id) for user_id in user_ids}
+    try:
+        found = await cluster.ratings(user_ids)
+    except asyncio.TimeoutError:
+        logger.warning(f"No ratings for {len(user_ids)} players from the stats worker; using the default")
+        found = {}
+    return {user_id: found.get(user_id, DEFAULT_RATING) for user_id in user_ids}
+
+
+def _is_free(context, user_id: int) -> bool:
+    """True if user_id is in no game, or only in an open one they started"""
+    game = get_store(context).for_player(user_id)
+    if game is not None:
+        return game.phase == "waiting" and game.players["X"] == user_id
+    # A worker only holds its own chats' games; the others report their seats
+    cluster = get_cluster(context)
+    return cluster is None or cluster.phase_elsewhere(user_id) in (None, "waiting")
+
+
+def drop_open_game(context, user_id: int) -> None:
+    """Remove the open game user_id started, if they have one here."""
+    store = get_store(context)
+    game = store.for_player(user_id)
+    if game is not None and game.phase == "waiting" and game.players["X"] == user_id:
+        store.remove(game.game_id)
+
+
+def join_queue(context, chat_id: int, user: User) -> Optional[str]:
+    """
+    Put user in the matchmaking queue from chat_id.
+
+    Returns:
+        Text to tell the user, or None if they were paired straight away
+    """
+    matchmaker = get_matchmaker(context)
+    if user.id in matchmaker:
+        return MESSAGES['queue_already']
+    if not _is_free(context, user.id):
+        return MESSAGES['queue_busy']
+    match = matchmaker.enqueue(user.id, chat_id, user.first_name, player_rating(context, user.id))
+    logger.info(
+        "User %s queued for a match from chat %s", user.id, chat_id,
+        extra={"event": "queue", "chat_id": chat_id, "user_id": user.id}
+    )
+    if match is None:
+        return MESSAGES['queue_joined']
+    dispatch_match(context, match)
+    return None
+
+
+def dispatch_match(context, match: Match) -> None:
+    """
+    Start the game for a match, here or, in a cluster, on the worker that
+    owns the host's chat (the supervisor passes the match on).
+    """
+    for wait in match.waits():
+        _matched_waits.observe(wait)
+    cluster = get_cluster(context)
+    if cluster is None:
+        start_matched_game(context, match)
+    else:
+        cluster.send("match", match)
+
+
+def start_matched_game(context, match: Match, busy: Iterable[int] = ()) -> None:
+    """
+    Start the game for a match.
+
+    The game is hosted in the chat of the player who waited longest. When
+    both queued from that chat it is played on the board posted there;
+    otherwise each player is sent a button to play it in the WebApp, as
+    the guest can't use a board in someone else's chat. An open game the
+    host had started in the host chat is used for it; other open games of
+    either player are dropped.
+
+    Args:
+        busy: Players the cluster knows to be in a game on another worker
+    """
+    outbox = get_outbox(context)
+    store = get_store(context)
+    host, guest = match.first, match.second
+    if busy or not (_is_free(context, host.user_id) and _is_free(context, guest.user_id)):
+        # One of them started playing somewhere else while queued
+        logger.warning(f"Match of users {host.user_id} and {guest.user_id} is no longer possible")
+        for ticket in (host, guest):
+            outbox.send_message(ticket.chat_id, "Your match couldn't start. Use /queue to try again.")
+        return
+
+    on_board = guest.chat_id == host.chat_id
+    drop_open_game(context, guest.user_id)
+    game = store.for_player(host.user_id)
+    if game is not None and not (on_board and game.chat_id == host.chat_id):
+        store.remove(game.game_id)
+        game = None
+    if game is None:
+        game = store.create(host.chat_id, host.user_id, host.name)
+    store.join(game, guest.user_id, guest.name)
+    game.update_last_action_time()
+    schedule_timeout(context, game.game_id)
+    if on_board:
+        outbox.send_message(
+            host.chat_id,
+            f"Match found!\n"
+            f"Player X: {game.player_names['X']}\n"
+            f"Player O: {game.player_names['O']}\n"
+            f"Player X's turn (Placement phase: 0/4 pieces placed)",
+            reply_markup=create_board_keyboard(game)
+        )
+    else:
+        for ticket, symbol, opponent in ((host, "X", guest), (guest, "O", host)):
+            outbox.send_message(
+                ticket.user_id,
+                f"Match found! You play {opponent.name} as {symbol}.",
+                reply_markup=create_match_keyboard()
+            )
+    logger.info(
+        "Matched users %s and %s in chat %s", host.user_id, guest.user_id, host.chat_id,
+        extra={"event": "match", "chat_id": host.chat_id}
+    )
+
+
+async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /queue - find an opponent from any chat"""
+    try:
+        text = join_queue(context, update.effective_chat.id, update.effective_user)
+        if text:
+            await update.effective_message.reply_text(text)
+    except Exception as e:
+        logger.error(f"Error joining the queue: {e}")
+
+
+async def leave_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /leave - stop looking for an opponent"""
+    ticket = get_matchmaker(context).cancel(update.effective_user.id)
+    if ticket is None:
+        await update.effective_message.reply_text(MESSAGES['queue_not_in'])
+        return
+    _cancelled_waits.observe(time.monotonic() - ticket.enqueued)
+    await update.effective_message.reply_text(MESSAGES['queue_left'])
+
+
+async def run_matchmaking(application: Application, interval: float = MATCH_INTERVAL) -> None:
+    """Pair players whose search windows have widened, every interval seconds."""
+    matchmaker = get_matchmaker(application)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            started = time.perf_counter()
+            matches = matchmaker.match_pass()
+            MATCH_PASS_SECONDS.observe(time.perf_counter() - started)
+            for match in matches:
+                dispatch_match(application, match)
+        except Exception as e:
+            logger.error(f"Error in matchmaking pass: {e}")
@@ -0,0 +1,54 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+from src.bot.broadcast import get_broadcaster
+from src.config.settings import MESSAGES
+from src.games.store import get_store
+from src.utils.logger import logger
+
+
+def watch_game(context, chat_id: int, user_id: int) -> str:
+    """
+    Subscribe user_id to a game in chat_id: the newest one being played,
+    or the newest waiting for a player if none is.
+
+    Returns:
+        Text to tell the user
+    """
+    store = get_store(context)
+    own = store.for_player(user_id)
+    if own is not None and own.chat_id == chat_id:
+        return MESSAGES['watch_own_game']
+    games = store.in_chat(chat_id)
+    if not games:
+        return MESSAGES['no_game_exists']
+    playing = [game for game in games if game.player_o is not None]
+    game = (playing or games)[-1]
+    if not get_broadcaster(context).watch(game, user_id):
+        return MESSAGES['watch_full']
+    logger.info(
+        "User %s watching game %s in chat %s", user_id, game.game_id, chat_id,
+        extra={"event": "watch", "chat_id": chat_id, "game_id": game.game_id, "user_id": user_id}
+    )
+    return MESSAGES['watching']
+
+
+def unwatch_game(context, user_id: int) -> str:
+    """Stop sending user_id game states; returns text to tell them."""
+    if get_broadcaster(context).unwatch(user_id) is None:
+        return MESSAGES['not_watching']
+    return MESSAGES['unwatched']
+
+
+async def watch_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /watch - follow this chat's game in a private chat"""
+    try:
+        await update.effective_message.reply_text(
+            watch_game(context, update.effective_chat.id, update.effective_user.id)
+        )
+    except Exception as e:
+        logger.error(f"Error starting to watch: {e}")
+
+
+async def unwatch_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /unwatch - stop following a game"""
+    await update.effective_message.reply_text(unwatch_game(context, update.effective_user.id))
@@ -0,0 +1,109 @@
+from typing import Optional
+from telegram import Update
+from telegram.ext import ContextTypes
+from src.bot.broadcast import get_broadcaster
+from src.config.settings import LEADERBOARD_SIZE, MESSAGES
+from src.games.models.game_state import GameState
+from src.games.replays import get_replays, replay_from_game
+from src.games.stats import GameResult, PlayerStats, get_stats
+from src.utils.logger import logger
+
+# Longest /top a user can ask for
+MAX_TOP = 50
+
+
+def record_result(context, game: GameState, timed_out: bool = False) -> None:
+    """
+    Add a finished game to the players' statistics and the replay archive,
+    send its spectators the final state, and if it was a tournament match
+    put the winner through.
+
+    Call before the game is removed from the store: on a win, or with
+    timed_out when the player to move was inactive too long. Games nobody
+    joined are not recorded, and games against the computer are archived
+    but not counted in the statistics.
+    """
+    get_broadcaster(context).end(game, timed_out)
+    tournaments = context.bot_data.get("tournaments")
+    if tournaments is not None and tournaments.playing(game.game_id):
+        # Imported here: starting the next match needs the timeout handlers, which import this module
+        from src.bot.handlers.tournament_handlers import on_game_over
+        try:
+            on_game_over(context, game, timed_out)
+        except Exception as e:
+            logger.error(f"Error advancing tournament in chat {game.chat_id}: {e}")
+    if game.player_o is None:
+        return
+    replays = get_replays(context)
+    if replays is not None:
+        try:
+            replays.append(replay_from_game(game, timed_out))
+        except Exception as e:
+            logger.error(f"Error archiving game in chat {game.chat_id}: {e}")
+    if game.bot_player is not None:
+        return
+    winner = ("O" if game.current_player == "X" else "X") if timed_out else game.winner
+    if winner is None:
+        return
+    loser = "O" if winner == "X" else "X"
+    # X moves first and the players alternate
+    moves = len(game.moves)
+    try:
+        get_stats(context).record(GameResult(
+            game.chat_id, game.players[winner], game.players[loser],
+            (moves + 1) // 2 if winner == "X" else moves // 2, timed_out,
+            game.player_names[winner], game.player_names[loser],
+        ))
+    except Exception as e:
+        logger.error(f"Error recording result of game in chat {game.chat_id}: {e}")
+
+
+def _describe(player: PlayerStats) -> str:
+    average = player.average_moves_to_win
+    return (
+        f"{player.rating:.0f} · {player.wins}W {player.losses}L"
+        + (f" ({player.timeouts} timeouts)" if player.timeouts else "")
+        + (f" · {average:.1f} moves/win" if average is not None else "")
+    )
+
+
+async def rank_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /rank - show the user's rating, place and record"""
+    stats = get_stats(context)
+    user_id = update.effective_user.id
+    player = stats.get(user_id)
+    if player is None:
+        await update.effective_message.reply_text(MESSAGES['no_stats'])
+        return
+    await update.effective_message.reply_text(
+        f"{player.name or update.effective_user.first_name}: #{stats.rank(user_id)} of {len(stats)}\n"
+        f"{_describe(player)}"
+    )
+
+
+async def top_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Handle /top [n] - show the highest rated players"""
+    try:
+        count = int(context.args[0]) if context.args else LEADERBOARD_SIZE
+    except ValueError:
+        await update.effective_message.reply_text("Usage: /top [count]")
+        return "invalid"
+    players = get_stats(context).top(max(1, min(count, MAX_TOP)))
+    if not players:
+        await update.effective_message.reply_text(MESSAGES['no_stats'])
+        return None
+    lines = [f"{place}. {player.name or player.user_id} - {_describe(player)}"
+             for place, player in enumerate(players, 1)]
+    await update.effective_message.reply_text("🏆 Top players\n" + "\n".join(lines))
+    return None
+
+
+async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /leaderboard - show who has won most games in this chat"""
+    board = get_stats(context).chat_top(update.effective_chat.id, LEADERBOARD_SIZE)
+    if not board:
+        await update.effective_message.reply_text(MESSAGES['no_chat_stats'])
+        return
+    lines = [f"{place}. {player.name or player.user_id} - {wins} wins (rating {player.rating:.0f})"
+             for place, (player, wins) in enumerate(board, 1)]
+    await update.effective_message.reply_text("🏆 This chat's leaderboard\n" + "\n".join(lines))
@@ -0,0 +1,194 @@
+from typing import Iterable, Optional
+from telegram import Update
+from telegram.ext import ContextTypes
+from src.bot.handlers.error_handlers import schedule_timeout
+from src.bot.handlers.matchmaking_handlers import player_ratings
+from src.bot.keyboards.game_keyboard import create_match_keyboard
+from src.bot.outbox import get_outbox
+from src.config.settings import MESSAGES, TOURNAMENT_MAX_PLAYERS
+from src.games.models.game_state import GameState
+from src.games.store import get_store
+from src.games.tournament import Tournament, get_tournaments
+from src.utils.logger import logger
+
+
+def _in_game(store, user_id: int) -> bool:
+    """True if user_id is in a game that has started and isn't over"""
+    game = store.for_player(user_id)
+    return game is not None and game.phase not in ("waiting", "finished")
+
+
+def start_matches(context, tournament: Tournament, nodes: Iterable[int]) -> None:
+    """
+    Start a game for each bracket match in nodes.
+
+    Games are hosted in the tournament's chat but played in the WebApp;
+    each player is sent their match privately, and the chat only hears
+    when a round is over. A player still in another game when their match
+    is due forfeits it (if both are, X goes through), and whatever match
+    that makes ready is started in the same pass.
+    """
+    store = get_store(context)
+    outbox = get_outbox(context)
+    tournaments = get_tournaments(context)
+    bracket = tournament.bracket
+    pending = list(nodes)
+    while pending:
+        node = pending.pop()
+        x, o = bracket.players(node)
+        busy = [player for player in (x, o) if _in_game(store, player)]
+        if busy:
+            winner = o if busy == [x] else x
+            loser = x if winner == o else o
+            outbox.send_message(
+                tournament.chat_id,
+                f"{tournament.name(loser)} is still in another game and forfeits to {tournament.name(winner)}."
+            )
+            next_node = bracket.report(node, winner)
+            if next_node is not None:
+                pending.append(next_node)
+            continue
+
+        # An open game either player started would let someone seat them twice
+        for player in (x, o):
+            waiting = store.for_player(player)
+            if waiting is not None and waiting.phase == "waiting":
+                store.remove(waiting.game_id)
+        game = store.create(tournament.chat_id, x, tournament.name(x))
+        store.join(game, o, tournament.name(o))
+        game.update_last_action_time()
+        schedule_timeout(context, game.game_id)
+        tournaments.track(tournament, game.game_id, node)
+
+        round_ = bracket.round_of(node)
+        stage = "the final" if round_ == bracket.rounds else f"round {round_} of {bracket.rounds}"
+        for player, symbol, opponent in ((x, "X", o), (o, "O", x)):
+            outbox.send_message(
+                player,
+                f"🏆 Your tournament match, {stage}: you play {tournament.name(opponent)} as {symbol}.",
+                reply_markup=create_match_keyboard()
+            )
+    _announce(context, tournament)
+
+
+def _announce(context, tournament: Tournament) -> None:
+    """Tell the chat about every round that has finished since the last announcement."""
+    bracket = tournament.bracket
+    outbox = get_outbox(context)
+    while tournament.announced < bracket.rounds and bracket.left(tournament.announced + 1) == 0:
+        tournament.announced += 1
+        if tournament.announced < bracket.rounds:
+            outbox.send_message(
+                tournament.chat_id,
+                f"🏆 Round {tournament.announced} of {bracket.rounds} is over: "
+                f"{bracket.remaining} players left. /bracket shows the standings."
+            )
+            continue
+        champion = bracket.champion
+        outbox.send_message(tournament.chat_id, f"🏆 {tournament.name(champion)} wins the tournament!")
+        get_tournaments(context).close(tournament.chat_id)
+        logger.info(
+            "Tournament in chat %s won by user %s", tournament.chat_id, champion,
+            extra={"event": "tournament_over", "chat_id": tournament.chat_id, "user_id": champion}
+        )
+
+
+def on_game_over(context, game: GameState, timed_out: bool = False) -> None:
+    """Put the winner of a tournament game through to their next match."""
+    found = get_tournaments(context).finish(game.game_id)
+    if found is None:
+        return
+    tournament, node = found
+    symbol = ("O" if game.current_player == "X" else "X") if timed_out else (game.winner or "X")
+    next_node = tournament.bracket.report(node, game.players[symbol])
+    start_matches(context, tournament, [next_node] if next_node is not None else [])
+
+
+async def tournament_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /tournament - open registration for a knockout tournament in this chat"""
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    if get_tournaments(context).open(chat_id, user_id) is None:
+        await update.effective_message.reply_text(MESSAGES['tournament_exists'])
+        return
+    logger.info(
+        "User %s opened a tournament in chat %s", user_id, chat_id,
+        extra={"event": "tournament_open", "chat_id": chat_id, "user_id": user_id}
+    )
+    await update.effective_message.reply_text(MESSAGES['tournament_open'])
+
+
+async def enter_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /enter - take part in this chat's tournament"""
+    tournament = get_tournaments(context).get(update.effective_chat.id)
+    user = update.effective_user
+    if tournament is None:
+        text = MESSAGES['no_tournament']
+    elif tournament.state != "open":
+        text = MESSAGES['tournament_started']
+    elif user.id in tournament.entrants:
+        text = MESSAGES['tournament_entered_already']
+    elif len(tournament.entrants) >= TOURNAMENT_MAX_PLAYERS:
+        text = MESSAGES['tournament_full']
+    else:
+        tournament.entrants[user.id] = user.first_name
+        text = f"{user.first_name} entered the tournament ({len(tournament.entrants)} players)."
+    await update.effective_message.reply_text(text)
+
+
+async def begin_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Handle /begin - close registration, seed the bracket by rating and start round one"""
+    tournament = get_tournaments(context).get(update.effective_chat.id)
+    if tournament is None or tournament.state != "open":
+        await update.effective_message.reply_text(
+            MESSAGES['no_tournament'] if tournament is None else MESSAGES['tournament_started']
+        )
+        return "invalid"
+    if update.effective_user.id != tournament.organizer:
+        await update.effective_message.reply_text(MESSAGES['tournament_organizer_only'])
+        return "invalid"
+    if len(tournament.entrants) < 2:
+        await update.effective_message.reply_text(MESSAGES['tournament_too_few'])
+        return "invalid"
+
+    try:
+        ratings = await player_ratings(context, tournament.entrants)
+        bracket = tournament.begin(ratings.__getitem__)
+        await update.effective_message.reply_text(
+            f"🏆 The tournament has begun: {bracket.entrants} players, {bracket.rounds} rounds. "
+            f"Your matches will come in a private chat with me."
+        )
+        logger.info(
+            "Tournament in chat %s started with %s players", tournament.chat_id, bracket.entrants,
+            extra={"event": "tournament_begin", "chat_id": tournament.chat_id}
+        )
+        start_matches(context, tournament, bracket.ready)
+    except Exception as e:
+        logger.error(f"Error starting tournament in chat {tournament.chat_id}: {e}")
+        return "error"
+    return None
+
+
+async def bracket_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /bracket - show how this chat's tournament is going"""
+    tournament = get_tournaments(context).get(update.effective_chat.id)
+    if tournament is None:
+        await update.effective_message.reply_text(MESSAGES['no_tournament'])
+        return
+    bracket = tournament.bracket
+    if bracket is None:
+        await update.effective_message.reply_text(
+            f"🏆 Registration is open: {len(tournament.entrants)} players so far. /enter to take part."
+        )
+        return
+    round_ = tournament.announced + 1
+    lines = [
+        f"🏆 Round {round_} of {bracket.rounds}: {bracket.left(round_)} matches to go, "
+        f"{bracket.remaining} players left, {len(tournament.games)} games in play."
+    ]
+    user_id = update.effective_user.id
+    game = get_store(context).for_player(user_id)
+    if game is not None and game.game_id in tournament.games:
+        opponent = game.players["O" if game.players["X"] == user_id else "X"]
+        lines.append(f"You're playing {tournament.name(opponent)}.")
+    await update.effective_message.reply_text("\n".join(lines))
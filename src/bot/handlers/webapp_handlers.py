@@ -1,109 +1,246 @@
 # src/bot/handlers/webapp_handlers.py
+from typing import Dict, Iterable, Optional
 from telegram import Update
 from telegram.ext import ContextTypes
+from src.config.settings import MESSAGES, WEBAPP_DELTA_UPDATES, WEBAPP_PACKED_BOARD
 from src.utils.logger import logger
+from src.utils.tracing import span
+from src.bot.webapp_protocol import ProtocolError, parse_webapp_data
+from src.bot.broadcast import get_broadcaster
+from src.bot.outbox import MOVE, get_outbox
 from src.games.models.game_state import GameState
-from src.games.logic.game_logic import check_winner, find_winning_pattern
+from src.bot.handlers.bot_opponent import add_bot_opponent, is_bot_turn, take_bot_turn
+from src.bot.handlers.error_handlers import schedule_timeout
+from src.bot.handlers.spectator_handlers import unwatch_game, watch_game
+from src.bot.handlers.stats_handlers import record_result
+from src.games.store import get_store
 import json
 
-async def send_game_update(context: ContextTypes.DEFAULT_TYPE, chat_id: int, game: GameState) -> None:
-    """Send game state update to all players"""
-    game_state = game.to_dict()
-    
-    # Send update to both players
-    for player_symbol in ["X", "O"]:
-        player_id = game.players[player_symbol]
-        if player_id:
-            try:
-                await context.bot.send_message(
-                    chat_id=player_id,
-                    text=json.dumps({
-                        "type": "gameUpdate",
-                        "state": game_state
-                    })
-                )
-            except Exception as e:
-                logger.error(f"Error sending update to player {player_id}: {e}")
+def move_delta(game: GameState, player: str, phase_before: str, position: int, selected: Optional[int]) -> dict:
+    """
+    Describe a move as the fields it changed, for clients at game.version - 1.
+
+    Args:
+        game: Game after the move was applied
+        player: Symbol that moved
+        phase_before: Phase before the move
+        position: Target cell
+        selected: Source cell for a movement, None for a placement
+    """
+    cells = [[position, player]]
+    changes = {"cells": cells}
+    if selected is not None:
+        cells.append([selected, " "])
+    else:
+        changes["piecesPlaced"] = {"X": game.placed_x, "O": game.placed_o}
+    if game.current_player != player:
+        changes["currentPlayer"] = game.current_player
+    if game.phase != phase_before:
+        changes["phase"] = game.phase
+    if game.winner:
+        changes["winner"] = game.winner
+        changes["winningPattern"] = game.winning_pattern
+    return changes
+
+def _recipients(game: GameState) -> list:
+    """Human players of a game"""
+    return [
+        player_id for symbol, player_id in (("X", game.player_x), ("O", game.player_o))
+        if player_id and symbol != game.bot_player
+    ]
+
+def _state_key(player_id: int) -> tuple:
+    """Outbox key of the state messages to a player; a newer state replaces a waiting one"""
+    return ("state", player_id)
+
+def send_game_update(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: int,
+    game: GameState,
+    delta: Optional[Dict] = None,
+    recipients: Optional[Iterable[int]] = None
+) -> None:
+    """
+    Queue a game state update for all players.
+
+    The payload is serialized once and queued in the outbox for every
+    recipient with move priority. A state still waiting for a recipient is
+    replaced by the new one, and since the client would then miss the
+    delta it was waiting for, it gets the full state instead. With a delta
+    (see move_delta) only the changed fields go out; clients apply it if
+    they hold version - 1 and otherwise ask for a resync. Spectators are
+    sent the state separately, by the broadcaster.
+
+    Args:
+        delta: Changed fields of the last move, or None for the full state
+        recipients: Player ids to send to (default: both human players)
+    """
+    outbox = get_outbox(context)
+    targets = _recipients(game) if recipients is None else recipients
+    texts: Dict[bool, str] = {}
+
+    def render(full: bool) -> str:
+        text = texts.get(full)
+        if text is None:
+            with span("render"):
+                if full:
+                    payload = {"type": "gameUpdate", "version": game.version,
+                               "state": game.to_dict(WEBAPP_PACKED_BOARD)}
+                else:
+                    payload = {"type": "gameDelta", "version": game.version, "changes": delta}
+                text = texts[full] = json.dumps(payload, separators=(",", ":"))
+        return text
+
+    if recipients is None:
+        get_broadcaster(context).publish(game)
+    partial = delta is not None and WEBAPP_DELTA_UPDATES
+    for player_id in targets:
+        key = _state_key(player_id)
+        text = render(not partial or outbox.waiting(key))
+        outbox.enqueue(
+            player_id,
+            lambda player_id=player_id, text=text: context.bot.send_message(player_id, text),
+            MOVE,
+            key=key,
+        )
 
-async def handle_webapp_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle data received from the WebApp"""
+async def handle_webapp_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Handle data received from the WebApp; returns "invalid" or "error" for the metrics outcome"""
     try:
         chat_id = update.effective_chat.id
         user_id = update.effective_user.id
         user_name = update.effective_user.first_name
 
-        # Parse the data received from WebApp
+        # Parse and validate the data received from WebApp
         try:
-            data = json.loads(update.effective_message.web_app_data.data)
-            logger.info(f"Received WebApp data: {data}")
-        except json.JSONDecodeError as e:
-            logger.error(f"Invalid JSON data received: {e}")
-            return
+            with span("decode"):
+                message = parse_webapp_data(update.effective_message.web_app_data.data)
+        except ProtocolError as e:
+            logger.warning(
+                "Invalid WebApp data from user %s: %s", user_id, e,
+                extra={"event": "webapp", "chat_id": chat_id, "user_id": user_id}
+            )
+            return "invalid"
+        logger.debug(
+            "Received WebApp data: %s", message,
+            extra={"event": "webapp", "chat_id": chat_id, "user_id": user_id}
+        )
 
-        # Get or create game state
-        if "games" not in context.bot_data:
-            context.bot_data["games"] = {}
-        
-        game = context.bot_data["games"].get(chat_id)
+        # Spectating needs no game of one's own
+        if message.action in ("watch", "unwatch"):
+            if message.action == "watch":
+                text = watch_game(context, chat_id, user_id)
+            else:
+                text = unwatch_game(context, user_id)
+            await update.effective_message.reply_text(text)
+            return None
+
+        # The sender's own game, whichever chat the data came from; joining
+        # takes the chat's oldest open game or starts a new one
+        store = get_store(context)
+        action = message.action
+        with span("state_lookup"):
+            game = store.for_player(user_id)
+            if game is None and action == "join" and message.opponent != "bot":
+                game = store.open_game(chat_id, user_id)
         if not game:
-            game = GameState(chat_id)
-            context.bot_data["games"][chat_id] = game
-            game.players["X"] = user_id
-            game.player_names["X"] = user_name
+            if action != "join":
+                await update.effective_message.reply_text(MESSAGES['no_game_exists'])
+                return None
+            game = store.create(chat_id, user_id, user_name)
+        chat_id = game.chat_id
 
         # Handle different game actions
-        action = data.get("action")
-        
-        if action == "join":
+
+        if action == "join" and message.opponent == "bot":
+            if game.players["O"] is None and user_id == game.players["X"]:
+                add_bot_opponent(store, game, context.bot.id)
+                await update.effective_message.reply_text(
+                    f"{game.player_names['O']} joined as O!"
+                )
+                send_game_update(context, chat_id, game)
+
+        elif action == "join":
             if game.players["O"] is None and user_id != game.players["X"]:
-                game.players["O"] = user_id
-                game.player_names["O"] = user_name
-                game.phase = "placement"
+                store.join(game, user_id, user_name)
                 await update.effective_message.reply_text(
                     f"Player {user_name} joined as O!"
                 )
                 # Send initial game state to both players
-                await send_game_update(context, chat_id, game)
+                send_game_update(context, chat_id, game)
             
         elif action == "move":
             if user_id != game.players[game.current_player]:
-                logger.warning(f"Invalid move attempt by user {user_id}")
+                logger.warning(
+                    "Invalid move attempt by user %s", user_id,
+                    extra={"event": "webapp", "chat_id": chat_id, "user_id": user_id}
+                )
                 return
 
-            success = game.handle_webapp_move(
+            player, phase_before = game.current_player, game.phase
+            position, selected = message.position, message.selected
+            success = store.play(
+                game,
                 user_id=user_id,
-                position=data.get("position"),
-                selected=data.get("selected")
+                position=position,
+                selected=selected
             )
             
             if success:
-                # Check for winner
-                winner = check_winner(game.board)
-                if winner:
-                    game.phase = "finished"
-                    winning_pattern = find_winning_pattern(game.board)
-                    await send_game_update(context, chat_id, game)
+                delta = move_delta(game, player, phase_before, position, selected)
+                # Winner was checked incrementally when the move was applied
+                if game.winner:
+                    send_game_update(context, chat_id, game, delta)
                     await update.effective_message.reply_text(
                         f"🎉 Player {game.current_player} ({game.player_names[game.current_player]}) wins!"
                     )
-                    del context.bot_data["games"][chat_id]
+                    record_result(context, game)
+                    store.remove(game.game_id)
                     return
 
-                # Update game phase if needed
-                if game.phase == "placement" and all(v == 4 for v in game.pieces.values()):
-                    game.phase = "movement"
-                    game.current_player = "X"
-                else:
-                    game.current_player = "O" if game.current_player == "X" else "X"
-
                 # Send update to all players
-                await send_game_update(context, chat_id, game)
+                send_game_update(context, chat_id, game, delta)
+
+                if is_bot_turn(game):
+                    context.application.create_task(play_webapp_bot_turn(context, chat_id, game))
+
+        elif action == "sync":
+            # Client missed a version; send it the full state
+            send_game_update(context, chat_id, game, recipients=[user_id])
 
         game.update_last_action_time()
-        logger.info(f"Game action {action} processed successfully")
+        schedule_timeout(context, game.game_id)
+        logger.info(
+            "Game action %s processed successfully", action,
+            extra={"event": "webapp", "chat_id": chat_id, "user_id": user_id, "action": action}
+        )
 
     except Exception as e:
         logger.error(f"Error handling WebApp data: {e}")
         await update.effective_message.reply_text(
             "Sorry, there was an error processing your move. Please try again."
-        )
\ No newline at end of file
+        )
+        return "error"
+
+async def play_webapp_bot_turn(context: ContextTypes.DEFAULT_TYPE, chat_id: int, game: GameState) -> None:
+    """Make the computer's move and push the new state to the WebApp"""
+    try:
+        player, phase_before = game.current_player, game.phase
+        result = await take_bot_turn(context, chat_id, game)
+        if result is None:
+            return
+
+        delta = move_delta(game, player, phase_before, result.dst, result.src)
+        if game.winner:
+            send_game_update(context, chat_id, game, delta)
+            get_outbox(context).send_message(
+                chat_id, f"🎉 Player {game.winner} ({game.player_names[game.winner]}) wins!"
+            )
+            record_result(context, game)
+            get_store(context).remove(game.game_id)
+            return
+
+        send_game_update(context, chat_id, game, delta)
+
+    except Exception as e:
+        logger.error(f"Error in play_webapp_bot_turn: {e}")
@@ -1,45 +1,165 @@
-from typing import List, Optional, Tuple
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional, Tuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
-from src.config.settings import WEBAPP_URL
+from src.config.settings import WEBAPP_URL, KEYBOARD_CACHE_SIZE
+from src.games.logic.bitboard import Bitboard, BOARD_CELLS
+from src.games.logic.game_logic import Board
+from src.utils.tracing import span
+
+# Board buttons carry "<game id>.<version>.<cell>" in hex, so a click on a
+# keyboard from an earlier game or an earlier move can be turned away
+# without looking at the board. Boards drawn before this format used "row,col".
+_CELL_DATA = tuple(f".{cell:x}" for cell in range(BOARD_CELLS))
+
+
+def parse_cell_data(data: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Decode board button callback_data.
+
+    Returns:
+        (game id, version, cell), or None if data is not a board button or
+        names a cell that isn't on the board
+    """
+    parts = data.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        cell = int(parts[2], 16)
+        if not 0 <= cell < BOARD_CELLS:
+            return None
+        return int(parts[0], 16), int(parts[1], 16), cell
+    except ValueError:
+        return None
+
+
+class KeyboardCache:
+    """
+    Bounded LRU cache of keyboard button texts.
+
+    The texts depend only on the pieces, the highlighted cell and the
+    winning cells, which a handful of openings share across every game.
+    The callback data names the game and version, so the buttons
+    themselves are built per call.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Hashable, Tuple[str, ...]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, build: Callable[[], Tuple[str, ...]]) -> Tuple[str, ...]:
+        entries = self._entries
+        texts = entries.get(key)
+        if texts is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return texts
+        self.misses += 1
+        texts = entries[key] = build()
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+        return texts
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+keyboard_cache = KeyboardCache(KEYBOARD_CACHE_SIZE)
+
+
+def _cell_text(cell: str, highlighted: bool, winning: bool) -> str:
+    if winning:
+        return f"🏆{cell}🏆"
+    if highlighted:
+        return f"[{cell}]" if cell != " " else "[·]"
+    return cell if cell != " " else "·"
+
+
+def _render(x: int, o: int, highlight: int, win_mask: int) -> Tuple[str, ...]:
+    texts = []
+    for cell in range(BOARD_CELLS):
+        bit = 1 << cell
+        symbol = "X" if x & bit else "O" if o & bit else " "
+        texts.append(_cell_text(symbol, cell == highlight, bool(win_mask & bit)))
+    return tuple(texts)
+
 
 def create_keyboard_with_highlight(
-    board: List[List[str]],
-    highlight_pos: Optional[Tuple[int, int]] = None,
-    winning_pattern: Optional[List[Tuple[int, int]]] = None
+    board: Board,
+    highlight_pos: Optional[Tuple[int, int]],
+    winning_pattern: Optional[List[Tuple[int, int]]],
+    *,
+    game_id: int,
+    version: int
 ) -> InlineKeyboardMarkup:
     """
     Create an inline keyboard representing the game board.
-    
+
+    Button texts are cached by (board, highlighted cell, winning cells), so
+    only the callback data, which names the game and version, is new for a
+    board that any game has shown before.
+
     Args:
-        board: The current game board state
+        board: The current game board (Bitboard or list of lists)
         highlight_pos: Position to highlight (selected piece)
         winning_pattern: List of positions in winning pattern
-    
+        game_id: Id of the game the board belongs to
+        version: Game version the board shows
+
     Returns:
         InlineKeyboardMarkup: The formatted keyboard
     """
-    keyboard = []
-    for i, row in enumerate(board):
-        keyboard_row = []
-        for j, cell in enumerate(row):
-            if winning_pattern and (i, j) in winning_pattern:
-                button_text = f"🏆{cell}🏆"
-            elif (i, j) == highlight_pos:
-                button_text = f"[{cell}]" if cell != " " else "[·]"
-            else:
-                button_text = cell if cell != " " else "·"
-            keyboard_row.append(
-                InlineKeyboardButton(button_text, callback_data=f"{i},{j}")
-            )
-        keyboard.append(keyboard_row)
-    return InlineKeyboardMarkup(keyboard)
+    if not isinstance(board, Bitboard):
+        board = Bitboard.from_lists(board)
+    highlight = -1 if highlight_pos is None else highlight_pos[0] * 4 + highlight_pos[1]
+    win_mask = 0
+    for i, j in winning_pattern or ():
+        win_mask |= 1 << (i * 4 + j)
+    x, o = board.x, board.o
+    texts = keyboard_cache.get((x, o, highlight, win_mask), lambda: _render(x, o, highlight, win_mask))
+    prefix = f"{game_id:x}.{version:x}"
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(texts[cell], callback_data=prefix + _CELL_DATA[cell]) for cell in range(row, row + 4)]
+        for row in range(0, BOARD_CELLS, 4)
+    ])
+
+
+def create_board_keyboard(
+    game,
+    highlight_pos: Optional[Tuple[int, int]] = None,
+    winning_pattern: Optional[List[Tuple[int, int]]] = None
+) -> InlineKeyboardMarkup:
+    """Keyboard for game's current board, tagged with its id and version"""
+    with span("render"):
+        return create_keyboard_with_highlight(
+            game.board, highlight_pos, winning_pattern, game_id=game.game_id, version=game.version
+        )
 
 
 def create_game_start_keyboard():
     web_app = WebAppInfo(url=WEBAPP_URL)
     keyboard = [
         [InlineKeyboardButton("Play 4x4 Tic-Tac-Toe", web_app=web_app)],
-        [InlineKeyboardButton("Join Game", callback_data="join_game")]
+        [InlineKeyboardButton("Join Game", callback_data="join_game")],
+        [InlineKeyboardButton("Play vs Bot", callback_data="join_bot")],
+        [InlineKeyboardButton("Find an Opponent", callback_data="queue")]
     ]
-    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
+    return InlineKeyboardMarkup(keyboard)
+
+
+def create_match_keyboard():
+    """Button that opens the WebApp on the player's current game"""
+    return InlineKeyboardMarkup([[InlineKeyboardButton("🎮 Play your match", web_app=WebAppInfo(url=WEBAPP_URL))]])
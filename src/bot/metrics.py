@@ -0,0 +1,242 @@
+import asyncio
+import functools
+import time
+from http import HTTPStatus
+from typing import Awaitable, Callable, Optional, Tuple
+
+from telegram.error import TelegramError
+from telegram.ext import Application
+from telegram.request import BaseRequest, RequestData
+
+from src.config.settings import SLOW_UPDATE_MS, TRACE_UPDATES
+from src.bot.keyboards.game_keyboard import keyboard_cache
+from src.bot.sequencer import ChatSequencer
+from src.games.stats import StatsStore
+from src.utils.httpserver import HttpServer
+from src.utils.logger import logger
+from src.utils.metrics import REGISTRY
+from src.utils.tracing import Trace, current_trace
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    "bot_handler_seconds", "Time spent in update handlers", ["handler", "outcome"]
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "bot_update_stage_seconds", "Time per update spent in each traced stage", ["stage"]
+)
+API_SECONDS = REGISTRY.histogram(
+    "telegram_api_request_seconds", "Bot API call latency", ["method", "outcome"]
+)
+UPDATE_ERRORS = REGISTRY.counter(
+    "bot_update_errors_total", "Errors that reached the error handler, by class", ["error"]
+)
+MATCH_WAIT_SECONDS = REGISTRY.histogram(
+    "bot_matchmaking_wait_seconds", "Time players spent in the matchmaking queue", ["outcome"],
+    buckets=(1, 5, 10, 20, 30, 60, 120, 300, 600, 1800)
+)
+MATCH_PASS_SECONDS = REGISTRY.histogram(
+    "bot_matchmaking_pass_seconds", "Duration of a matchmaking pass",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+)
+LOOP_LAG = REGISTRY.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+# Bot API status codes worth telling apart; anything else is "http_<code>"
+_API_OUTCOMES = {200: "ok", 400: "bad_request", 401: "unauthorized", 403: "forbidden",
+                 404: "not_found", 409: "conflict", 429: "retry_after", 502: "bad_gateway"}
+
+
+def timed_handler(name: str, callback: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    """
+    Wrap a handler callback to record its latency by outcome and trace it.
+
+    The outcome is the string the callback returns (e.g. "stale"), "ok" if
+    it returns anything else, or "error" if it raises. With TRACE_UPDATES
+    the call runs under a Trace that span()s in the pipeline add their
+    stage timings to; updates slower than SLOW_UPDATE_MS are logged with
+    the breakdown.
+    """
+    series = {}
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        trace = Trace(name) if TRACE_UPDATES else None
+        token = current_trace.set(trace)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await callback(update, context)
+            outcome = result if isinstance(result, str) else "ok"
+            return result
+        finally:
+            current_trace.reset(token)
+            elapsed = time.perf_counter() - started
+            histogram = series.get(outcome)
+            if histogram is None:
+                histogram = series[outcome] = HANDLER_SECONDS.labels(name, outcome)
+            histogram.observe(elapsed)
+            if trace is not None:
+                _finish_trace(trace, update, outcome, elapsed)
+    return wrapper
+
+
+def _finish_trace(trace: Trace, update, outcome: str, elapsed: float) -> None:
+    trace.finish()
+    for stage, seconds in trace.stages.items():
+        STAGE_SECONDS.labels(stage).observe(seconds)
+    if elapsed * 1000 >= SLOW_UPDATE_MS:
+        chat = getattr(update, "effective_chat", None)
+        logger.warning(
+            "Slow update: %s took %.1f ms (%s)", trace.name, elapsed * 1000, outcome,
+            extra={"event": "slow_update", "chat_id": chat.id if chat else None,
+                   "handler": trace.name, "stages_ms": trace.summary()}
+        )
+
+
+def record_error(error: BaseException) -> None:
+    """Count an error seen by the error handler by its class."""
+    UPDATE_ERRORS.labels(type(error).__name__).inc()
+
+
+class InstrumentedRequest(BaseRequest):
+    """Bot API transport wrapper that times every call by method and outcome."""
+
+    def __init__(self, inner: BaseRequest):
+        self.inner = inner
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self.inner.read_timeout
+
+    async def initialize(self) -> None:
+        await self.inner.initialize()
+
+    async def shutdown(self) -> None:
+        await self.inner.shutdown()
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            code, payload = await self.inner.do_request(
+                url, method, request_data, read_timeout, write_timeout, connect_timeout, pool_timeout
+            )
+            outcome = _API_OUTCOMES.get(code) or f"http_{code}"
+            return code, payload
+        except TelegramError as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            API_SECONDS.labels(url.rsplit("/", 1)[-1], outcome).observe(elapsed)
+            # Calls a handler awaits (answers, replies) count as its send stage
+            trace = current_trace.get()
+            if trace is not None:
+                trace.add("send", elapsed)
+
+
+async def monitor_loop_lag(interval: float = 0.5) -> None:
+    """Record how much later than asked the loop wakes a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
+
+
+def application_collector(application: Application):
+    """Scrape-time readings of state kept by the application's components."""
+    def collect():
+        bot_data = application.bot_data
+        store = bot_data.get("store")
+        if store is not None:
+            yield ("bot_games", "gauge", "Games in memory by phase",
+                   [({"phase": phase}, count) for phase, count in sorted(store.phase_counts().items())])
+        timeouts = bot_data.get("timeouts")
+        if timeouts is not None:
+            yield ("bot_game_timeouts_total", "counter", "Games ended by the inactivity timeout",
+                   [({}, timeouts.expired)])
+            yield ("bot_game_timeouts_pending", "gauge", "Games watched for inactivity", [({}, len(timeouts))])
+        outbox = bot_data.get("outbox")
+        if outbox is not None:
+            stats = outbox.stats()
+            yield ("bot_outbox_queued", "gauge", "Outbound calls waiting",
+                   [({"queue": "ready"}, stats["queue_depth"]), ({"queue": "delayed"}, stats["delayed"])])
+            yield ("bot_outbox_calls_total", "counter", "Outbound calls by result",
+                   [({"result": key}, stats[key]) for key in ("sent", "coalesced", "dropped", "retried", "failed")])
+            yield ("bot_outbox_delay_max_seconds", "gauge", "Longest wait before an outbound call was sent",
+                   [({}, stats["delay_max"])])
+        broadcaster = bot_data.get("broadcaster")
+        if broadcaster is not None:
+            stats = broadcaster.stats()
+            yield ("bot_spectators", "gauge", "Users watching a game", [({}, stats["spectators"])])
+            yield ("bot_spectated_games", "gauge", "Games with at least one spectator", [({}, stats["games"])])
+            yield ("bot_spectator_broadcasts_total", "counter", "Game states fanned out to spectators",
+                   [({}, stats["broadcasts"])])
+            yield ("bot_spectator_messages_total", "counter", "State messages queued for spectators",
+                   [({}, stats["messages"])])
+        matchmaker = bot_data.get("matchmaker")
+        if matchmaker is not None:
+            yield ("bot_matchmaking_queued", "gauge", "Players waiting for an opponent", [({}, len(matchmaker))])
+            yield ("bot_matchmaking_total", "counter", "Players who left the queue, by how",
+                   [({"result": "matched"}, matchmaker.matched * 2), ({"result": "cancelled"}, matchmaker.cancelled)])
+        tournaments = bot_data.get("tournaments")
+        if tournaments is not None:
+            stats = tournaments.stats()
+            yield ("bot_tournaments", "gauge", "Tournaments open or running", [({}, stats["tournaments"])])
+            yield ("bot_tournament_games", "gauge", "Tournament matches being played", [({}, stats["matches"])])
+        stats = bot_data.get("stats")
+        # Other workers of a cluster send their results to the one store
+        if isinstance(stats, StatsStore):
+            yield ("bot_stats_players", "gauge", "Players with a finished game", [({}, len(stats))])
+            yield ("bot_stats_results_total", "counter", "Finished games recorded in player stats",
+                   [({}, stats.results)])
+        yield ("bot_keyboard_cache_lookups_total", "counter", "Board keyboard cache lookups",
+               [({"result": "hit"}, keyboard_cache.hits), ({"result": "miss"}, keyboard_cache.misses)])
+        yield ("bot_keyboard_cache_size", "gauge", "Board button layouts cached", [({}, len(keyboard_cache))])
+        processor = application.update_processor
+        if isinstance(processor, ChatSequencer):
+            yield ("bot_busy_chats", "gauge", "Games or chats with an update in progress", [({}, len(processor))])
+            yield ("bot_deferred_updates_total", "counter", "Updates that waited behind another for their game",
+                   [({}, processor.deferred)])
+            yield ("bot_dropped_updates_total", "counter", "Updates dropped because their game's mailbox was full",
+                   [({}, processor.dropped)])
+    return collect
+
+
+class MetricsExporter:
+    """Serves REGISTRY at /metrics and samples event-loop lag while running."""
+
+    def __init__(self, application: Application):
+        self.application = application
+        self.server = HttpServer({"/metrics": self._scrape})
+        self._collector = application_collector(application)
+        self._lag_task: Optional[asyncio.Task] = None
+
+    async def _scrape(self, method, target, headers, body):
+        return HTTPStatus.OK, "text/plain; version=0.0.4; charset=utf-8", REGISTRY.render().encode("utf-8")
+
+    async def start(self, host: str, port: int) -> None:
+        REGISTRY.add_collector(self._collector)
+        self._lag_task = asyncio.get_running_loop().create_task(monitor_loop_lag())
+        try:
+            await self.server.start(host, port)
+            logger.info(f"Metrics on http://{host}:{self.server.port}/metrics")
+        except OSError as e:
+            logger.error(f"Metrics endpoint unavailable on {host}:{port}: {e}")
+
+    async def stop(self) -> None:
+        REGISTRY.remove_collector(self._collector)
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        await self.server.stop()
@@ -0,0 +1,305 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from telegram import Bot
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+from src.utils.logger import logger
+
+# Priorities, lowest value first
+MOVE = 0        # board redraws the players are waiting for
+MESSAGE = 1     # new messages (results, timeouts)
+ANIMATION = 2   # cosmetic frames; first to be dropped under pressure
+SPECTATOR = 3   # states pushed to spectators; dropped under pressure too
+
+
+class TokenBucket:
+    """Allows `rate` sends per second with bursts of up to `burst`."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a send is allowed (0 if one is allowed now)."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, until: float) -> None:
+        """Hold all sends until `until`, e.g. after a 429 with retry_after."""
+        self.paused_until = max(self.paused_until, until)
+        self.tokens = 0
+
+    def idle(self, now: float) -> bool:
+        return now >= self.paused_until and self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "chat_id", "key", "call", "enqueued", "registered")
+
+    def __init__(self, priority: int, seq: int, chat_id: int, key: Optional[Hashable],
+                 call: Callable[[], Awaitable[Any]], enqueued: float):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.key = key
+        self.call = call
+        self.enqueued = enqueued
+        self.registered = False
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundScheduler:
+    """
+    Rate-limited, prioritised queue for outgoing Bot API calls.
+
+    Handlers enqueue and return at once; a dispatcher task sends jobs in
+    priority order subject to a global token bucket and one per chat.
+    A job whose chat is out of tokens waits in a delay heap without holding
+    up other chats. Edits to a message that is still waiting are coalesced:
+    the pending job simply takes the newest content. A 429 pauses the
+    affected chat for retry_after and re-queues the job instead of
+    stalling a handler.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        group_rate: float = 20 / 60,
+        chat_burst: float = 3.0,
+        max_queue: int = 10_000,
+        max_in_flight: int = 64,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_queue = max_queue
+        self._clock = clock
+        self._global = TokenBucket(global_rate, global_rate, clock())
+        self._chats: Dict[int, TokenBucket] = {}
+        self._queue: List[_Job] = []
+        self._delayed: List[Tuple[float, _Job]] = []
+        self._pending: Dict[Hashable, _Job] = {}
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._sending: set = set()
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.retried = 0
+        self.failed = 0
+        self.delay_total = 0.0
+        self.delay_max = 0.0
+
+    def __len__(self) -> int:
+        return len(self._queue) + len(self._delayed)
+
+    # Enqueueing
+
+    def enqueue(
+        self,
+        chat_id: int,
+        call: Callable[[], Awaitable[Any]],
+        priority: int = MESSAGE,
+        key: Optional[Hashable] = None,
+        delay: float = 0.0,
+    ) -> None:
+        """
+        Queue call() to be sent to chat_id.
+
+        Args:
+            key: Jobs with the same key coalesce while waiting (e.g. edits
+                to one message); the newest call wins
+            delay: Seconds to hold the job before it may be sent, for
+                paced frames
+        """
+        now = self._clock()
+        # A job that will merge into a waiting one doesn't grow the queue
+        if priority >= ANIMATION and len(self) >= self.max_queue and (key is None or key not in self._pending):
+            self.dropped += 1
+            return
+        self.enqueued += 1
+        if delay > 0:
+            not_before = now + delay
+            job = _Job(priority, next(self._seq), chat_id, key, call, not_before)
+            heapq.heappush(self._delayed, (not_before, job))
+        else:
+            self._admit(_Job(priority, next(self._seq), chat_id, key, call, now))
+        self._wakeup.set()
+
+    def waiting(self, key: Hashable) -> bool:
+        """True if a job with this key is queued and not yet sent."""
+        return key in self._pending
+
+    def _admit(self, job: _Job) -> None:
+        """Put a due job on the ready queue, coalescing it into a waiting edit."""
+        if job.key is not None and not job.registered:
+            waiting = self._pending.get(job.key)
+            if waiting is not None:
+                # Keep the newest content; a retried older job just vanishes
+                if job.seq > waiting.seq:
+                    waiting.call = job.call
+                self.coalesced += 1
+                return
+            self._pending[job.key] = job
+            job.registered = True
+        heapq.heappush(self._queue, job)
+
+    def edit_message_text(
+        self, chat_id: int, message_id: int, text: str, priority: int = MOVE,
+        delay: float = 0.0, **kwargs
+    ) -> None:
+        self.enqueue(
+            chat_id,
+            lambda: self.bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, **kwargs),
+            priority,
+            key=(chat_id, message_id),
+            delay=delay,
+        )
+
+    def send_message(self, chat_id: int, text: str, priority: int = MESSAGE, **kwargs) -> None:
+        self.enqueue(chat_id, lambda: self.bot.send_message(chat_id, text, **kwargs), priority)
+
+    # Dispatching
+
+    def _bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= 4 * self.max_queue:
+                self._chats = {c: b for c, b in self._chats.items() if not b.idle(now)}
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst, now)
+        return bucket
+
+    def _next_ready(self, now: float) -> Tuple[Optional[_Job], Optional[float]]:
+        """Pop the best job that may be sent now, or return how long to wait."""
+        delayed = self._delayed
+        while delayed and delayed[0][0] <= now:
+            self._admit(heapq.heappop(delayed)[1])
+
+        queue = self._queue
+        while queue:
+            wait = self._global.delay(now)
+            if wait > 0:
+                return None, wait
+            job = heapq.heappop(queue)
+            wait = self._bucket(job.chat_id, now).delay(now)
+            if wait > 0:
+                heapq.heappush(delayed, (now + wait, job))
+                continue
+            return job, None
+        return None, (delayed[0][0] - now) if delayed else None
+
+    async def run(self) -> None:
+        self._running = True
+        while self._running:
+            self._wakeup.clear()
+            now = self._clock()
+            job, wait = self._next_ready(now)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if job.registered:
+                del self._pending[job.key]
+                job.registered = False
+            self._global.consume(now)
+            self._bucket(job.chat_id, now).consume(now)
+            waited = now - job.enqueued
+            self.delay_total += waited
+            self.delay_max = max(self.delay_max, waited)
+
+            await self._in_flight.acquire()
+            task = asyncio.get_running_loop().create_task(self._send(job))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, job: _Job) -> None:
+        try:
+            await job.call()
+            self.sent += 1
+        except RetryAfter as e:
+            # Chat-specific or global, Telegram doesn't say; pausing the chat
+            # is enough for per-chat limits and the global bucket covers bursts.
+            self.retried += 1
+            until = self._clock() + e.retry_after
+            self._bucket(job.chat_id, self._clock()).pause(until)
+            heapq.heappush(self._delayed, (until, job))
+            self._wakeup.set()
+        except BadRequest as e:
+            if "not modified" not in str(e):
+                self.failed += 1
+                logger.error(f"Outbound call to chat {job.chat_id} rejected: {e}")
+        except TelegramError as e:
+            self.failed += 1
+            logger.error(f"Outbound call to chat {job.chat_id} failed: {e}")
+        finally:
+            self._in_flight.release()
+
+    def start(self) -> None:
+        """Run the dispatcher as a background task on the current event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Keep sending for up to timeout seconds while jobs remain, then stop."""
+        deadline = self._clock() + timeout
+        while len(self) and self._clock() < deadline:
+            await asyncio.sleep(0.05)
+        self._running = False
+        self._wakeup.set()
+        if self._sending:
+            await asyncio.wait(self._sending, timeout=max(0.0, deadline - self._clock()))
+        self.dropped += len(self)
+
+    def stats(self) -> dict:
+        dispatched = self.sent + self.failed + self.retried
+        return {
+            "queue_depth": len(self._queue),
+            "delayed": len(self._delayed),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "retried": self.retried,
+            "failed": self.failed,
+            "delay_avg": self.delay_total / dispatched if dispatched else 0.0,
+            "delay_max": self.delay_max,
+        }
+
+
+def get_outbox(context) -> OutboundScheduler:
+    """Return the outbound scheduler from a handler context or an Application."""
+    return context.bot_data["outbox"]
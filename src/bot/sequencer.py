@@ -0,0 +1,140 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from src.bot.keyboards.game_keyboard import parse_cell_data
+from src.utils.logger import logger
+
+
+def sequence_key(update: object) -> Optional[Hashable]:
+    """Updates with the same key touch the same game: the chat, else the sender."""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return ("user", update.effective_user.id)
+    return None
+
+
+def game_sequence_key(games: Callable[[], Any]) -> Callable[[object], Optional[Hashable]]:
+    """
+    Key updates by the game they touch, so games sharing a chat run side by side.
+
+    A board button names its game; any other update from a user who is
+    playing belongs to their game (games() returns the GameStore, or None
+    before it exists). Updates from users without a game fall back to
+    sequence_key, so joins in one chat still take turns.
+    """
+    def key(update: object) -> Optional[Hashable]:
+        if not isinstance(update, Update):
+            return None
+        query = update.callback_query
+        if query is not None and query.data:
+            cell = parse_cell_data(query.data)
+            if cell is not None:
+                return ("game", cell[0])
+        store = games()
+        if store is not None and update.effective_user is not None:
+            game = store.for_player(update.effective_user.id)
+            if game is not None:
+                return ("game", game.game_id)
+        return sequence_key(update)
+    return key
+
+
+class ChatSequencer(BaseUpdateProcessor):
+    """
+    Processes updates concurrently across chats but one at a time per chat.
+
+    Each busy chat has a mailbox. The first update for an idle chat opens
+    it and runs on the caller's concurrency slot; updates arriving while the
+    chat is busy are appended and return at once, and the first caller
+    drains them in arrival order before closing the mailbox. A flood of
+    clicks in one chat therefore occupies a single slot, handlers never see
+    two updates for the same game at the same time, and an idle chat keeps
+    no state at all. key maps an update to its mailbox (sequence_key by
+    default; game_sequence_key gives each game its own).
+
+    A mailbox holds at most mailbox_limit waiting updates. Past that the
+    update is dropped unprocessed and counted in dropped: a client hammering
+    one board can't queue more work than the game could ever use.
+    """
+
+    __slots__ = ("_key", "_mailboxes", "_idle", "mailbox_limit", "deferred", "dropped")
+
+    def __init__(
+        self,
+        max_concurrent_updates: int,
+        key: Callable[[object], Optional[Hashable]] = sequence_key,
+        mailbox_limit: int = 64,
+    ):
+        super().__init__(max_concurrent_updates)
+        if mailbox_limit < 1:
+            raise ValueError("mailbox_limit must be at least 1")
+        self._key = key
+        self._mailboxes: Dict[Hashable, Deque[Awaitable[Any]]] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.mailbox_limit = mailbox_limit
+        self.deferred = 0  # updates that had to wait behind another one for their chat
+        self.dropped = 0  # updates turned away because their mailbox was full
+
+    def __len__(self) -> int:
+        """Number of chats with an update in progress."""
+        return len(self._mailboxes)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._key(update)
+        if key is None:
+            await coroutine
+            return
+
+        mailbox = self._mailboxes.get(key)
+        if mailbox is not None:
+            if len(mailbox) >= self.mailbox_limit:
+                # Never awaited, so close it to keep Python from warning about it
+                coroutine.close()
+                self.dropped += 1
+                if self.dropped & (self.dropped - 1) == 0:  # the 1st, 2nd, 4th, 8th... drop
+                    logger.warning(
+                        f"Dropped an update for {key!r}: {self.mailbox_limit} already waiting "
+                        f"({self.dropped} dropped so far)"
+                    )
+                return
+            mailbox.append(coroutine)
+            self.deferred += 1
+            return
+
+        mailbox = self._mailboxes[key] = deque()
+        self._idle.clear()
+        try:
+            await self._run(coroutine)
+            while mailbox:
+                await self._run(mailbox.popleft())
+        finally:
+            del self._mailboxes[key]
+            if not self._mailboxes:
+                self._idle.set()
+
+    @staticmethod
+    async def _run(coroutine: Awaitable[Any]) -> None:
+        # Application.process_update already routes handler errors to the
+        # error handlers; anything escaping here must not strand the mailbox.
+        try:
+            await coroutine
+        except Exception as e:
+            logger.error(f"Error processing sequenced update: {e}")
+
+    async def drain(self) -> None:
+        """Wait until every mailbox, including deferred updates, is empty."""
+        await self._idle.wait()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        await self.drain()
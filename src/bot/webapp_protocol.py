@@ -0,0 +1,123 @@
+import json
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from src.games.logic.bitboard import BOARD_CELLS
+from src.games.store.codec import decode_move, encode_move
+
+# WebApp -> bot messages, sent as web_app_data.
+#
+# JSON form:
+#   {"action": "join"[, "opponent": "bot"]}
+#   {"action": "move", "position": 0-15[, "selected": 0-15]}
+#   {"action": "sync"}
+#   {"action": "watch"}, {"action": "unwatch"}
+#
+# Compact form, a short string starting with "~":
+#   "~j", "~jb"   join, join against the bot
+#   "~mXY"        move; XY is the encode_move byte in lower-case hex
+#                 (from nibble, to nibble, equal for a placement)
+#   "~s"          sync
+#   "~w", "~u"    watch, unwatch
+COMPACT_PREFIX = "~"
+
+
+class ProtocolError(ValueError):
+    """WebApp data that doesn't follow the protocol."""
+
+
+class WebAppAction(NamedTuple):
+    action: str
+    position: Optional[int] = None
+    selected: Optional[int] = None
+    opponent: Optional[str] = None
+
+
+def _cell(value) -> int:
+    # bool is an int subclass; reject it along with everything else
+    if type(value) is not int or not 0 <= value < BOARD_CELLS:
+        raise ProtocolError(f"not a cell: {value!r}")
+    return value
+
+
+def _opponent(value) -> str:
+    if value != "bot":
+        raise ProtocolError(f"unknown opponent: {value!r}")
+    return value
+
+
+# action -> ((field, check, required), ...). Each action is compiled into
+# a straight-line validator at import, so validating a message costs a few
+# dict gets and type checks.
+SCHEMA: Dict[str, Tuple[Tuple[str, Callable, bool], ...]] = {
+    "join": (("opponent", _opponent, False),),
+    "move": (("position", _cell, True), ("selected", _cell, False)),
+    "sync": (),
+    "watch": (),
+    "unwatch": (),
+}
+
+
+def _compile(action: str, fields: Tuple[Tuple[str, Callable, bool], ...]) -> Callable[[dict], WebAppAction]:
+    namespace = {"ProtocolError": ProtocolError, "new": tuple.__new__, "WebAppAction": WebAppAction}
+    lines = ["def validate(data):"]
+    for name, check, required in fields:
+        namespace[f"check_{name}"] = check
+        lines.append(f"    {name} = data.get({name!r})")
+        if required:
+            lines.append(f"    if {name} is None:")
+            lines.append(f"        raise ProtocolError({action + ': missing ' + name!r})")
+            lines.append(f"    {name} = check_{name}({name})")
+        else:
+            lines.append(f"    if {name} is not None:")
+            lines.append(f"        {name} = check_{name}({name})")
+    names = {name for name, _, _ in fields}
+    values = ", ".join(name if name in names else "None" for name in WebAppAction._fields[1:])
+    lines.append(f"    return new(WebAppAction, ({action!r}, {values}))")
+    exec("\n".join(lines), namespace)
+    return namespace["validate"]
+
+
+_VALIDATORS = {action: _compile(action, fields) for action, fields in SCHEMA.items()}
+
+_COMPACT = {
+    "~j": WebAppAction("join"),
+    "~jb": WebAppAction("join", opponent="bot"),
+    "~s": WebAppAction("sync"),
+    "~w": WebAppAction("watch"),
+    "~u": WebAppAction("unwatch"),
+}
+_COMPACT.update(
+    (f"~m{packed:02x}", WebAppAction("move", *decode_move(packed))) for packed in range(256)
+)
+
+
+def encode_compact_move(position: int, selected: Optional[int] = None) -> str:
+    """Compact form of a move, as the WebApp would send it."""
+    return f"~m{encode_move(position, selected):02x}"
+
+
+def parse_webapp_data(data: str) -> WebAppAction:
+    """
+    Parse and validate one WebApp message in either form.
+
+    Raises:
+        ProtocolError: If data is malformed or breaks the schema
+    """
+    if data.startswith(COMPACT_PREFIX):
+        # Every valid compact message is precomputed
+        message = _COMPACT.get(data)
+        if message is None:
+            raise ProtocolError(f"unknown compact message: {data!r}")
+        return message
+
+    try:
+        decoded = json.loads(data)
+    except ValueError as e:
+        raise ProtocolError(f"invalid JSON: {e}") from None
+    if type(decoded) is not dict:
+        raise ProtocolError("expected an object")
+    action = decoded.get("action")
+    validate = _VALIDATORS.get(action) if type(action) is str else None
+    if validate is None:
+        raise ProtocolError(f"unknown action: {action!r}")
+    return validate(decoded)
@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import hmac
+import json
+import secrets
+import signal
+import sys
+import time
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application
+
+from src.config.settings import (
+    AI_WORKERS, AI_TT_SIZE, CONCURRENT_UPDATES, WEBHOOK_LISTEN, WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_URL
+)
+from src.bot.application import ALLOWED_UPDATES, create_application, drain_updates
+from src.games.logic import ai
+from src.utils.httpserver import HttpServer
+from src.utils.logger import logger
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+class WebhookIngress:
+    """
+    Accepts webhook deliveries and queues them on an Application.
+
+    A request body is one update, as Telegram sends it, or a JSON array of
+    updates, as a recorded getUpdates batch would be replayed. The whole
+    batch is parsed before any of it is queued, so a malformed request is
+    rejected without half of it having been processed.
+    """
+
+    def __init__(self, application: Application, secret_token: str = ""):
+        self.application = application
+        self.secret_token = secret_token
+        self.batches = 0
+        self.updates = 0
+        self.rejected = 0
+
+    async def handle(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, str, bytes]:
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, "text/plain", b""
+        if self.secret_token and not hmac.compare_digest(
+            headers.get(SECRET_HEADER, ""), self.secret_token
+        ):
+            self.rejected += 1
+            return HTTPStatus.FORBIDDEN, "text/plain", b""
+
+        bot = self.application.bot
+        try:
+            data = json.loads(body)
+            batch = [Update.de_json(item, bot) for item in (data if isinstance(data, list) else [data])]
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            self.rejected += 1
+            logger.warning(f"Rejected webhook delivery: {e}")
+            return HTTPStatus.BAD_REQUEST, "text/plain", b""
+
+        queue = self.application.update_queue
+        for update in batch:
+            queue.put_nowait(update)
+        self.batches += 1
+        self.updates += len(batch)
+        return HTTPStatus.OK, "text/plain", b""
+
+
+async def serve_webhook(
+    application: Application,
+    listen: str = WEBHOOK_LISTEN,
+    port: int = WEBHOOK_PORT,
+    path: str = WEBHOOK_PATH,
+    url: str = WEBHOOK_URL,
+    secret_token: str = WEBHOOK_SECRET,
+    max_connections: int = WEBHOOK_MAX_CONNECTIONS,
+    stop: Optional[asyncio.Event] = None,
+    ready: Optional[asyncio.Future] = None,
+) -> WebhookIngress:
+    """
+    Serve webhook deliveries until stop is set.
+
+    Args:
+        application: Built with updater=False; it is initialized, started and
+            shut down here, post_* hooks included
+        url: Public base URL Telegram should post to; empty to skip
+            setWebhook (local testing, or a webhook registered elsewhere)
+        secret_token: Secret Telegram must send with every delivery. When
+            url is set and this is empty, a random one is generated and
+            registered, since otherwise anyone who finds the URL could post
+            updates.
+        max_connections: Parallel connections Telegram may open to us
+        ready: Resolved with the port listened on once deliveries are
+            accepted (useful with port=0)
+
+    Returns:
+        WebhookIngress: The ingress, for its counters
+    """
+    stop = stop or asyncio.Event()
+    if url and not secret_token:
+        secret_token = secrets.token_urlsafe(32)
+        logger.info("WEBHOOK_SECRET is not set; registering the webhook with a generated secret")
+    ingress = WebhookIngress(application, secret_token)
+    server = HttpServer({path: ingress.handle})
+
+    await application.initialize()
+    try:
+        await application.post_init(application)
+        await application.start()
+        await server.start(listen, port)
+        if url:
+            await application.bot.set_webhook(
+                url.rstrip("/") + path,
+                allowed_updates=ALLOWED_UPDATES,
+                secret_token=secret_token or None,
+                max_connections=max_connections,
+            )
+        logger.info(f"Webhook listening on {listen}:{server.port}{path}")
+        if ready is not None:
+            ready.set_result(server.port)
+        await stop.wait()
+    finally:
+        await server.stop()
+        await drain_updates(application)
+        if application.running:
+            await application.stop()
+        await application.post_stop(application)
+        await application.shutdown()
+        await application.post_shutdown(application)
+        logger.info(f"Webhook stopped: {ingress.updates} updates in {ingress.batches} requests")
+    return ingress
+
+
+def run_webhook(application: Application, **kwargs) -> None:
+    """Blocking entry point: serve_webhook(application, **kwargs) until SIGINT/SIGTERM."""
+    async def _main() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await serve_webhook(application, stop=stop, **kwargs)
+
+    asyncio.run(_main())
+
+
+def _load_updates(path: str) -> list:
+    """Recorded updates: a JSON array or one update per line."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def post_updates(url: str, updates: list, batch_size: int = 1, secret_token: str = "") -> float:
+    """POST updates to a webhook in batches over one connection; returns seconds taken."""
+    import httpx
+
+    headers = {SECRET_HEADER: secret_token} if secret_token else {}
+    started = time.perf_counter()
+    with httpx.Client(headers=headers) as client:
+        for i in range(0, len(updates), batch_size):
+            batch = updates[i:i + batch_size]
+            response = client.post(url, json=batch if batch_size > 1 else batch[0])
+            response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Webhook server and tools for testing it locally")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="serve the webhook without registering it")
+    serve.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    serve.add_argument("--offline", action="store_true", help="answer Bot API calls locally")
+    serve.add_argument("--concurrent-updates", type=int, default=CONCURRENT_UPDATES)
+
+    record = commands.add_parser("record", help="write fake game updates as JSON lines")
+    record.add_argument("--chats", type=int, default=100)
+    record.add_argument("--seed", type=int, default=0)
+
+    post = commands.add_parser("post", help="POST recorded updates to a webhook")
+    post.add_argument("file")
+    post.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    post.add_argument("--batch-size", type=int, default=1)
+    post.add_argument("--secret", default=WEBHOOK_SECRET)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        from src.cluster.fake import FakeUpdateSource
+        for update in FakeUpdateSource(args.chats, seed=args.seed).updates():
+            sys.stdout.write(json.dumps(update) + "\n")
+    elif args.command == "post":
+        updates = _load_updates(args.file)
+        seconds = post_updates(args.url, updates, args.batch_size, args.secret)
+        print(f"{len(updates)} updates in {seconds:.2f}s ({len(updates) / seconds:,.0f} updates/s)")
+    else:
+        from src.cluster.fake import OfflineRequest
+        application = create_application(
+            OfflineRequest() if args.offline else None,
+            updater=False,
+            concurrent_updates=args.concurrent_updates,
+        )
+        ai.configure_pool(AI_WORKERS, AI_TT_SIZE)
+        try:
+            run_webhook(application, listen="127.0.0.1", port=args.port, url="")
+        finally:
+            ai.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+from telegram.request import BaseRequest, RequestData
+
+from src.bot.webapp_protocol import encode_compact_move
+from src.games.models.game_state import GameState
+from src.games.store import get_store
+
+OFFLINE_BOT = {"id": 1, "is_bot": True, "first_name": "Offline", "username": "offline_bot"}
+
+# Calls Telegram rate-limits per chat; only these get simulated 429s
+RATE_LIMITED_METHODS = frozenset(
+    ("sendMessage", "editMessageText", "editMessageReplyMarkup", "answerCallbackQuery")
+)
+
+
+class OfflineRequest(BaseRequest):
+    """
+    Bot API transport that never touches the network.
+
+    By default every call succeeds immediately with the smallest response
+    PTB accepts, so the real handlers can run locally against fake updates.
+    For load tests it can also behave more like the real server.
+
+    Args:
+        latency: Seconds each call takes
+        jitter: Up to this many seconds added at random to each call
+        rate_limit: Fraction of RATE_LIMITED_METHODS calls answered with 429
+        retry_after: retry_after sent with a 429
+        record: Keep (time, method, parameters) of every call in self.recorded
+        seed: Seed for jitter and 429s
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_limit: float = 0.0,
+        retry_after: int = 1,
+        record: bool = False,
+        seed: int = 0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.recorded: Optional[List[Tuple[float, str, dict]]] = [] if record else None
+        self._rng = random.Random(seed)
+        self._message_ids = itertools.count(1)
+        self.calls: Dict[str, int] = {}
+        self.limited = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> Tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        params = request_data.parameters if request_data else {}
+        if self.recorded is not None:
+            self.recorded.append((time.time(), endpoint, params))
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._rng.random() * self.jitter)
+        if self.rate_limit and endpoint in RATE_LIMITED_METHODS and self._rng.random() < self.rate_limit:
+            self.limited += 1
+            return 429, json.dumps({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }).encode()
+        return 200, json.dumps({"ok": True, "result": self._result(endpoint, params)}).encode()
+
+    def _result(self, endpoint: str, params: dict):
+        if endpoint == "getMe":
+            return OFFLINE_BOT
+        if endpoint == "getUpdates":
+            return []
+        if endpoint in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            if "inline_message_id" in params:
+                return True
+            return {
+                "message_id": params.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "group"},
+                "from": OFFLINE_BOT,
+                "text": params.get("text", ""),
+            }
+        return True
+
+
+def _random_game(rng: random.Random, max_moves: int) -> List[Tuple[str, dict]]:
+    """A random legal game as (player symbol, WebApp payload) pairs."""
+    game = GameState(0)
+    game.player_x, game.player_o = 1, 2
+    game.phase = "placement"
+    script = [("X", {"action": "join"}), ("O", {"action": "join"})]
+    for _ in range(max_moves):
+        player = game.current_player
+        empty = game.board.empty_cells()
+        if game.phase == "placement":
+            position, selected = rng.choice(empty), None
+        else:
+            own = [i for i in range(16) if game.board.owns(player, i)]
+            position, selected = rng.choice(empty), rng.choice(own)
+        game.handle_webapp_move(game.current_player_id(), position, selected)
+        move = {"action": "move", "position": position}
+        if selected is not None:
+            move["selected"] = selected
+        script.append((player, move))
+        if game.winner:
+            break
+        game.advance_turn()
+    return script
+
+
+class FakeUpdateSource:
+    """
+    Ingress that replays random two-player WebApp games as raw updates.
+
+    Each chat gets its own pair of players and a legal random game; updates
+    from different chats are interleaved the way a busy bot sees them.
+    Iterating yields batches like a getUpdates response.
+    """
+
+    def __init__(self, chats: int, batch_size: int = 100, max_moves: int = 24, seed: int = 0):
+        self.chats = chats
+        self.batch_size = batch_size
+        self.max_moves = max_moves
+        self.seed = seed
+        self.total = 0
+
+    def updates(self):
+        rng = random.Random(self.seed)
+        scripts = []
+        for n in range(self.chats):
+            chat_id = -(1_000_000 + n)
+            users = {"X": 10_000_000 + 2 * n, "O": 10_000_001 + 2 * n}
+            scripts.append((chat_id, users, iter(_random_game(rng, self.max_moves))))
+        update_ids = itertools.count(1)
+        message_ids = itertools.count(1)
+        while scripts:
+            live = []
+            for chat_id, users, script in scripts:
+                step = next(script, None)
+                if step is None:
+                    continue
+                live.append((chat_id, users, script))
+                player, payload = step
+                yield {
+                    "update_id": next(update_ids),
+                    "message": {
+                        "message_id": next(message_ids),
+                        "date": int(time.time()),
+                        "chat": {"id": chat_id, "type": "group"},
+                        "from": {"id": users[player], "is_bot": False, "first_name": f"P{users[player]}"},
+                        "web_app_data": {"data": json.dumps(payload), "button_text": "Play"},
+                    },
+                }
+            scripts = live
+
+    async def __aiter__(self) -> AsyncIterator[List[dict]]:
+        batch = []
+        for update in self.updates():
+            batch.append(update)
+            if len(batch) >= self.batch_size:
+                self.total += len(batch)
+                yield batch
+                batch = []
+        if batch:
+            self.total += len(batch)
+            yield batch
+
+
+# Runs after every handler group, so an update is done when it gets here
+DONE_GROUP = 1000
+
+
+class LoadHarness:
+    """Feeds updates into an Application and times each until handled."""
+
+    def __init__(self, application: Application, max_moves: int = 40, think_time: float = 0.0,
+                 timeout: float = 30.0, seed: int = 0, spectators: int = 0):
+        self.application = application
+        self.max_moves = max_moves
+        self.spectators = spectators
+        self.think_time = think_time
+        self.timeout = timeout
+        self.seed = seed
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.timeouts = 0
+        self.finished = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        application.add_handler(TypeHandler(Update, self._handled), group=DONE_GROUP)
+
+    async def _handled(self, update: Update, context) -> None:
+        future = self._pending.pop(update.update_id, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    async def send(self, kind: str, update: dict) -> None:
+        """Queue one update and wait until every handler has run for it."""
+        update_id = update["update_id"] = next(self._update_ids)
+        future = self._pending[update_id] = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        await self.application.update_queue.put(Update.de_json(update, self.application.bot))
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(update_id, None)
+            self.timeouts += 1
+            return
+        self.latencies[kind].append(time.perf_counter() - started)
+
+    def _message(self, chat_id: int, user: dict, **fields) -> dict:
+        return {"message": {"message_id": next(self._message_ids), "date": int(time.time()),
+                            "chat": {"id": chat_id, "type": "group"}, "from": user, **fields}}
+
+    def command(self, chat_id: int, user: dict, command: str) -> dict:
+        return self._message(chat_id, user, text=command,
+                             entities=[{"type": "bot_command", "offset": 0, "length": len(command)}])
+
+    def web_app(self, chat_id: int, user: dict, data: str) -> dict:
+        return self._message(chat_id, user, web_app_data={"data": data, "button_text": "Play"})
+
+    def click(self, chat_id: int, user: dict, data: str, board_message_id: int) -> dict:
+        return {"callback_query": {
+            "id": str(next(self._message_ids)), "chat_instance": str(chat_id), "data": data, "from": user,
+            "message": {"message_id": board_message_id, "date": int(time.time()),
+                        "chat": {"id": chat_id, "type": "group"}, "text": "board"},
+        }}
+
+    @staticmethod
+    def _choose(game: GameState, rng: random.Random):
+        """A random legal (position, selected) for the player to move."""
+        empty = game.board.empty_cells()
+        if game.phase == "placement":
+            return rng.choice(empty), None
+        own = [cell for cell in range(16) if game.board.owns(game.current_player, cell)]
+        return rng.choice(empty), rng.choice(own)
+
+    async def play_chat(self, n: int, buttons: bool) -> None:
+        """One chat's game, from /start to a win or max_moves."""
+        rng = random.Random(self.seed * 1_000_003 + n)
+        chat_id = -(2_000_000 + n)
+        users = {symbol: {"id": 20_000_000 + 2 * n + i, "is_bot": False, "first_name": f"{symbol}{n}"}
+                 for i, symbol in enumerate("XO")}
+        board_message_id = next(self._message_ids)
+
+        await self.send("start", self.command(chat_id, users["X"], "/start"))
+        await self.send("join", self.web_app(chat_id, users["X"], '{"action":"join"}'))
+        if buttons:
+            await self.send("join", self.click(chat_id, users["O"], "join_game", board_message_id))
+        else:
+            await self.send("join", self.web_app(chat_id, users["O"], '{"action":"join"}'))
+        for i in range(self.spectators):
+            spectator = {"id": 30_000_000 + n * self.spectators + i, "is_bot": False, "first_name": f"S{i}"}
+            await self.send("watch", self.command(chat_id, spectator, "/watch"))
+
+        store = get_store(self.application)
+        for _ in range(self.max_moves):
+            game = store.for_player(users["X"]["id"])
+            if game is None or game.phase not in ("placement", "movement"):
+                break
+            user = users[game.current_player]
+            position, selected = self._choose(game, rng)
+            if buttons:
+                # The board buttons carry "<game id>.<version>.<cell>"
+                tag = f"{game.game_id:x}.{game.version:x}"
+                if selected is not None:
+                    await self.send("click", self.click(chat_id, user, f"{tag}.{selected:x}", board_message_id))
+                await self.send("click", self.click(chat_id, user, f"{tag}.{position:x}", board_message_id))
+            else:
+                await self.send("webapp", self.web_app(chat_id, user, encode_compact_move(position, selected)))
+            if self.think_time:
+                await asyncio.sleep(rng.random() * 2 * self.think_time)
+        if store.for_player(users["X"]["id"]) is None:
+            self.finished += 1
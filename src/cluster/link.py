@@ -0,0 +1,86 @@
+import asyncio
+import itertools
+from typing import Dict, Iterable, Optional
+
+from src.cluster.ring import SeatIndex
+from src.games.stats import GameResult
+
+# The worker that runs the cluster-wide services: matchmaking and player stats
+SERVICES_WORKER = 0
+# Commands and buttons the supervisor sends to it whatever chat they come from
+SERVICE_COMMANDS = frozenset({"queue", "leave", "rank", "top", "leaderboard"})
+SERVICE_CALLBACKS = frozenset({"queue"})
+
+
+class ClusterLink:
+    """
+    A worker's line to the supervisor, kept in bot_data["cluster"].
+
+    There is one matchmaking queue for the whole cluster, on the services
+    worker. It is told about every other worker's seats, so it can turn
+    away players already in a game anywhere, and sends each match it
+    makes to the supervisor, which passes it to the worker that owns the
+    host's chat. Without a cluster (a single process) there is no link.
+    """
+
+    def __init__(self, index: int, outbox):
+        self.index = index
+        self.outbox = outbox
+        # Seats on the other workers; only the services worker is sent them
+        self.seats = SeatIndex()
+        self._requests: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count()
+
+    @property
+    def services(self) -> bool:
+        return self.index == SERVICES_WORKER
+
+    def phase_elsewhere(self, user_id: int) -> Optional[str]:
+        """Phase of user_id's game on another worker, or None if they have none there."""
+        seat = self.seats.get(user_id)
+        return seat[1] if seat is not None and seat[0] != self.index else None
+
+    def send(self, kind: str, payload) -> None:
+        self.outbox.put((kind, self.index, payload))
+
+    async def ratings(self, user_ids: Iterable[int], timeout: float = 10.0) -> Dict[int, float]:
+        """Ask the services worker for the ratings of user_ids; players without stats are left out."""
+        request_id = next(self._request_ids)
+        future = self._requests[request_id] = asyncio.get_running_loop().create_future()
+        self.send("ratings", (request_id, list(user_ids)))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            del self._requests[request_id]
+
+    def answer(self, request_id: int, result) -> None:
+        """Resolve a request this worker sent; late answers are ignored."""
+        future = self._requests.get(request_id)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+
+class RemoteStats:
+    """
+    The stats store of every worker but the services worker.
+
+    Player stats are kept in one store, on the services worker, so that
+    ratings, ranks and leaderboards cover every chat. Results finished
+    here are sent there. The commands that read stats are routed there
+    too, and the few reads made here (seeding a tournament) go through
+    ClusterLink.ratings.
+    """
+
+    def __init__(self, link: ClusterLink):
+        self.link = link
+
+    def record(self, result: GameResult) -> None:
+        self.link.send("result", result)
+
+    def close(self) -> None:
+        pass
+
+
+def get_cluster(context) -> Optional[ClusterLink]:
+    """The worker's ClusterLink, or None when the bot runs as a single process"""
+    return context.bot_data.get("cluster")
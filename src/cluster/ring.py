@@ -0,0 +1,141 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_MASK64 = (1 << 64) - 1
+DEFAULT_REPLICAS = 128
+
+
+def mix64(value: int) -> int:
+    """splitmix64 finalizer: a cheap, well-spread hash that is stable across processes."""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping integer keys (chat ids) to worker indexes.
+
+    Each worker owns `replicas` points on the ring; a key belongs to the
+    first point at or after its hash. Adding or removing a worker only moves
+    the keys on the arcs that worker gains or loses, about 1/N of them.
+    """
+
+    def __init__(self, nodes: Iterable[int] = (), replicas: int = DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self.nodes: List[int] = sorted(set(nodes))
+        points = sorted(
+            (mix64(node << 20 | replica), node)
+            for node in self.nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def node_for(self, key: int) -> Optional[int]:
+        """Worker index that owns key, or None for an empty ring."""
+        if not self._hashes:
+            return None
+        i = bisect_right(self._hashes, mix64(key & _MASK64))
+        return self._owners[i if i < len(self._owners) else 0]
+
+
+def routing_key(update: dict) -> Optional[int]:
+    """
+    Key used to pick the worker for a raw update: the chat id, which is also
+    how games are keyed, falling back to the sender for updates without a
+    chat (e.g. inline queries).
+    """
+    for field in ("message", "edited_message", "channel_post"):
+        message = update.get(field)
+        if message:
+            return message["chat"]["id"]
+    query = update.get("callback_query")
+    if query:
+        message = query.get("message")
+        if message:
+            return message["chat"]["id"]
+        return query["from"]["id"]
+    for value in update.values():
+        if isinstance(value, dict):
+            sender = value.get("from") or value.get("user")
+            if sender:
+                return sender["id"]
+    return None
+
+
+def webapp_sender(update: dict) -> Optional[int]:
+    """
+    Sender of a raw WebApp data update, else None.
+
+    WebApp data belongs to the sender's game wherever it was sent from: a
+    tournament or matchmaking player sends moves from their private chat
+    for a game hosted in another chat, so it is routed by the player.
+    """
+    message = update.get("message")
+    if message and "web_app_data" in message and message.get("from"):
+        return message["from"]["id"]
+    return None
+
+
+def command_name(update: dict) -> Optional[str]:
+    """Name of the bot command a raw message update starts with ("/queue@bot x" -> "queue"), else None."""
+    message = update.get("message")
+    text = message.get("text") if message else None
+    if not text or text[0] != "/":
+        return None
+    name = text.split(None, 1)[0][1:].split("@", 1)[0]
+    return name.lower() or None
+
+
+class SeatIndex:
+    """
+    Which worker holds each player's game, as the workers report it.
+
+    Maps user id -> (worker index, phase of their game). Workers send
+    their full set of seats when they start and the changes after that.
+    """
+
+    def __init__(self):
+        self._seats: Dict[int, Tuple[int, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._seats)
+
+    def get(self, user_id: Optional[int]) -> Optional[Tuple[int, str]]:
+        return self._seats.get(user_id)
+
+    def items(self) -> Iterable[Tuple[int, Tuple[int, str]]]:
+        return self._seats.items()
+
+    def reset(self, index: int, seated: Iterable[Tuple[int, str]]) -> None:
+        """A worker (re)started or stopped: its seats are exactly these."""
+        self._seats = {user_id: seat for user_id, seat in self._seats.items() if seat[0] != index}
+        for user_id, phase in seated:
+            self._seats[user_id] = (index, phase)
+
+    def update(self, index: int, changes: Iterable[Tuple[int, Optional[str]]]) -> None:
+        seats = self._seats
+        for user_id, phase in changes:
+            if phase is not None:
+                seats[user_id] = (index, phase)
+            else:
+                seat = seats.get(user_id)
+                # A player whose game moved on is already seated elsewhere
+                if seat is not None and seat[0] == index:
+                    del seats[user_id]
+
+    def move(self, user_id: int, index: int) -> Optional[str]:
+        """A player's game was handed to worker index; returns its phase if they were seated."""
+        seat = self._seats.get(user_id)
+        if seat is None:
+            return None
+        self._seats[user_id] = (index, seat[1])
+        return seat[1]
+
+    def seated_on(self, index: int) -> List[Tuple[int, str]]:
+        return [(user_id, phase) for user_id, (node, phase) in self._seats.items() if node == index]
@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from telegram import Bot
+from telegram.error import NetworkError, RetryAfter, TimedOut
+
+from src.config.settings import BOT_TOKEN, GAME_STORE_BACKEND, GAME_STORE_PATH
+from src.bot.application import ALLOWED_UPDATES
+from src.cluster.link import SERVICE_CALLBACKS, SERVICE_COMMANDS, SERVICES_WORKER
+from src.cluster.ring import HashRing, SeatIndex, command_name, routing_key, webapp_sender
+from src.cluster.worker import WorkerOptions, run_worker
+from src.utils.logger import logger
+
+
+class TelegramPollingSource:
+    """Ingress that long-polls getUpdates and yields the raw JSON batches."""
+
+    def __init__(self, token: str, timeout: int = 30, allowed_updates: Optional[List[str]] = None):
+        self.bot = Bot(token)
+        self.timeout = timeout
+        self.allowed_updates = allowed_updates or ALLOWED_UPDATES
+        self.total = 0
+
+    async def __aiter__(self) -> AsyncIterator[List[dict]]:
+        offset = 0
+        async with self.bot:
+            while True:
+                try:
+                    batch = await self.bot.do_api_request(
+                        "getUpdates",
+                        api_kwargs={
+                            "offset": offset,
+                            "timeout": self.timeout,
+                            "allowed_updates": self.allowed_updates,
+                        },
+                        read_timeout=self.timeout + 10,
+                    )
+                except RetryAfter as e:
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                except (TimedOut, NetworkError) as e:
+                    logger.warning(f"getUpdates failed: {e}")
+                    await asyncio.sleep(1)
+                    continue
+                if batch:
+                    offset = batch[-1]["update_id"] + 1
+                    self.total += len(batch)
+                    yield batch
+
+
+class _Worker:
+    def __init__(self, index: int, process, inbox):
+        self.index = index
+        self.process = process
+        self.inbox = inbox
+        self.processed = 0
+
+
+class Supervisor:
+    """
+    Runs N bot workers behind a single ingress.
+
+    Each update is routed by the consistent hash of its chat id, so every
+    game is owned by exactly one worker and workers share no state. When a
+    worker is added or removed the new ring is broadcast; each worker hands
+    off the games it no longer owns and the supervisor passes them to their
+    new owners before routing resumes. Per-worker queues are FIFO, so
+    updates routed under the old ring are processed before the handoff.
+
+    WebApp data is the exception: it is sent from wherever the player
+    opened the WebApp, often their private chat, while the game lives with
+    the chat that hosts it. Workers report which players they seat, and
+    WebApp data from a seated player goes to the worker holding their game.
+
+    Matchmaking and player stats are global, so they live on one worker,
+    SERVICES_WORKER: /queue, /leave and the stats commands from every chat
+    go there, as do the results of games finished on other workers. It is
+    forwarded the other workers' seats, and each match it makes is passed
+    on to the worker that owns the host's chat. That worker is never
+    removed.
+    """
+
+    def __init__(self, options: WorkerOptions):
+        self.options = options
+        self._mp = multiprocessing.get_context("spawn")
+        self._outbox = self._mp.Queue()
+        self._workers: Dict[int, _Worker] = {}
+        self._waiters: Dict[tuple, asyncio.Future] = {}
+        self._lock = asyncio.Lock()
+        self._reader: Optional[asyncio.Task] = None
+        self.ring = HashRing()
+        self.routed = 0
+        self._seats = SeatIndex()
+
+    # Worker -> supervisor replies
+
+    async def _read_outbox(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            kind, index, payload = await loop.run_in_executor(None, self._outbox.get)
+            if kind == "closed":
+                return
+            if kind == "seated":
+                self._seats.reset(index, payload)
+                self._to_services(index, (kind, index, payload))
+                continue
+            if kind == "seats":
+                self._seats.update(index, payload)
+                self._to_services(index, (kind, index, payload))
+                continue
+            if kind == "match":
+                self._place_match(payload)
+                continue
+            if kind == "result":
+                self._workers[SERVICES_WORKER].inbox.put(("result", payload))
+                continue
+            if kind == "ratings":
+                self._workers[SERVICES_WORKER].inbox.put(("ratings", index) + tuple(payload))
+                continue
+            if kind == "rated":
+                asker, request_id, ratings = payload
+                worker = self._workers.get(asker)
+                if worker is not None:
+                    worker.inbox.put(("rated", request_id, ratings))
+                continue
+            waiter = self._waiters.pop((kind, index), None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(payload)
+
+    def _to_services(self, index: int, message: tuple) -> None:
+        """Pass another worker's seats on to the services worker, which keeps its own copy."""
+        services = self._workers.get(SERVICES_WORKER)
+        if services is not None and index != SERVICES_WORKER:
+            services.inbox.put(message)
+
+    def _place_match(self, match) -> None:
+        """
+        Send a match to the worker that owns the host's chat.
+
+        Only the seat index knows about games on the other workers: a
+        player playing on one makes the match fail there, and open games
+        the players started on one are closed first.
+        """
+        host = self.ring.node_for(match.first.chat_id)
+        busy = []
+        open_games: Dict[int, List[int]] = {}
+        for ticket in (match.first, match.second):
+            seat = self._seats.get(ticket.user_id)
+            if seat is None or seat[0] == host:
+                continue
+            if seat[1] == "waiting":
+                open_games.setdefault(seat[0], []).append(ticket.user_id)
+            else:
+                busy.append(ticket.user_id)
+        if not busy:
+            for index, user_ids in open_games.items():
+                self._workers[index].inbox.put(("drop_open", user_ids))
+        self._workers[host].inbox.put(("match", match, busy))
+
+    def _expect(self, kind: str, index: int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[(kind, index)] = future
+        return future
+
+    # Worker lifecycle
+
+    def _spawn(self, index: int, inbox=None) -> _Worker:
+        inbox = inbox if inbox is not None else self._mp.Queue()
+        process = self._mp.Process(
+            target=run_worker,
+            args=(index, inbox, self._outbox, self.options),
+            name=f"bot-worker-{index}",
+        )
+        process.start()
+        worker = _Worker(index, process, inbox)
+        self._workers[index] = worker
+        if index == SERVICES_WORKER:
+            # A restarted services worker starts with no copy of the seats
+            for other in self._workers:
+                if other != index:
+                    inbox.put(("seated", other, self._seats.seated_on(other)))
+        return worker
+
+    async def start(self, workers: int) -> None:
+        """Start the workers and settle ownership of any games they recovered."""
+        if self._reader is None:
+            self._reader = asyncio.get_running_loop().create_task(self._read_outbox())
+        ready = [self._expect("ready", i) for i in range(workers)]
+        for index in range(workers):
+            self._spawn(index)
+        restored = await asyncio.gather(*ready)
+        logger.info(f"{workers} workers ready ({sum(restored)} games restored)")
+        # Games recovered from a run with a different worker count may sit
+        # on the wrong worker; the first rebalance moves them.
+        await self._rebalance(list(range(workers)))
+
+    async def add_worker(self) -> int:
+        async with self._lock:
+            index = max(self._workers, default=-1) + 1
+            ready = self._expect("ready", index)
+            self._spawn(index)
+            await ready
+            await self._rebalance(self.ring.nodes + [index], joining=[index])
+            logger.info(f"Added worker {index}; {len(self._workers)} running")
+            return index
+
+    async def remove_worker(self, index: Optional[int] = None) -> None:
+        async with self._lock:
+            if len(self._workers) <= 1:
+                logger.warning("Not removing the last worker")
+                return
+            index = max(self._workers) if index is None else index
+            if index == SERVICES_WORKER:
+                logger.warning(f"Not removing worker {index}, which runs matchmaking and stats")
+                return
+            await self._rebalance([i for i in self.ring.nodes if i != index])
+            await self._stop_worker(index)
+            logger.info(f"Removed worker {index}; {len(self._workers)} running")
+
+    async def _rebalance(self, nodes: List[int], joining: List[int] = ()) -> None:
+        started = time.perf_counter()
+        ring = HashRing(nodes)
+        current = [i for i in self._workers if i not in joining]
+        replies = [self._expect("handoff", i) for i in current]
+        for index in current:
+            self._workers[index].inbox.put(("ring", ring.nodes))
+        handed_off = await asyncio.gather(*replies)
+
+        adopted: Dict[int, list] = {}
+        adopted_tournaments: Dict[int, list] = {}
+        moved_seats: Dict[int, list] = {}
+        for records, tournaments in handed_off:
+            for tournament in tournaments:
+                adopted_tournaments.setdefault(ring.node_for(tournament.chat_id), []).append(tournament)
+            for chat_id, record, players, spectators in records:
+                node = ring.node_for(chat_id)
+                adopted.setdefault(node, []).append((chat_id, record, players, spectators))
+                # Route the players' WebApp data to the new owner from now on
+                for user_id in players:
+                    phase = self._seats.move(user_id, node)
+                    if phase is not None:
+                        moved_seats.setdefault(node, []).append((user_id, phase))
+        for index in adopted.keys() | adopted_tournaments.keys():
+            self._workers[index].inbox.put(("adopt", adopted.get(index, []), adopted_tournaments.get(index, [])))
+        for index, changes in moved_seats.items():
+            # Including moves onto the services worker, so its copy drops them
+            self._workers[SERVICES_WORKER].inbox.put(("seats", index, changes))
+        self.ring = ring
+        moved = sum(len(records) for records in adopted.values())
+        moved_tournaments = sum(len(tournaments) for tournaments in adopted_tournaments.values())
+        logger.info(f"Rebalanced onto workers {ring.nodes}: {moved} games and {moved_tournaments} "
+                    f"tournaments moved in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    async def _stop_worker(self, index: int) -> int:
+        worker = self._workers[index]
+        stopped = self._expect("stopped", index)
+        worker.inbox.put(("stop",))
+        worker.processed = await stopped
+        await asyncio.get_running_loop().run_in_executor(None, worker.process.join)
+        del self._workers[index]
+        self._seats.reset(index, [])
+        self._to_services(index, ("seated", index, []))
+        return worker.processed
+
+    def _check_workers(self) -> None:
+        """Restart crashed workers in place; a durable store brings their games back."""
+        for index, worker in list(self._workers.items()):
+            if not worker.process.is_alive():
+                logger.error(f"Worker {index} exited with {worker.process.exitcode}; restarting")
+                self._spawn(index, worker.inbox)
+
+    # Routing
+
+    def route(self, batch: List[dict]) -> None:
+        """Split a batch of raw updates by owner and queue each part in order."""
+        parts: Dict[int, List[dict]] = {}
+        ring = self.ring
+        seats = self._seats
+        for update in batch:
+            seat = seats.get(webapp_sender(update)) if seats else None
+            if seat is not None:
+                node = seat[0]
+            elif self._for_services(update):
+                node = SERVICES_WORKER
+            else:
+                key = routing_key(update)
+                node = ring.node_for(key if key is not None else update["update_id"])
+            parts.setdefault(node, []).append(update)
+        for node, updates in parts.items():
+            self._workers[node].inbox.put(("updates", updates))
+        self.routed += len(batch)
+
+    @staticmethod
+    def _for_services(update: dict) -> bool:
+        query = update.get("callback_query")
+        if query is not None:
+            return query.get("data") in SERVICE_CALLBACKS
+        return command_name(update) in SERVICE_COMMANDS
+
+    async def run(self, source, add_worker_after: Optional[int] = None) -> None:
+        """
+        Route every batch from source until it is exhausted.
+
+        add_worker_after starts one more worker once that many updates have
+        been routed, to exercise rebalancing under load.
+        """
+        async for batch in source:
+            async with self._lock:
+                self._check_workers()
+                self.route(batch)
+            if add_worker_after is not None and self.routed >= add_worker_after:
+                add_worker_after = None
+                await self.add_worker()
+
+    async def stop(self) -> Dict[int, int]:
+        """Drain and stop every worker; returns updates processed per worker."""
+        async with self._lock:
+            processed = {}
+            # The services worker goes last: the others send it results while they drain
+            for index in sorted(self._workers, key=lambda i: i == SERVICES_WORKER):
+                processed[index] = await self._stop_worker(index)
+            if self._reader is not None:
+                self._outbox.put(("closed", -1, None))
+                await self._reader
+                self._reader = None
+            return processed
+
+
+async def supervise(workers: int, source, options: WorkerOptions, add_worker_after: Optional[int] = None) -> dict:
+    """Run a supervisor over source until it is exhausted; returns throughput stats."""
+    supervisor = Supervisor(options)
+    await supervisor.start(workers)
+
+    loop = asyncio.get_running_loop()
+    if hasattr(signal, "SIGUSR1"):
+        loop.add_signal_handler(signal.SIGUSR1, lambda: loop.create_task(supervisor.add_worker()))
+        loop.add_signal_handler(signal.SIGUSR2, lambda: loop.create_task(supervisor.remove_worker()))
+
+    started = time.perf_counter()
+    try:
+        await supervisor.run(source, add_worker_after)
+    finally:
+        processed = await supervisor.stop()
+    elapsed = time.perf_counter() - started
+    total = sum(processed.values())
+    return {
+        "updates": total,
+        "seconds": elapsed,
+        "updates_per_second": total / elapsed if elapsed else 0.0,
+        "per_worker": processed,
+    }
+
+
+def run_supervisor(workers: int) -> None:
+    """Poll Telegram once and shard updates across worker processes."""
+    options = WorkerOptions(GAME_STORE_BACKEND, GAME_STORE_PATH)
+    logger.info(f"Starting supervisor with {workers} workers")
+    asyncio.run(supervise(workers, TelegramPollingSource(BOT_TOKEN), options))
+
+
+def main() -> None:
+    from src.cluster.fake import FakeUpdateSource
+
+    parser = argparse.ArgumentParser(description="Run sharded workers against fake updates")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--chats", type=int, default=2000, help="concurrent fake games")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--add-worker-after", type=int, default=None,
+                        help="add one worker after this many updates to exercise rebalancing")
+    parser.add_argument("--store", default="memory", choices=["memory", "journal"])
+    parser.add_argument("--store-path", default="data/fake-games")
+    args = parser.parse_args()
+
+    options = WorkerOptions(args.store, args.store_path, offline=True, log_level=logging.WARNING)
+    source = FakeUpdateSource(args.chats, batch_size=args.batch_size)
+    stats = asyncio.run(supervise(args.workers, source, options, args.add_worker_after))
+    print(
+        f"{stats['updates']} updates in {stats['seconds']:.2f}s "
+        f"({stats['updates_per_second']:,.0f} updates/s), per worker: {stats['per_worker']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import os
+from typing import List, NamedTuple, Tuple
+
+from telegram import Update
+from telegram.ext import Application
+
+from src.config.settings import (
+    AI_WORKERS, AI_TT_SIZE, METRICS_PORT, STATS_BACKEND, STATS_PATH, DEFAULT_RATING, RATING_K_FACTOR,
+    REPLAY_ARCHIVE_PATH,
+)
+from src.bot.application import create_application, drain_updates, init_bot_data
+from src.bot.broadcast import get_broadcaster
+from src.bot.handlers.bot_opponent import is_bot_turn
+from src.bot.handlers.callback_handlers import play_bot_turn
+from src.bot.handlers.matchmaking_handlers import drop_open_game, start_matched_game
+from src.bot.handlers.webapp_handlers import play_webapp_bot_turn
+from src.cluster.fake import OfflineRequest
+from src.cluster.link import ClusterLink, RemoteStats
+from src.cluster.ring import HashRing
+from src.games.logic import ai
+from src.games.replays import open_replay_writer
+from src.games.stats import get_stats, open_stats_store
+from src.games.store import get_store, open_game_store, set_worker_index
+from src.games.store.codec import decode_game, encode_game
+from src.games.tournament import Tournament, get_tournaments
+from src.utils.logger import LOG_DIR, logger, set_log_file
+
+# Supervisor -> worker messages (tuples, first item is the kind):
+#   ("updates", [raw update dicts])  process, in order within each chat
+#   ("ring", [worker indexes])       hand off games this worker no longer owns
+#   ("adopt", [(chat id, record, players, spectators)], [tournaments])
+#                                    take over games and tournaments handed off by others
+#   ("match", match, [busy user ids])  start a match hosted in one of our chats
+#   ("drop_open", [user ids])        remove the open games these players started
+#   ("result", game result)          record a game another worker finished (services worker)
+#   ("ratings", asker, request id, [user ids])  look up ratings for a worker (services worker)
+#   ("rated", request id, {user id: rating})    the answer to a ratings request
+#   ("closed",)                      sent by the worker to itself to stop reading
+#   ("stop",)                        drain, shut down, report
+# To the services worker only, the other workers' seats as they report them:
+#   ("seated", index, [(user id, phase)]), ("seats", index, [(user id, phase or None)])
+# Worker -> supervisor:
+#   ("ready", index, games),
+#   ("handoff", index, ([(chat id, record, players, spectators)], [tournaments])),
+#   ("stopped", index, updates processed)
+#   ("seated", index, [(user id, phase)])  every player seated here, at start
+#   ("seats", index, [(user id, phase or None)])  players whose game changed
+#   ("match", index, match)          a match made by the services worker
+#   ("result", index, game result)   a finished game, for the services worker's stats
+#   ("ratings", index, (request id, [user ids])), ("rated", index, (asker, request id, ratings))
+
+
+class WorkerOptions(NamedTuple):
+    store_backend: str
+    store_path: str
+    offline: bool = False
+    log_level: int = logging.INFO
+
+
+def worker_store_path(root: str, index: int) -> str:
+    return os.path.join(root, f"worker-{index}")
+
+
+class SeatReporter:
+    """
+    Tells the supervisor which players have a game on this worker.
+
+    Installed as the store's on_player. Changes are collected and sent
+    once per event-loop pass, so a handler that seats two players and
+    starts their game costs one message. Each player is reported with the
+    phase of their game, or None once they have none here.
+    """
+
+    def __init__(self, index: int, outbox, store):
+        self.index = index
+        self.outbox = outbox
+        self.store = store
+        self._changed = set()
+
+    def __call__(self, user_id: int) -> None:
+        if not self._changed:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self._changed.add(user_id)
+
+    def flush(self) -> None:
+        changed, self._changed = self._changed, set()
+        changes = []
+        for user_id in changed:
+            game = self.store.for_player(user_id)
+            changes.append((user_id, game.phase if game is not None else None))
+        if changes:
+            self.outbox.put(("seats", self.index, changes))
+
+
+def run_worker(index: int, inbox, outbox, options: WorkerOptions) -> None:
+    """Process entry point: serve one shard until told to stop."""
+    logger.setLevel(options.log_level)
+    # Each process rotates its own file; sharing one would race at midnight
+    set_log_file(os.path.join(LOG_DIR, f"worker-{index}.log"))
+    try:
+        asyncio.run(_serve(index, inbox, outbox, options))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _serve(index: int, inbox, outbox, options: WorkerOptions) -> None:
+    set_worker_index(index)
+    application = create_application(OfflineRequest() if options.offline else None, updater=False)
+    store = open_game_store(options.store_backend, worker_store_path(options.store_path, index))
+    application.bot_data["store"] = store
+    cluster = ClusterLink(index, outbox)
+    application.bot_data["cluster"] = cluster
+    if cluster.services:
+        # The cluster's one stats store, where a single process keeps it too
+        application.bot_data["stats"] = open_stats_store(STATS_BACKEND, STATS_PATH, DEFAULT_RATING, RATING_K_FACTOR)
+    else:
+        application.bot_data["stats"] = RemoteStats(cluster)
+    application.bot_data["replays"] = open_replay_writer(
+        REPLAY_ARCHIVE_PATH and worker_store_path(REPLAY_ARCHIVE_PATH, index)
+    )
+    application.bot_data["metrics_port"] = METRICS_PORT + 1 + index if METRICS_PORT else 0
+    ai.configure_pool(AI_WORKERS, AI_TT_SIZE)
+
+    await application.initialize()
+    await init_bot_data(application)
+    await application.start()
+    outbox.put(("seated", index, [(user_id, game.phase) for user_id, game in store.seated()]))
+    store.on_player = SeatReporter(index, outbox, store)
+    outbox.put(("ready", index, len(store)))
+    logger.info(f"Worker {index} ready (pid {os.getpid()}, {len(store)} games)")
+
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+    reader = loop.create_task(_read_inbox(inbox, messages, cluster))
+    processed = 0
+    try:
+        while True:
+            message = await messages.get()
+            kind = message[0]
+            if kind == "updates":
+                for data in message[1]:
+                    application.update_queue.put_nowait(Update.de_json(data, application.bot))
+                processed += len(message[1])
+            elif kind == "ring":
+                await drain_updates(application)
+                outbox.put(("handoff", index, hand_off(application, HashRing(message[1]), index)))
+            elif kind == "adopt":
+                adopt(application, message[1], message[2])
+            elif kind == "match":
+                start_matched_game(application, message[1], message[2])
+            elif kind == "result":
+                get_stats(application).record(message[1])
+            elif kind == "ratings":
+                _, asker, request_id, user_ids = message
+                stats = get_stats(application)
+                ratings = {user_id: player.rating for user_id, player in
+                           ((user_id, stats.get(user_id)) for user_id in user_ids) if player is not None}
+                cluster.send("rated", (asker, request_id, ratings))
+            elif kind == "drop_open":
+                for user_id in message[1]:
+                    drop_open_game(application, user_id)
+            elif kind == "seated":
+                cluster.seats.reset(message[1], message[2])
+            elif kind == "seats":
+                cluster.seats.update(message[1], message[2])
+            elif kind == "stop":
+                break
+    finally:
+        await drain_updates(application)
+        await application.stop()
+        await application.post_stop(application)
+        await application.shutdown()
+        await application.post_shutdown(application)
+        ai.shutdown_pool()
+        inbox.put(("closed",))
+        await reader
+        outbox.put(("stopped", index, processed))
+
+
+async def _read_inbox(inbox, messages: asyncio.Queue, cluster: ClusterLink) -> None:
+    """
+    Move supervisor messages onto the event loop, answering requests at once.
+
+    The messages are handled one at a time, and handling "ring" or "stop"
+    waits for running handlers; one of those may be waiting for the answer
+    to a request, so answers don't queue behind them.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await loop.run_in_executor(None, inbox.get)
+        kind = message[0]
+        if kind == "closed":
+            return
+        if kind == "rated":
+            cluster.answer(message[1], message[2])
+        else:
+            messages.put_nowait(message)
+
+
+def hand_off(application: Application, ring: HashRing,
+             index: int) -> Tuple[List[Tuple[int, bytes, List[int], List[int]]], List[Tournament]]:
+    """
+    Remove every game and tournament the new ring assigns to another
+    worker. Games are serialized with their players and spectators;
+    tournaments go as they are, since their bracket nodes refer to the
+    games moving with them.
+    """
+    store = get_store(application)
+    broadcaster = get_broadcaster(application)
+    tournaments = get_tournaments(application)
+    moved = []
+    for game in store:
+        if ring.node_for(game.chat_id) != index:
+            players = [user_id for user_id in (game.player_x, game.player_o)
+                       if user_id is not None and store.for_player(user_id) is game]
+            moved.append((game.chat_id, encode_game(game), players, broadcaster.release(game.game_id)))
+            store.remove(game.game_id)
+    moved_tournaments = [tournaments.close(chat_id) for chat_id in tournaments.chats()
+                         if ring.node_for(chat_id) != index]
+    if moved or moved_tournaments:
+        logger.info(f"Worker {index} handed off {len(moved)} games and {len(moved_tournaments)} tournaments")
+    return moved, moved_tournaments
+
+
+def adopt(application: Application, records: List[Tuple[int, bytes, List[int], List[int]]],
+          tournaments: List[Tournament] = ()) -> None:
+    """Take ownership of games and tournaments handed off by other workers."""
+    registry = get_tournaments(application)
+    for tournament in tournaments:
+        registry.add(tournament)
+    store = get_store(application)
+    broadcaster = get_broadcaster(application)
+    scheduler = application.bot_data.get("timeouts")
+    for chat_id, record, _, spectators in records:
+        game, _ = decode_game(record)
+        try:
+            store.put(game)
+        except ValueError as e:
+            logger.error(f"Not adopting a game from chat {chat_id}: {e}")
+            continue
+        if scheduler is not None:
+            scheduler.schedule(game.game_id)
+        # Spectators get the state again from here, and then every move
+        for user_id in spectators:
+            broadcaster.watch(game, user_id)
+        # A search the previous owner had in flight was dropped with the game
+        if is_bot_turn(game):
+            play = play_bot_turn if game.message_id else play_webapp_bot_turn
+            application.create_task(play(application, game.chat_id, game))
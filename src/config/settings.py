@@ -14,9 +14,97 @@ GAME_TIMEOUT_SECONDS = int(os.getenv('TIMEOUT_SECONDS', '60'))
 MAX_PIECES_PER_PLAYER = 4
 BOARD_SIZE = 4
 
+# Worker processes; above 1 a supervisor polls and shards chats across them
+BOT_WORKERS = int(os.getenv('BOT_WORKERS', '1'))
+
+# Updates processed at once; updates for the same chat still run one at a time
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '256'))
+# Updates that may wait behind the one in progress for a game; more are dropped
+SEQUENCER_MAILBOX_LIMIT = int(os.getenv('SEQUENCER_MAILBOX_LIMIT', '64'))
+
+# Webhook ingress: set WEBHOOK_URL (public base URL) to receive updates on an
+# embedded HTTP server behind a TLS proxy instead of polling
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+# Connections Telegram may open at once to deliver updates (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+# Prometheus metrics at http://METRICS_LISTEN:METRICS_PORT/metrics (0 disables);
+# worker processes use the ports after it
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9464'))
+
+# Per-update stage timings; updates slower than SLOW_UPDATE_MS are logged
+TRACE_UPDATES = os.getenv('TRACE_UPDATES', '1') == '1'
+SLOW_UPDATE_MS = float(os.getenv('SLOW_UPDATE_MS', '250'))
+
+# Users allowed to run admin commands (/profile), comma-separated ids
+ADMIN_USER_IDS = frozenset(int(i) for i in os.getenv('ADMIN_USER_IDS', '').split(',') if i.strip())
+# Sampled CPU profiles from /profile or SIGUSR1 are written here
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '10'))
+PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', '120'))
+
+# Game storage: "memory" or "journal" (snapshot + append-only move journal)
+GAME_STORE_BACKEND = os.getenv('GAME_STORE_BACKEND', 'memory')
+GAME_STORE_PATH = os.getenv('GAME_STORE_PATH', 'data/games')
+
+# Player statistics and ratings: "memory" or "journal" (snapshot + results journal)
+STATS_BACKEND = os.getenv('STATS_BACKEND', 'memory')
+STATS_PATH = os.getenv('STATS_PATH', 'data/stats')
+# Elo K-factor: most rating points one game can move
+RATING_K_FACTOR = float(os.getenv('RATING_K_FACTOR', '32'))
+LEADERBOARD_SIZE = int(os.getenv('LEADERBOARD_SIZE', '10'))
+
+# Every finished game is appended to this replay archive; empty turns it off
+REPLAY_ARCHIVE_PATH = os.getenv('REPLAY_ARCHIVE_PATH', 'data/replays')
+
+# Perfect-play table built offline with `python -m src.games.logic.solver`
+SOLUTION_TABLE_PATH = os.getenv('SOLUTION_TABLE_PATH', 'data/solution_table.bin')
+
+# Computer opponent
+BOT_PLAYER_NAME = "🤖 Bot"
+AI_MOVE_BUDGET_MS = int(os.getenv('AI_MOVE_BUDGET_MS', '300'))
+AI_WORKERS = int(os.getenv('AI_WORKERS', '2'))
+AI_TT_SIZE = int(os.getenv('AI_TT_SIZE', '200000'))
+
+# Outbound Bot API limits: sends per second overall, per private chat and
+# per group chat, and the burst a chat may use before being throttled
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))
+OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', '1'))
+OUTBOUND_GROUP_RATE = float(os.getenv('OUTBOUND_GROUP_RATE', str(20 / 60)))
+OUTBOUND_CHAT_BURST = float(os.getenv('OUTBOUND_CHAT_BURST', '3'))
+
+# Button texts of board layouts kept for reuse (LRU). Only the texts are
+# cached: markups carry the game id and version and are built per board.
+KEYBOARD_CACHE_SIZE = int(os.getenv('KEYBOARD_CACHE_SIZE', '4096'))
+
 # Webapp Settings
 WEBAPP_URL = "https://jimpsons.org/tictactoe"
 ALLOWED_ORIGINS = ["https://jimpsons.org"]
+# Send moves as versioned deltas (full state only on join/resync)
+WEBAPP_DELTA_UPDATES = os.getenv('WEBAPP_DELTA_UPDATES', '1') == '1'
+# Send the board in full states as a 16-character string instead of rows
+WEBAPP_PACKED_BOARD = os.getenv('WEBAPP_PACKED_BOARD', '0') == '1'
+# Spectators get a game's state at most once per SPECTATOR_INTERVAL seconds
+SPECTATOR_INTERVAL = float(os.getenv('SPECTATOR_INTERVAL', '1'))
+SPECTATOR_MAX_PER_GAME = int(os.getenv('SPECTATOR_MAX_PER_GAME', '5000'))
+
+# Matchmaking: players within MATCH_BASE_WINDOW rating points are paired;
+# the window widens by MATCH_WINDOW_STEP every MATCH_WIDEN_SECONDS of waiting
+DEFAULT_RATING = float(os.getenv('DEFAULT_RATING', '1200'))
+MATCH_BASE_WINDOW = float(os.getenv('MATCH_BASE_WINDOW', '100'))
+MATCH_WINDOW_STEP = float(os.getenv('MATCH_WINDOW_STEP', '50'))
+MATCH_MAX_WINDOW = float(os.getenv('MATCH_MAX_WINDOW', '800'))
+MATCH_WIDEN_SECONDS = float(os.getenv('MATCH_WIDEN_SECONDS', '5'))
+# Seconds between passes that pair players whose windows have widened
+MATCH_INTERVAL = float(os.getenv('MATCH_INTERVAL', '0.25'))
+
+# Most players one /tournament bracket takes
+TOURNAMENT_MAX_PLAYERS = int(os.getenv('TOURNAMENT_MAX_PLAYERS', '1024'))
 
 
 # TODO: Might need to remove inline bot sseeting
@@ -39,12 +127,35 @@ MESSAGES = {
     'cannot_play_self': "You can't play against yourself!",
     'not_your_turn': "Not your turn!",
     'space_occupied': "Space already occupied!",
+    'stale_board': "This board is out of date!",
+    'already_playing': "Finish your current game first!",
+    'queue_joined': "Looking for an opponent... (/leave to stop)",
+    'queue_already': "You're already looking for an opponent.",
+    'queue_busy': "Finish your current game first!",
+    'queue_left': "You stopped looking for an opponent.",
+    'queue_not_in': "You're not looking for an opponent.",
+    'no_stats': "No finished games yet. Play one with /start or /queue!",
+    'no_chat_stats': "Nobody has won a game in this chat yet.",
+    'watching': "👀 You're watching this game. Moves will come in our private chat; /unwatch to stop.",
+    'watch_own_game': "You're playing in this game!",
+    'watch_full': "This game has all the spectators it can take.",
+    'unwatched': "You stopped watching.",
+    'not_watching': "You're not watching a game.",
+    'tournament_open': "🏆 Tournament open! Use /enter to take part; the organizer starts it with /begin.",
+    'tournament_exists': "This chat already has a tournament. /bracket shows how it's going.",
+    'no_tournament': "No tournament in this chat. Use /tournament to open one.",
+    'tournament_started': "The tournament has already started.",
+    'tournament_entered_already': "You're already in the tournament.",
+    'tournament_full': "The tournament is full.",
+    'tournament_organizer_only': "Only the organizer can start the tournament.",
+    'tournament_too_few': "A tournament needs at least two players.",
     'timeout_win': (
         "⏰ Time's Up!\n\n"
         "Player {winner} ({winner_name}) wins by default!\n"
         "Player {loser} was inactive for too long.\n\n"
         "Use /start to begin a new game. 🎮"
     ),
+    'waiting_expired': "⏰ Nobody joined the game in time. Use /start to begin a new one.",
     'help_text': """
 4x4 Tic-Tac-Toe Game Rules:
 
@@ -60,6 +171,17 @@ MESSAGES = {
 Commands:
 /start - Start a new game
 /join - Join an existing game
+/queue - Find an opponent of similar rating
+/leave - Stop looking for an opponent
+/rank - Your rating and record
+/top - Highest rated players
+/leaderboard - Most wins in this chat
+/watch - Follow this chat's game in a private chat
+/unwatch - Stop following a game
+/tournament - Open a knockout tournament in this chat
+/enter - Enter this chat's tournament
+/begin - Start the tournament, organizer only
+/bracket - Show how the tournament is going
 /help - Show this help message
 """
 }
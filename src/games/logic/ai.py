@@ -0,0 +1,381 @@
+import asyncio
+import multiprocessing
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from .bitboard import (
+    FULL_MASK, INVERSE_SYMMETRIES, SYMMETRIES, WIN_MASKS,
+    canonical_symmetry, iter_cells, winning_mask_through,
+)
+from .solution_table import DRAW, LOSS, WIN, popcount
+
+MATE = 10000
+MATE_THRESHOLD = MATE - 1000
+MAX_DEPTH = 64
+DEFAULT_TT_SIZE = 200_000
+_TIME_CHECK_INTERVAL = 1024
+
+# Transposition table flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Move = (source cell or None for a placement, destination cell)
+Move = Tuple[Optional[int], int]
+
+
+class SearchResult(NamedTuple):
+    """Chosen move plus the statistics of the search that produced it."""
+    src: Optional[int]
+    dst: int
+    score: int
+    depth: int
+    nodes: int
+    elapsed: float  # seconds
+    tt_hits: int
+    tt_probes: int
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+
+def _zobrist_tables(seed: int = 0x5EED) -> List[List[int]]:
+    """Per-byte XOR tables: [mover low, mover high, other low, other high]."""
+    rng = random.Random(seed)
+    keys = [[rng.getrandbits(64) for _ in range(16)] for _ in range(2)]
+    tables = []
+    for role in range(2):
+        for shift in (0, 8):
+            table = [0] * 256
+            for value in range(256):
+                h = 0
+                for bit in range(8):
+                    if value >> bit & 1:
+                        h ^= keys[role][bit + shift]
+                table[value] = h
+            tables.append(table)
+    return tables
+
+
+_ZOBRIST = _zobrist_tables()
+
+
+def zobrist_hash(mover: int, other: int) -> int:
+    """Zobrist hash of a position given as (player to move, other player) masks."""
+    ml, mh, ol, oh = _ZOBRIST
+    return ml[mover & 0xFF] ^ mh[mover >> 8] ^ ol[other & 0xFF] ^ oh[other >> 8]
+
+
+class TranspositionTable:
+    """Bounded transposition table with least-recently-used eviction."""
+
+    def __init__(self, capacity: int = DEFAULT_TT_SIZE):
+        self.capacity = capacity
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.probes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: int) -> Optional[tuple]:
+        self.probes += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: int, entry: tuple) -> None:
+        entries = self._entries
+        entries[key] = entry
+        entries.move_to_end(key)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def generate_moves(mover: int, other: int) -> List[Move]:
+    """Legal moves for the player to move: placements until 4 pieces, then moves."""
+    empty = ~(mover | other) & FULL_MASK
+    if popcount(mover) < 4:
+        return [(None, dst) for dst in iter_cells(empty)]
+    return [(src, dst) for src in iter_cells(mover) for dst in iter_cells(empty)]
+
+
+def apply_move(mover: int, move: Move) -> int:
+    src, dst = move
+    if src is not None:
+        mover ^= 1 << src
+    return mover | (1 << dst)
+
+
+_LINE_WEIGHTS = (0, 1, 4, 16, 0)
+
+
+def evaluate(mover: int, other: int) -> int:
+    """Static score for the player to move: open lines weighted by pieces on them."""
+    score = 0
+    for mask in WIN_MASKS:
+        mine = mover & mask
+        theirs = other & mask
+        if not theirs:
+            score += _LINE_WEIGHTS[popcount(mine)]
+        elif not mine:
+            score -= _LINE_WEIGHTS[popcount(theirs)]
+    return score
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Searcher:
+    """Negamax alpha-beta search with a shared transposition table."""
+
+    def __init__(self, tt: TranspositionTable):
+        self.tt = tt
+        self.nodes = 0
+        self.deadline = 0.0
+        self.can_stop = False
+
+    def search(self, mover: int, other: int, budget_ms: float, max_depth: int = MAX_DEPTH) -> SearchResult:
+        """Iteratively deepen until the time budget runs out or a forced result is found."""
+        started = time.perf_counter()
+        self.deadline = started + budget_ms / 1000
+        self.nodes = 0
+        self.can_stop = False
+        hits, probes = self.tt.hits, self.tt.probes
+
+        moves = generate_moves(mover, other)
+        best_move, best_score, completed = moves[0], -MATE, 0
+        for depth in range(1, max_depth + 1):
+            try:
+                move, score = self._root(mover, other, moves, best_move, depth)
+            except _Timeout:
+                break
+            best_move, best_score, completed = move, score, depth
+            self.can_stop = True
+            if abs(score) >= MATE_THRESHOLD:
+                break
+
+        return SearchResult(
+            src=best_move[0],
+            dst=best_move[1],
+            score=best_score,
+            depth=completed,
+            nodes=self.nodes,
+            elapsed=time.perf_counter() - started,
+            tt_hits=self.tt.hits - hits,
+            tt_probes=self.tt.probes - probes,
+        )
+
+    def _root(self, mover: int, other: int, moves: List[Move], first: Move, depth: int) -> Tuple[Move, int]:
+        ordered = [first] + [m for m in moves if m != first]
+        alpha, beta = -MATE, MATE
+        best_move, best_score = first, -MATE
+        for move in ordered:
+            moved = apply_move(mover, move)
+            if winning_mask_through(moved, move[1]) is not None:
+                return move, MATE - 1
+            score = -self._negamax(other, moved, depth - 1, -beta, -alpha, 1)
+            if score > best_score:
+                best_move, best_score = move, score
+            alpha = max(alpha, score)
+        return best_move, best_score
+
+    def _negamax(self, mover: int, other: int, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.can_stop and not self.nodes % _TIME_CHECK_INTERVAL and time.perf_counter() > self.deadline:
+            raise _Timeout()
+        if depth <= 0:
+            return evaluate(mover, other)
+
+        key, symmetry = canonical_symmetry(mover, other)
+        h = zobrist_hash(key >> 16, key & 0xFFFF)
+        original_alpha = alpha
+        tt_move = None
+        entry = self.tt.get(h)
+        if entry is not None:
+            entry_depth, flag, score, canonical_move = entry
+            if score >= MATE_THRESHOLD:
+                score -= ply
+            elif score <= -MATE_THRESHOLD:
+                score += ply
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return score
+                if flag == LOWER and score >= beta:
+                    return score
+                if flag == UPPER and score <= alpha:
+                    return score
+            if canonical_move is not None:
+                inverse = INVERSE_SYMMETRIES[symmetry]
+                src, dst = canonical_move
+                tt_move = (None if src is None else inverse[src], inverse[dst])
+
+        moves = generate_moves(mover, other)
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        best_score, best_move = -MATE, moves[0]
+        for move in moves:
+            moved = apply_move(mover, move)
+            if winning_mask_through(moved, move[1]) is not None:
+                best_score, best_move = MATE - ply - 1, move
+                break
+            score = -self._negamax(other, moved, depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        stored = best_score
+        if stored >= MATE_THRESHOLD:
+            stored += ply
+        elif stored <= -MATE_THRESHOLD:
+            stored -= ply
+        perm = SYMMETRIES[symmetry]
+        src, dst = best_move
+        self.tt.put(h, (depth, flag, stored, (None if src is None else perm[src], perm[dst])))
+        return best_score
+
+
+# Each pool worker keeps one transposition table for its whole lifetime.
+_worker_tt: Optional[TranspositionTable] = None
+
+
+def _init_worker(tt_size: int) -> None:
+    global _worker_tt
+    _worker_tt = TranspositionTable(tt_size)
+
+
+def search_position(mover: int, other: int, budget_ms: float) -> SearchResult:
+    """Search a position for the player to move. Runs inside a pool worker."""
+    global _worker_tt
+    if _worker_tt is None:
+        _worker_tt = TranspositionTable()
+    return Searcher(_worker_tt).search(mover, other, budget_ms)
+
+
+def best_move_from_table(table, mover: int, other: int, player: str) -> Optional[SearchResult]:
+    """Pick a perfect-play move from the solution table without searching."""
+    started = time.perf_counter()
+    opponent = "O" if player == "X" else "X"
+    best, best_rank = None, None
+    moves = generate_moves(mover, other)
+    for move in moves:
+        moved = apply_move(mover, move)
+        if winning_mask_through(moved, move[1]) is not None:
+            best, best_rank = move, (3, 0)
+            break
+        x, o = (moved, other) if player == "X" else (other, moved)
+        evaluation = table.probe(x, o, opponent)
+        if evaluation is None:
+            return None
+        # Prefer the fastest win, then a draw, then the slowest loss.
+        if evaluation.outcome == LOSS:
+            rank = (2, -evaluation.distance)
+        elif evaluation.outcome == DRAW:
+            rank = (1, 0)
+        else:
+            rank = (0, evaluation.distance)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = move, rank
+    score = {3: MATE - 1, 2: MATE - 1 + best_rank[1], 1: 0, 0: -MATE + best_rank[1]}[best_rank[0]]
+    return SearchResult(best[0], best[1], score, 0, len(moves), time.perf_counter() - started, 0, 0)
+
+
+class SearchStats:
+    """Running totals over every move the computer opponent has chosen."""
+
+    def __init__(self):
+        self.searches = 0
+        self.nodes = 0
+        self.elapsed = 0.0
+        self.tt_hits = 0
+        self.tt_probes = 0
+
+    def record(self, result: SearchResult) -> None:
+        self.searches += 1
+        self.nodes += result.nodes
+        self.elapsed += result.elapsed
+        self.tt_hits += result.tt_hits
+        self.tt_probes += result.tt_probes
+
+    def as_dict(self) -> dict:
+        return {
+            "searches": self.searches,
+            "nodes": self.nodes,
+            "nodes_per_second": self.nodes / self.elapsed if self.elapsed else 0.0,
+            "tt_hit_rate": self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+        }
+
+
+search_stats = SearchStats()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_config = {"workers": 2, "tt_size": DEFAULT_TT_SIZE}
+
+
+def configure_pool(workers: int, tt_size: int = DEFAULT_TT_SIZE) -> None:
+    """Set the size of the search pool. Takes effect the next time it starts."""
+    _pool_config.update(workers=workers, tt_size=tt_size)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=_pool_config["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(_pool_config["tt_size"],),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def choose_move(game, budget_ms: float, table=None) -> SearchResult:
+    """
+    Choose a move for game.current_player.
+
+    Uses the solution table when one is loaded; otherwise searches in the
+    process pool so the event loop is never blocked.
+    """
+    board = game.board
+    if game.current_player == "X":
+        mover, other = board.x, board.o
+    else:
+        mover, other = board.o, board.x
+
+    result = None
+    if table is not None:
+        result = best_move_from_table(table, mover, other, game.current_player)
+    if result is None:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_get_pool(), search_position, mover, other, budget_ms)
+    search_stats.record(result)
+    return result
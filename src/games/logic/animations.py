@@ -1,52 +1,40 @@
-import asyncio
 from typing import List, Tuple
-from telegram import Bot
-from telegram.error import TelegramError
-from ...bot.keyboards.game_keyboard import create_keyboard_with_highlight
+from ...bot.keyboards.game_keyboard import create_board_keyboard
+from ...bot.outbox import ANIMATION, OutboundScheduler
 from ..models.game_state import GameState
 
-async def animate_win(
-    bot: Bot,
+FRAME_INTERVAL = 0.5
+
+def animate_win(
+    outbox: OutboundScheduler,
     game: GameState,
     winner: str,
     pattern: List[Tuple[int, int]]
 ) -> None:
     """
     Animate the winning move with emojis.
-    
+
+    Frames are queued on the outbound scheduler half a second apart and
+    this returns at once. Under rate limiting, frames that are still
+    waiting collapse into the newest one.
+
     Args:
-        bot: Telegram bot instance
+        outbox: Outbound scheduler that sends the edits
         game: Current game state
         winner: The winning player ("X" or "O")
         pattern: List of winning positions
     """
     animations = ["🎮", "🎲", "🎯", "🎪", "🎨"]
-    
-    try:
-        for anim in animations:
-            keyboard = create_keyboard_with_highlight(game.board, winning_pattern=pattern)
-            await bot.edit_message_text(
-                chat_id=game.chat_id,
-                message_id=game.message_id,
-                text=f"{anim} WINNER! {anim}\n\n"
-                     f"Player {winner} ({game.player_names[winner]}) wins!\n"
-                     f"Final Board Position:",
-                reply_markup=keyboard
-            )
-            await asyncio.sleep(0.5)
-    except TelegramError as e:
-        # Log error but don't raise - animation failure shouldn't break the game
-        print(f"Animation error: {e}")
-        # Still show final state
-        keyboard = create_keyboard_with_highlight(game.board, winning_pattern=pattern)
-        try:
-            await bot.edit_message_text(
-                chat_id=game.chat_id,
-                message_id=game.message_id,
-                text=f"🏆 WINNER! 🏆\n\n"
-                     f"Player {winner} ({game.player_names[winner]}) wins!\n"
-                     f"Final Board Position:",
-                reply_markup=keyboard
-            )
-        except TelegramError:
-            pass  # Ignore if final update fails too
\ No newline at end of file
+
+    keyboard = create_board_keyboard(game, winning_pattern=pattern)
+    for frame, anim in enumerate(animations):
+        outbox.edit_message_text(
+            game.chat_id,
+            game.message_id,
+            f"{anim} WINNER! {anim}\n\n"
+            f"Player {winner} ({game.player_names[winner]}) wins!\n"
+            f"Final Board Position:",
+            priority=ANIMATION,
+            delay=frame * FRAME_INTERVAL,
+            reply_markup=keyboard
+        )
@@ -0,0 +1,334 @@
+from typing import Iterator, List, Optional, Tuple
+
+# Cells are numbered row-major: cell = row * 4 + col, bit = 1 << cell.
+BOARD_CELLS = 16
+FULL_MASK = (1 << BOARD_CELLS) - 1
+EMPTY = " "
+_CELL_CHARS = (EMPTY, "X", "O")
+
+
+def _line_masks() -> List[int]:
+    """Build the 19 winning masks in the order the old board scan checked them."""
+    masks = []
+    for i in range(4):
+        masks.append(0xF << (4 * i))        # row i
+        masks.append(0x1111 << i)           # column i
+    masks.append(0x8421)                    # main diagonal
+    masks.append(0x1248)                    # anti-diagonal
+    for i in range(3):
+        for j in range(3):
+            masks.append(0x33 << (4 * i + j))  # 2x2 square at (i, j)
+    return masks
+
+
+WIN_MASKS: Tuple[int, ...] = tuple(_line_masks())
+WIN_POSITIONS = {
+    mask: tuple((cell // 4, cell % 4) for cell in range(BOARD_CELLS) if mask >> cell & 1)
+    for mask in WIN_MASKS
+}
+
+# For each cell, the winning masks that pass through it. After a piece lands
+# on a cell only these lines can have become complete.
+CELL_LINES: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(mask for mask in WIN_MASKS if mask >> cell & 1)
+    for cell in range(BOARD_CELLS)
+)
+
+# The eight symmetries of the square as (row, col) -> (row, col) maps. The
+# winning set (rows, columns, diagonals, 2x2 squares) is closed under all of
+# them, so symmetric positions have identical game values.
+_SYMMETRY_MAPS = (
+    lambda r, c: (r, c),
+    lambda r, c: (c, 3 - r),
+    lambda r, c: (3 - r, 3 - c),
+    lambda r, c: (3 - c, r),
+    lambda r, c: (r, 3 - c),
+    lambda r, c: (3 - r, c),
+    lambda r, c: (c, r),
+    lambda r, c: (3 - c, 3 - r),
+)
+
+
+def _cell_permutation(cell_map) -> Tuple[int, ...]:
+    """Turn a (row, col) map into a permutation of cell indexes."""
+    perm = []
+    for cell in range(BOARD_CELLS):
+        row, col = cell_map(cell // 4, cell % 4)
+        perm.append(row * 4 + col)
+    return tuple(perm)
+
+
+SYMMETRIES: Tuple[Tuple[int, ...], ...] = tuple(_cell_permutation(m) for m in _SYMMETRY_MAPS)
+
+
+def _byte_tables(perm: Tuple[int, ...]) -> Tuple[List[int], List[int]]:
+    """Split a cell permutation into lookup tables for the low and high mask bytes."""
+    low = [0] * 256
+    high = [0] * 256
+    for value in range(256):
+        for bit in range(8):
+            if value >> bit & 1:
+                low[value] |= 1 << perm[bit]
+                high[value] |= 1 << perm[bit + 8]
+    return low, high
+
+
+_SYMMETRY_TABLES = tuple(_byte_tables(perm) for perm in SYMMETRIES)
+
+
+def transform(mask: int, symmetry: int) -> int:
+    """Apply one of the eight board symmetries to a mask."""
+    low, high = _SYMMETRY_TABLES[symmetry]
+    return low[mask & 0xFF] | high[mask >> 8]
+
+
+def canonical_pair(a: int, b: int) -> Tuple[int, int]:
+    """
+    Return the canonical form of a pair of masks under the board symmetries.
+
+    The canonical key is the smallest (a' << 16 | b') over all eight images.
+    The second value is the number of symmetries that fix the position,
+    so the position has 8 // stabilizer distinct images.
+    """
+    best = -1
+    stabilizer = 0
+    a_low, a_high, b_low, b_high = a & 0xFF, a >> 8, b & 0xFF, b >> 8
+    for low, high in _SYMMETRY_TABLES:
+        key = (low[a_low] | high[a_high]) << 16 | low[b_low] | high[b_high]
+        if best < 0 or key < best:
+            best = key
+            stabilizer = 1
+        elif key == best:
+            stabilizer += 1
+    return best, stabilizer
+
+
+def canonical_symmetry(a: int, b: int) -> Tuple[int, int]:
+    """
+    Like canonical_pair, but return the index of a symmetry that maps the
+    position onto its canonical form instead of the stabilizer size.
+    """
+    best = -1
+    best_symmetry = 0
+    a_low, a_high, b_low, b_high = a & 0xFF, a >> 8, b & 0xFF, b >> 8
+    for symmetry, (low, high) in enumerate(_SYMMETRY_TABLES):
+        key = (low[a_low] | high[a_high]) << 16 | low[b_low] | high[b_high]
+        if best < 0 or key < best:
+            best = key
+            best_symmetry = symmetry
+    return best, best_symmetry
+
+
+INVERSE_SYMMETRIES: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(perm.index(cell) for cell in range(BOARD_CELLS)) for perm in SYMMETRIES
+)
+
+
+def cell_index(row: int, col: int) -> int:
+    """Convert a (row, col) position to a cell index."""
+    return row * 4 + col
+
+
+def iter_cells(mask: int) -> Iterator[int]:
+    """Yield the cell indexes of the bits set in mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def winning_mask(bits: int) -> Optional[int]:
+    """Return the first winning mask fully covered by bits, or None."""
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return mask
+    return None
+
+
+def winning_mask_through(bits: int, cell: int) -> Optional[int]:
+    """Return the first winning mask through cell fully covered by bits, or None."""
+    for mask in CELL_LINES[cell]:
+        if bits & mask == mask:
+            return mask
+    return None
+
+
+def mask_to_positions(mask: int) -> List[Tuple[int, int]]:
+    """Convert a winning mask to the list of (row, col) positions it covers."""
+    positions = WIN_POSITIONS.get(mask)
+    if positions is not None:
+        return list(positions)
+    return [(cell // 4, cell % 4) for cell in iter_cells(mask)]
+
+
+class _RowView:
+    """List-like view over one row of a Bitboard."""
+    __slots__ = ("_board", "_row")
+
+    def __init__(self, board: "Bitboard", row: int):
+        self._board = board
+        self._row = row
+
+    def __len__(self) -> int:
+        return 4
+
+    def __getitem__(self, col: int) -> str:
+        if not 0 <= col < 4:
+            raise IndexError("column out of range")
+        return self._board.cell(self._row * 4 + col)
+
+    def __setitem__(self, col: int, value: str) -> None:
+        if not 0 <= col < 4:
+            raise IndexError("column out of range")
+        self._board.set_cell(self._row * 4 + col, value)
+
+    def __iter__(self) -> Iterator[str]:
+        cell = self._board.cell
+        base = self._row * 4
+        return iter([cell(base), cell(base + 1), cell(base + 2), cell(base + 3)])
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class Bitboard:
+    """
+    4x4 board stored as one 16-bit mask per player.
+
+    Indexing (board[row][col]) and iteration behave like the old
+    List[List[str]] board so existing callers keep working.
+    """
+    __slots__ = ("x", "o")
+
+    def __init__(self, x: int = 0, o: int = 0):
+        self.x = x
+        self.o = o
+
+    @classmethod
+    def from_lists(cls, rows: List[List[str]]) -> "Bitboard":
+        """Build a bitboard from a list-of-lists board."""
+        board = cls()
+        for i, row in enumerate(rows):
+            for j, value in enumerate(row):
+                board.set_cell(i * 4 + j, value)
+        return board
+
+    def copy(self) -> "Bitboard":
+        return Bitboard(self.x, self.o)
+
+    @property
+    def occupied(self) -> int:
+        return self.x | self.o
+
+    @property
+    def empty(self) -> int:
+        return ~(self.x | self.o) & FULL_MASK
+
+    def mask(self, player: str) -> int:
+        """Return the mask of the given player's pieces."""
+        return self.x if player == "X" else self.o
+
+    def cell(self, index: int) -> str:
+        """Return "X", "O" or " " for the given cell."""
+        bit = 1 << index
+        if self.x & bit:
+            return "X"
+        if self.o & bit:
+            return "O"
+        return EMPTY
+
+    def set_cell(self, index: int, value: str) -> None:
+        """Set a cell to "X", "O" or " "."""
+        bit = 1 << index
+        self.x &= ~bit
+        self.o &= ~bit
+        if value == "X":
+            self.x |= bit
+        elif value == "O":
+            self.o |= bit
+
+    def is_empty(self, index: int) -> bool:
+        return not (self.x | self.o) >> index & 1
+
+    def owns(self, player: str, index: int) -> bool:
+        return bool(self.mask(player) >> index & 1)
+
+    def place(self, player: str, index: int) -> bool:
+        """Place a piece on an empty cell. Returns False if occupied or off the board."""
+        if not 0 <= index < BOARD_CELLS:
+            return False
+        bit = 1 << index
+        if (self.x | self.o) & bit:
+            return False
+        if player == "X":
+            self.x |= bit
+        else:
+            self.o |= bit
+        return True
+
+    def move(self, player: str, src: int, dst: int) -> bool:
+        """Move one of player's pieces to an empty cell (False if either cell is off the board)."""
+        if not (0 <= src < BOARD_CELLS and 0 <= dst < BOARD_CELLS):
+            return False
+        src_bit = 1 << src
+        dst_bit = 1 << dst
+        if (self.x | self.o) & dst_bit:
+            return False
+        if player == "X":
+            if not self.x & src_bit:
+                return False
+            self.x ^= src_bit | dst_bit
+        else:
+            if not self.o & src_bit:
+                return False
+            self.o ^= src_bit | dst_bit
+        return True
+
+    def find_win(self) -> Tuple[Optional[str], Optional[int]]:
+        """Return (winner, winning mask) or (None, None)."""
+        x, o = self.x, self.o
+        for mask in WIN_MASKS:
+            if x & mask == mask:
+                return "X", mask
+            if o & mask == mask:
+                return "O", mask
+        return None, None
+
+    def is_full(self) -> bool:
+        return (self.x | self.o) == FULL_MASK
+
+    def empty_cells(self) -> List[int]:
+        return list(iter_cells(self.empty))
+
+    # List-of-lists compatibility view
+
+    def __len__(self) -> int:
+        return 4
+
+    def __getitem__(self, row: int) -> _RowView:
+        if not 0 <= row < 4:
+            raise IndexError("row out of range")
+        return _RowView(self, row)
+
+    def __iter__(self) -> Iterator[_RowView]:
+        return (_RowView(self, i) for i in range(4))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Bitboard):
+            return self.x == other.x and self.o == other.o
+        return self.to_lists() == other
+
+    def to_string(self) -> str:
+        """Return the board as 16 characters ("X", "O", " "), row by row."""
+        return "".join(_CELL_CHARS[(self.x >> i & 1) | (self.o >> i & 1) << 1] for i in range(BOARD_CELLS))
+
+    def to_lists(self) -> List[List[str]]:
+        """Return the board as a list of lists of "X", "O" and " "."""
+        cell = self.cell
+        return [[cell(i * 4 + j) for j in range(4)] for i in range(4)]
+
+    def __repr__(self) -> str:
+        return f"Bitboard(x={self.x:#06x}, o={self.o:#06x})"
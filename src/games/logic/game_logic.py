@@ -1,55 +1,65 @@
-from typing import List, Optional, Tuple
+from typing import List, Optional, Tuple, Union
+from .bitboard import Bitboard, iter_cells, mask_to_positions, winning_mask_through
 
-def find_winning_pattern(board: List[List[str]]) -> Optional[List[Tuple[int, int]]]:
+Board = Union[Bitboard, List[List[str]]]
+
+
+def _as_bitboard(board: Board) -> Bitboard:
+    """Accept either a Bitboard or a legacy list-of-lists board."""
+    if isinstance(board, Bitboard):
+        return board
+    return Bitboard.from_lists(board)
+
+
+def find_win(board: Board) -> Tuple[Optional[str], Optional[List[Tuple[int, int]]]]:
+    """
+    Find the winner and winning pattern in a single pass.
+    Returns (winner, positions) or (None, None) if no winner.
+    """
+    winner, mask = _as_bitboard(board).find_win()
+    if winner is None:
+        return None, None
+    return winner, mask_to_positions(mask)
+
+
+def check_win_after_move(game, cell: int) -> Tuple[Optional[str], Optional[List[Tuple[int, int]]]]:
+    """
+    Check for a win after a piece was placed or moved onto cell.
+
+    Only the winning lines through that cell are examined, since no other
+    line can have changed. Returns (winner, positions) or (None, None).
+    """
+    board = game.board
+    player = board.cell(cell)
+    if player == " ":
+        return None, None
+    mask = winning_mask_through(board.mask(player), cell)
+    if mask is None:
+        return None, None
+    return player, mask_to_positions(mask)
+
+
+def find_winning_pattern(board: Board) -> Optional[List[Tuple[int, int]]]:
     """
     Find a winning pattern on the board.
     Returns the list of winning positions or None if no winner.
     """
-    # Check rows and columns
-    for i in range(4):
-        if all(board[i][j] == "X" for j in range(4)):
-            return [(i, j) for j in range(4)]
-        if all(board[i][j] == "O" for j in range(4)):
-            return [(i, j) for j in range(4)]
-        if all(board[j][i] == "X" for j in range(4)):
-            return [(j, i) for j in range(4)]
-        if all(board[j][i] == "O" for j in range(4)):
-            return [(j, i) for j in range(4)]
-
-    # Check diagonals
-    if all(board[i][i] == "X" for i in range(4)):
-        return [(i, i) for i in range(4)]
-    if all(board[i][i] == "O" for i in range(4)):
-        return [(i, i) for i in range(4)]
-    if all(board[i][3-i] == "X" for i in range(4)):
-        return [(i, 3-i) for i in range(4)]
-    if all(board[i][3-i] == "O" for i in range(4)):
-        return [(i, 3-i) for i in range(4)]
-
-    # Check 2x2 squares
-    for i in range(3):
-        for j in range(3):
-            if all(board[i+di][j+dj] == "X" for di, dj in [(0,0), (0,1), (1,0), (1,1)]):
-                return [(i+di, j+dj) for di, dj in [(0,0), (0,1), (1,0), (1,1)]]
-            if all(board[i+di][j+dj] == "O" for di, dj in [(0,0), (0,1), (1,0), (1,1)]):
-                return [(i+di, j+dj) for di, dj in [(0,0), (0,1), (1,0), (1,1)]]
-
-    return None
-
-def check_winner(board: List[List[str]]) -> Optional[str]:
+    return find_win(board)[1]
+
+
+def check_winner(board: Board) -> Optional[str]:
     """
     Check if there's a winner on the board.
     Returns the winning player ("X" or "O") or None if no winner.
     """
-    pattern = find_winning_pattern(board)
-    if pattern:
-        return board[pattern[0][0]][pattern[0][1]]
-    return None
+    return _as_bitboard(board).find_win()[0]
 
-def is_board_full(board: List[List[str]]) -> bool:
+
+def is_board_full(board: Board) -> bool:
     """Check if the board is completely filled."""
-    return all(cell != " " for row in board for cell in row)
+    return _as_bitboard(board).is_full()
+
 
-def get_valid_moves(board: List[List[str]]) -> List[Tuple[int, int]]:
+def get_valid_moves(board: Board) -> List[Tuple[int, int]]:
     """Get all valid moves (empty spaces) on the board."""
-    return [(i, j) for i in range(4) for j in range(4) if board[i][j] == " "]
\ No newline at end of file
+    return [(cell // 4, cell % 4) for cell in iter_cells(_as_bitboard(board).empty)]
@@ -0,0 +1,181 @@
+import mmap
+import os
+import struct
+import sys
+from math import comb
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .bitboard import FULL_MASK
+
+# Outcomes are stored from the point of view of the player to move.
+DRAW = 0
+WIN = 1
+LOSS = 2
+OUTCOME_NAMES = {DRAW: "draw", WIN: "win", LOSS: "loss"}
+
+MAGIC = b"TTT4SOLV"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sII")  # magic, format version, entry count
+ENTRY_SIZE = 2                   # uint16: distance << 2 | outcome
+
+# Every position that can occur, grouped by (X pieces, O pieces, player to
+# move). During placement the player to move follows from the piece counts;
+# once both players have 4 pieces either side can be on move.
+LAYERS: Tuple[Tuple[int, int, str], ...] = (
+    (0, 0, "X"), (1, 0, "O"), (1, 1, "X"), (2, 1, "O"),
+    (2, 2, "X"), (3, 2, "O"), (3, 3, "X"), (4, 3, "O"),
+    (4, 4, "X"), (4, 4, "O"),
+)
+
+
+class Evaluation(NamedTuple):
+    """Perfect-play result for the player to move."""
+    outcome: int   # DRAW, WIN or LOSS
+    distance: int  # plies until the result is forced (0 for draws)
+
+
+def _build_rank_table() -> List[int]:
+    """Colex rank of every 16-bit mask among masks with the same popcount."""
+    rank = [0] * (1 << 16)
+    for mask in range(1, 1 << 16):
+        top = mask.bit_length() - 1
+        rest = mask ^ (1 << top)
+        rank[mask] = rank[rest] + comb(top, bin(mask).count("1"))
+    return rank
+
+
+def _build_pext_table() -> List[int]:
+    """_PEXT8[selector << 8 | source] packs source's selected bits together."""
+    table = [0] * (1 << 16)
+    for selector in range(256):
+        bits = [b for b in range(8) if selector >> b & 1]
+        for source in range(256):
+            value = 0
+            for i, b in enumerate(bits):
+                if source >> b & 1:
+                    value |= 1 << i
+            table[selector << 8 | source] = value
+    return table
+
+
+_RANK = _build_rank_table()
+_PEXT8 = _build_pext_table()
+_POPCOUNT8 = [bin(i).count("1") for i in range(256)]
+_STRIDE = [[comb(16 - movers, others) for others in range(17)] for movers in range(17)]
+
+
+def popcount(mask: int) -> int:
+    return _POPCOUNT8[mask & 0xFF] + _POPCOUNT8[mask >> 8]
+
+
+def mask_rank(mask: int) -> int:
+    """Rank of a mask among all masks with the same number of bits set."""
+    return _RANK[mask]
+
+
+def layer_size(movers: int, others: int) -> int:
+    """Number of (mover, other) mask pairs with the given piece counts."""
+    return comb(16, movers) * comb(16 - movers, others)
+
+
+def state_index(mover: int, other: int) -> int:
+    """
+    Dense index of a position within its layer.
+
+    The mover's mask is ranked among all masks with its popcount, and the
+    other player's mask is ranked among the cells the mover leaves free.
+    """
+    free = ~mover & FULL_MASK
+    free_low = free & 0xFF
+    packed = (
+        _PEXT8[free_low << 8 | other & 0xFF]
+        | _PEXT8[(free >> 8) << 8 | other >> 8] << _POPCOUNT8[free_low]
+    )
+    return _RANK[mover] * _STRIDE[popcount(mover)][popcount(other)] + _RANK[packed]
+
+
+def _layer_offsets() -> Dict[Tuple[int, int, str], int]:
+    offsets = {}
+    total = 0
+    for layer in LAYERS:
+        offsets[layer] = total
+        total += layer_size(layer[0], layer[1])
+    return offsets
+
+
+LAYER_OFFSETS = _layer_offsets()
+TABLE_ENTRIES = sum(layer_size(x, o) for x, o, _ in LAYERS)
+
+
+def table_index(x: int, o: int, player: str) -> Optional[int]:
+    """Global table index of a position, or None if it cannot occur."""
+    offset = LAYER_OFFSETS.get((popcount(x), popcount(o), player))
+    if offset is None:
+        return None
+    if player == "X":
+        return offset + state_index(x, o)
+    return offset + state_index(o, x)
+
+
+def encode_entry(outcome: int, distance: int) -> int:
+    return distance << 2 | outcome
+
+
+def decode_entry(entry: int) -> Evaluation:
+    return Evaluation(entry & 3, entry >> 2)
+
+
+class SolutionTable:
+    """
+    Read-only perfect-play table backed by a memory-mapped file.
+
+    The mapping is shared through the page cache, so every bot process
+    can open the same file without holding its own copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or count != TABLE_ENTRIES:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a compatible solution table")
+        if len(self._mmap) < HEADER.size + count * ENTRY_SIZE:
+            self._mmap.close()
+            raise ValueError(f"{path} is truncated")
+        view = memoryview(self._mmap)[HEADER.size:HEADER.size + count * ENTRY_SIZE]
+        # Entries are little-endian; cast in place when the host agrees.
+        self._entries = view.cast("H") if sys.byteorder == "little" else None
+        self._view = view
+
+    def _entry(self, index: int) -> int:
+        if self._entries is not None:
+            return self._entries[index]
+        return struct.unpack_from("<H", self._view, index * ENTRY_SIZE)[0]
+
+    def probe(self, x: int, o: int, player: str) -> Optional[Evaluation]:
+        """Evaluate a raw position for the player to move."""
+        index = table_index(x, o, player)
+        if index is None:
+            return None
+        return decode_entry(self._entry(index))
+
+    def lookup(self, game) -> Optional[Evaluation]:
+        """Evaluate a GameState for its current player, if it is in play."""
+        if game.phase not in ("placement", "movement"):
+            return None
+        return self.probe(game.board.x, game.board.o, game.current_player)
+
+    def close(self) -> None:
+        if self._entries is not None:
+            self._entries.release()
+        self._view.release()
+        self._mmap.close()
+
+
+def load_solution_table(path: str) -> Optional[SolutionTable]:
+    """Open the table at path, or return None if it has not been built."""
+    if not path or not os.path.exists(path):
+        return None
+    return SolutionTable(path)
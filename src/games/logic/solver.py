@@ -0,0 +1,296 @@
+"""
+Offline retrograde solver for 4x4 Tic-Tac-Toe with placement and movement.
+
+Builds the perfect-play table read by SolutionTable:
+
+    python -m src.games.logic.solver --output data/solution_table.bin --workers 4
+
+Positions are solved in "mover form" (pieces of the player to move, pieces
+of the other player) and only one representative per symmetry class is
+searched. The movement phase can repeat positions, so it is solved by
+backward induction from the won positions; the placement layers are acyclic
+and are solved one layer at a time on top of it.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from array import array
+from itertools import combinations
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .bitboard import FULL_MASK, canonical_pair, iter_cells, winning_mask, winning_mask_through
+from .solution_table import (
+    DRAW, WIN, LOSS, FORMAT_VERSION, HEADER, LAYERS, MAGIC, TABLE_ENTRIES,
+    LAYER_OFFSETS, encode_entry, layer_size, mask_rank, state_index,
+)
+
+UNKNOWN = 3
+PIECES = 4
+MOVES_PER_POSITION = PIECES * (16 - 2 * PIECES)  # any own piece to any empty cell
+CHUNK_SIZE = 2048
+
+# Placement layers in mover form, in the order they are solved. Placing a
+# piece on (movers, others) leads to (others, movers + 1).
+PLACEMENT_LAYERS = ((3, 4), (3, 3), (2, 3), (2, 2), (1, 2), (1, 1), (0, 1), (0, 0))
+MOVEMENT_LAYER = (PIECES, PIECES)
+
+_layers = {}  # per-process copies of solved layers, filled by _init_worker
+
+
+def _init_worker(layers: dict) -> None:
+    _layers.clear()
+    for key, data in layers.items():
+        _layers[key] = array("H", data)
+
+
+def _masks(count: int, within: int = FULL_MASK) -> List[int]:
+    """All masks with count bits set among the cells of within."""
+    cells = list(iter_cells(within))
+    return [sum(1 << c for c in combo) for combo in combinations(cells, count)]
+
+
+def _chunks(items: Sequence, size: int = CHUNK_SIZE) -> List[Sequence]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _canonical_states(task: Tuple[int, Sequence[int]]) -> List[Tuple[int, int]]:
+    """Canonical (key, orbit size) pairs for the given movers masks."""
+    others, movers_masks = task
+    states = []
+    for mover in movers_masks:
+        for other in _masks(others, ~mover & FULL_MASK):
+            key, stabilizer = canonical_pair(mover, other)
+            if key == (mover << 16 | other):
+                states.append((key, 8 // stabilizer))
+    return states
+
+
+def _movement_predecessors(keys: Sequence[int]) -> List[Tuple[int, List[Tuple[int, int]]]]:
+    """
+    For each canonical position, list the canonical positions that reach it
+    in one move, once per move, with the position's own orbit size.
+    """
+    results = []
+    for key in keys:
+        mover, other = key >> 16, key & 0xFFFF
+        empty = ~(mover | other) & FULL_MASK
+        orbit = 8 // canonical_pair(mover, other)[1]
+        predecessors = []
+        # The other player just moved a piece from some empty cell onto dst.
+        for dst in iter_cells(other):
+            without = other ^ (1 << dst)
+            for src in iter_cells(empty):
+                pred, _ = canonical_pair(without | (1 << src), mover)
+                predecessors.append((state_index(pred >> 16, pred & 0xFFFF), pred))
+        results.append((orbit, predecessors))
+    return results
+
+
+def _placement_values(task: Tuple[Tuple[int, int], Sequence[int]]) -> List[int]:
+    """Solve placement positions given the solved layer they lead to."""
+    next_layer, keys = task
+    successors = _layers[next_layer]
+    entries = []
+    for key in keys:
+        mover, other = key >> 16, key & 0xFFFF
+        if winning_mask(other) is not None:
+            entries.append(encode_entry(LOSS, 0))
+            continue
+        best_win = None
+        worst_loss = 0
+        draw = False
+        for cell in iter_cells(~(mover | other) & FULL_MASK):
+            placed = mover | (1 << cell)
+            if winning_mask_through(placed, cell) is not None:
+                best_win = 1
+                break
+            succ, _ = canonical_pair(other, placed)
+            entry = successors[state_index(succ >> 16, succ & 0xFFFF)]
+            outcome, distance = entry & 3, entry >> 2
+            if outcome == LOSS:
+                if best_win is None or distance + 1 < best_win:
+                    best_win = distance + 1
+            elif outcome == DRAW:
+                draw = True
+            else:
+                worst_loss = max(worst_loss, distance + 1)
+        if best_win is not None:
+            entries.append(encode_entry(WIN, best_win))
+        elif draw:
+            entries.append(encode_entry(DRAW, 0))
+        else:
+            entries.append(encode_entry(LOSS, worst_loss))
+    return entries
+
+
+def _expand_layer(task: Tuple[Tuple[int, int], Sequence[int]]) -> List[Tuple[int, bytes]]:
+    """Copy canonical results to every position of a layer, one movers mask at a time."""
+    layer, movers_masks = task
+    movers, others = layer
+    solved = _layers[layer]
+    stride = layer_size(movers, others) // layer_size(movers, 0)
+    blocks = []
+    for mover in movers_masks:
+        base = mask_rank(mover) * stride
+        block = array("H", bytes(2 * stride))
+        for other in _masks(others, ~mover & FULL_MASK):
+            key, _ = canonical_pair(mover, other)
+            block[state_index(mover, other) - base] = solved[state_index(key >> 16, key & 0xFFFF)]
+        blocks.append((base, block.tobytes()))
+    return blocks
+
+
+def _run(pool, func, tasks: Iterable) -> Iterable:
+    if pool is None:
+        return map(func, tasks)
+    return pool.imap(func, tasks)
+
+
+def _make_pool(workers: int, layers: Optional[dict] = None):
+    payload = {key: data.tobytes() for key, data in (layers or {}).items()}
+    if workers <= 1:
+        _init_worker(payload)
+        return None
+    return multiprocessing.Pool(workers, initializer=_init_worker, initargs=(payload,))
+
+
+def _enumerate(pool, layer: Tuple[int, int]) -> List[Tuple[int, int]]:
+    movers, others = layer
+    tasks = [(others, chunk) for chunk in _chunks(_masks(movers), 16)]
+    states = []
+    for part in _run(pool, _canonical_states, tasks):
+        states.extend(part)
+    return states
+
+
+def solve_movement(pool, log=print) -> array:
+    """Retrograde analysis of the movement phase over canonical positions."""
+    size = layer_size(*MOVEMENT_LAYER)
+    outcome = bytearray([UNKNOWN]) * size
+    distance = array("H", bytes(2 * size))
+    remaining = array("i", bytes(4 * size))
+
+    frontier = []
+    states = _enumerate(pool, MOVEMENT_LAYER)
+    for key, orbit in states:
+        index = state_index(key >> 16, key & 0xFFFF)
+        remaining[index] = MOVES_PER_POSITION * orbit
+        if winning_mask(key & 0xFFFF) is not None:
+            outcome[index] = LOSS
+            frontier.append((index, key))
+    log(f"movement: {len(states)} canonical positions, {len(frontier)} terminal")
+
+    depth = 0
+    while frontier:
+        next_frontier = []
+        chunks = _chunks(frontier)
+        results = _run(pool, _movement_predecessors, [[key for _, key in chunk] for chunk in chunks])
+        for chunk, result in zip(chunks, results):
+            for (index, _), (orbit, predecessors) in zip(chunk, result):
+                lost = outcome[index] == LOSS
+                for pred_index, pred_key in predecessors:
+                    if outcome[pred_index] != UNKNOWN:
+                        continue
+                    if lost:
+                        outcome[pred_index] = WIN
+                    else:
+                        remaining[pred_index] -= orbit
+                        if remaining[pred_index]:
+                            continue
+                        outcome[pred_index] = LOSS
+                    distance[pred_index] = depth + 1
+                    next_frontier.append((pred_index, pred_key))
+        depth += 1
+        frontier = next_frontier
+        if frontier:
+            log(f"movement: depth {depth}, {len(frontier)} positions resolved")
+
+    entries = array("H", bytes(2 * size))
+    for key, _ in states:
+        index = state_index(key >> 16, key & 0xFFFF)
+        if outcome[index] == UNKNOWN:
+            entries[index] = encode_entry(DRAW, 0)
+        else:
+            entries[index] = encode_entry(outcome[index], distance[index])
+    return entries
+
+
+def solve(workers: int = 1, log=print) -> array:
+    """Solve every position and return the table entries in file order."""
+    started = time.monotonic()
+    solved = {}
+
+    pool = _make_pool(workers)
+    try:
+        solved[MOVEMENT_LAYER] = solve_movement(pool, log)
+    finally:
+        if pool is not None:
+            pool.close()
+
+    next_layer = MOVEMENT_LAYER
+    for layer in PLACEMENT_LAYERS:
+        pool = _make_pool(workers, {next_layer: solved[next_layer]})
+        try:
+            keys = [key for key, _ in _enumerate(pool, layer)]
+            entries = array("H", bytes(2 * layer_size(*layer)))
+            chunks = _chunks(keys)
+            for chunk, values in zip(chunks, _run(pool, _placement_values, [(next_layer, c) for c in chunks])):
+                for key, entry in zip(chunk, values):
+                    entries[state_index(key >> 16, key & 0xFFFF)] = entry
+            solved[layer] = entries
+            log(f"placement {layer}: {len(keys)} canonical positions")
+        finally:
+            if pool is not None:
+                pool.close()
+        next_layer = layer
+
+    table = array("H", bytes(2 * TABLE_ENTRIES))
+    pool = _make_pool(workers, solved)
+    try:
+        for nx, no, player in LAYERS:
+            layer = (nx, no) if player == "X" else (no, nx)
+            offset = LAYER_OFFSETS[(nx, no, player)]
+            tasks = [(layer, chunk) for chunk in _chunks(_masks(layer[0]), 16)]
+            for blocks in _run(pool, _expand_layer, tasks):
+                for base, data in blocks:
+                    block = array("H", data)
+                    table[offset + base:offset + base + len(block)] = block
+    finally:
+        if pool is not None:
+            pool.close()
+
+    log(f"solved {TABLE_ENTRIES} positions in {time.monotonic() - started:.1f}s")
+    return table
+
+
+def write_table(entries: array, path: str) -> None:
+    """Write entries to path atomically in the SolutionTable file format."""
+    data = array("H", entries)
+    if sys.byteorder != "little":
+        data.byteswap()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(entries)))
+        f.write(data.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the perfect-play solution table")
+    parser.add_argument("--output", default=os.path.join("data", "solution_table.bin"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    write_table(solve(args.workers), args.output)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
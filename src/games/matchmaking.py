@@ -0,0 +1,190 @@
+import heapq
+import math
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+
+class Ticket:
+    """A player waiting for an opponent."""
+    __slots__ = ("user_id", "chat_id", "name", "rating", "enqueued", "level")
+
+    def __init__(self, user_id: int, chat_id: int, name: str, rating: float, enqueued: float):
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.name = name
+        self.rating = rating
+        self.enqueued = enqueued
+        self.level = 0  # times the search window has widened
+
+    def _key(self) -> tuple:
+        return (self.rating, self.enqueued, self.user_id)
+
+
+class Match(NamedTuple):
+    """Two tickets paired by the matchmaker; first has waited longer."""
+    first: Ticket
+    second: Ticket
+    at: float
+
+    def waits(self) -> tuple:
+        """Seconds each player spent in the queue"""
+        return self.at - self.first.enqueued, self.at - self.second.enqueued
+
+
+class Matchmaker:
+    """
+    Global queue that pairs players of similar rating.
+
+    Tickets are indexed by rating in a SortedList, so enqueue and cancel are
+    O(log n) and the closest-rated candidates for a player are its
+    neighbours in that index. A player accepts an opponent within their
+    search window: base_window rating points at first, widened by
+    window_step every widen_every seconds up to max_window. Two players
+    match when each is inside the other's window.
+
+    A player can only become matchable when someone joins or when their own
+    window widens, so match_pass() only looks at tickets whose widening is
+    due, not at the whole queue. Those come from a min-heap of widening
+    times; entries for players who left are skipped when they come up, so
+    cancelling costs nothing there.
+    """
+
+    def __init__(
+        self,
+        base_window: float = 100,
+        window_step: float = 50,
+        max_window: float = 800,
+        widen_every: float = 5.0,
+        probes: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.base_window = base_window
+        self.window_step = window_step
+        self.max_window = max_window
+        self.widen_every = widen_every
+        self.probes = probes
+        self._clock = clock
+        self._tickets: Dict[int, Ticket] = {}
+        self._by_rating = SortedList()
+        self._widen_heap: List[Tuple[float, int, float]] = []  # (due, user_id, enqueued)
+        self._max_level = max(0, math.ceil((max_window - base_window) / window_step)) if window_step > 0 else 0
+        self.matched = 0
+        self.cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._tickets
+
+    def get(self, user_id: int) -> Optional[Ticket]:
+        return self._tickets.get(user_id)
+
+    def window(self, ticket: Ticket) -> float:
+        """Rating difference ticket accepts right now"""
+        return min(self.base_window + ticket.level * self.window_step, self.max_window)
+
+    def enqueue(self, user_id: int, chat_id: int, name: str, rating: float) -> Optional[Match]:
+        """
+        Queue a player, pairing them at once if someone suitable is waiting.
+
+        Returns the Match, or None if the player is now waiting (or already was).
+        """
+        if user_id in self._tickets:
+            return None
+        now = self._clock()
+        ticket = Ticket(user_id, chat_id, name, rating, now)
+        opponent = self._find(ticket)
+        if opponent is not None:
+            self._remove(opponent)
+            self.matched += 1
+            return Match(opponent, ticket, now)
+        self._tickets[user_id] = ticket
+        self._by_rating.add(ticket._key())
+        self._schedule_widen(ticket)
+        return None
+
+    def cancel(self, user_id: int) -> Optional[Ticket]:
+        """Take a player out of the queue; returns their ticket if they were in it."""
+        ticket = self._tickets.get(user_id)
+        if ticket is not None:
+            self._remove(ticket)
+            self.cancelled += 1
+        return ticket
+
+    def match_pass(self, now: Optional[float] = None) -> List[Match]:
+        """Widen every window that is due and pair whoever now fits."""
+        if now is None:
+            now = self._clock()
+        matches = []
+        heap = self._widen_heap
+        while heap and heap[0][0] <= now:
+            _, user_id, enqueued = heapq.heappop(heap)
+            ticket = self._tickets.get(user_id)
+            if ticket is None or ticket.enqueued != enqueued:
+                continue  # left the queue (and maybe came back) since
+            # Catch up if passes ran late; always at least one step
+            waited = int((now - enqueued) // self.widen_every)
+            ticket.level = min(max(ticket.level + 1, waited), self._max_level)
+            self._schedule_widen(ticket)
+            opponent = self._find(ticket)
+            if opponent is not None:
+                self._remove(ticket)
+                self._remove(opponent)
+                first, second = (ticket, opponent) if ticket.enqueued <= opponent.enqueued else (opponent, ticket)
+                matches.append(Match(first, second, now))
+        self.matched += len(matches)
+        return matches
+
+    def _find(self, ticket: Ticket) -> Optional[Ticket]:
+        """
+        Closest-rated waiting player that ticket and they both accept.
+
+        Walks outwards from ticket's rating, nearest first, looking at no
+        more than probes candidates on each side.
+        """
+        index = self._by_rating
+        window = self.window(ticket)
+        rating = ticket.rating
+        position = index.bisect_left(ticket._key())
+        # One slice of the neighbourhood; indexing a SortedList one item at
+        # a time costs a tree walk per item
+        start = max(0, position - self.probes)
+        nearby = index[start:position + self.probes + 1]
+        left, right = position - start - 1, position - start
+        if right < len(nearby) and nearby[right][2] == ticket.user_id:
+            right += 1  # ticket itself (when it is queued already)
+        while True:
+            left_gap = rating - nearby[left][0] if left >= 0 else None
+            right_gap = nearby[right][0] - rating if right < len(nearby) else None
+            if left_gap is None and right_gap is None:
+                return None
+            if right_gap is None or (left_gap is not None and left_gap <= right_gap):
+                gap, key = left_gap, nearby[left]
+                left -= 1
+            else:
+                gap, key = right_gap, nearby[right]
+                right += 1
+            if gap > window:
+                # Everyone further out on this side is further still; the
+                # other side is at least as far, since we take the nearer first
+                return None
+            candidate = self._tickets[key[2]]
+            if gap <= self.window(candidate):
+                return candidate
+
+    def _schedule_widen(self, ticket: Ticket) -> None:
+        if ticket.level < self._max_level:
+            due = ticket.enqueued + (ticket.level + 1) * self.widen_every
+            heapq.heappush(self._widen_heap, (due, ticket.user_id, ticket.enqueued))
+
+    def _remove(self, ticket: Ticket) -> None:
+        del self._tickets[ticket.user_id]
+        self._by_rating.remove(ticket._key())
+
+
+def get_matchmaker(context) -> Matchmaker:
+    """Return the matchmaker from a handler context or an Application."""
+    return context.bot_data["matchmaker"]
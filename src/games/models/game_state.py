@@ -1,92 +1,225 @@
-from typing import Dict, Optional, List, Tuple
-import asyncio
+from typing import Dict, Iterator, Optional, List, Tuple
+import time
+from src.games.logic.bitboard import Bitboard
+from src.games.logic.game_logic import check_win_after_move
+from src.utils.tracing import span
+
+_PLAYER_FIELDS = {"X": "player_x", "O": "player_o"}
+_NAME_FIELDS = {"X": "name_x", "O": "name_o"}
+_PLACED_FIELDS = {"X": "placed_x", "O": "placed_o"}
+
+
+class SymbolFields:
+    """
+    Dict-like view of a pair of per-player slots, so game.players["X"]
+    reads and writes game.player_x. Views are created on access and hold
+    no state of their own.
+    """
+    __slots__ = ("_game", "_fields")
+
+    def __init__(self, game: "GameState", fields: Dict[str, str]):
+        self._game = game
+        self._fields = fields
+
+    def __getitem__(self, symbol: str):
+        return getattr(self._game, self._fields[symbol])
+
+    def __setitem__(self, symbol: str, value) -> None:
+        setattr(self._game, self._fields[symbol], value)
+
+    def get(self, symbol: str, default=None):
+        field = self._fields.get(symbol)
+        return default if field is None else getattr(self._game, field)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return 2
+
+    def keys(self):
+        return self._fields.keys()
+
+    def values(self) -> List:
+        return [getattr(self._game, field) for field in self._fields.values()]
+
+    def items(self) -> List[Tuple[str, object]]:
+        return [(symbol, getattr(self._game, field)) for symbol, field in self._fields.items()]
+
+    def __eq__(self, other) -> bool:
+        return dict(self.items()) == other
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
 
 class GameState:
     """
     Represents the state of a 4x4 Tic-Tac-Toe game.
     Handles game state management and validation.
+
+    Most games in memory are idle, so the layout is fixed: __slots__, one
+    field per player instead of per-game dicts, and the board as a bitboard.
+    players, player_names and pieces remain available as dict-like views.
     """
-    def __init__(self, chat_id: int = None):  # Make chat_id optional with default None
+    __slots__ = (
+        "chat_id", "game_id", "board", "current_player", "phase",
+        "player_x", "player_o", "name_x", "name_o", "placed_x", "placed_o",
+        "selected_piece", "message_id", "bot_player",
+        "winner", "winning_pattern", "last_action_time", "version",
+        "started_at", "moves",
+    )
+
+    def __init__(self, chat_id: int = None, game_id: int = 0):  # Make chat_id optional with default None
         self.chat_id: int = chat_id
-        self.board: List[List[str]] = [[" " for _ in range(4)] for _ in range(4)]
+        self.game_id: int = game_id  # distinguishes successive games in one chat
+        self.board: Bitboard = Bitboard()
         self.current_player: str = "X"
-        self.pieces: Dict[str, int] = {"X": 0, "O": 0}
-        self.players: Dict[str, Optional[int]] = {"X": None, "O": None}
-        self.player_names: Dict[str, Optional[str]] = {"X": None, "O": None}
         self.phase: str = "waiting"  # waiting, placement, movement, finished
+        self.player_x: Optional[int] = None
+        self.player_o: Optional[int] = None
+        self.name_x: Optional[str] = None
+        self.name_o: Optional[str] = None
+        self.placed_x: int = 0
+        self.placed_o: int = 0
         self.selected_piece: Optional[Tuple[int, int]] = None
         self.message_id: Optional[int] = None
-        self.last_action_time = asyncio.get_event_loop().time()
+        self.bot_player: Optional[str] = None  # symbol played by the computer, if any
+        self.winner: Optional[str] = None
+        self.winning_pattern: Optional[List[Tuple[int, int]]] = None
+        self.last_action_time: float = time.monotonic()
+        self.version: int = 0  # bumped on every change players can see
+        self.started_at: float = time.time()
+        self.moves: bytearray = bytearray()  # one encode_move byte per move played
+
+    @property
+    def players(self) -> SymbolFields:
+        """Player ids by symbol"""
+        return SymbolFields(self, _PLAYER_FIELDS)
+
+    @property
+    def player_names(self) -> SymbolFields:
+        """Player display names by symbol"""
+        return SymbolFields(self, _NAME_FIELDS)
 
-    def to_dict(self) -> dict:
-        """Convert game state to dictionary for WebApp"""
+    @property
+    def pieces(self) -> SymbolFields:
+        """Pieces placed so far by symbol"""
+        return SymbolFields(self, _PLACED_FIELDS)
+
+    @classmethod
+    def restore(
+        cls,
+        chat_id: int,
+        x_bits: int,
+        o_bits: int,
+        current_player: str,
+        phase: str,
+        player_x: Optional[int],
+        player_o: Optional[int],
+        name_x: Optional[str],
+        name_o: Optional[str],
+        placed_x: int,
+        placed_o: int,
+        message_id: Optional[int] = None,
+        bot_player: Optional[str] = None,
+        version: int = 0,
+        game_id: int = 0,
+        started_at: float = 0.0,
+        moves: bytes = b"",
+    ) -> "GameState":
+        """Rebuild a stored game without going through the defaults in __init__"""
+        game = cls.__new__(cls)
+        game.chat_id = chat_id
+        game.game_id = game_id
+        game.board = Bitboard(x_bits, o_bits)
+        game.current_player = current_player
+        game.phase = phase
+        game.player_x = player_x
+        game.player_o = player_o
+        game.name_x = name_x
+        game.name_o = name_o
+        game.placed_x = placed_x
+        game.placed_o = placed_o
+        game.selected_piece = None
+        game.message_id = message_id
+        game.bot_player = bot_player
+        game.winner = None
+        game.winning_pattern = None
+        game.last_action_time = time.monotonic()
+        game.version = version
+        game.started_at = started_at
+        game.moves = bytearray(moves)
+        return game
+
+    def to_dict(self, packed: bool = False) -> dict:
+        """
+        Convert game state to dictionary for WebApp.
+
+        Args:
+            packed: Send the board as one 16-character string, row by row,
+                instead of a list of lists
+        """
         return {
-            "board": self.board,
+            "board": self.board.to_string() if packed else self.board.to_lists(),
             "currentPlayer": self.current_player,
             "phase": self.phase,
-            "piecesPlaced": self.pieces,
+            "piecesPlaced": {"X": self.placed_x, "O": self.placed_o},
             "players": {
-                "X": {"id": self.players["X"], "name": self.player_names["X"]},
-                "O": {"id": self.players["O"], "name": self.player_names["O"]}
+                "X": {"id": self.player_x, "name": self.name_x},
+                "O": {"id": self.player_o, "name": self.name_o}
             }
         }
 
+    def current_player_id(self) -> Optional[int]:
+        """Id of the player whose turn it is"""
+        return self.player_x if self.current_player == "X" else self.player_o
+
     def update_last_action_time(self) -> None:
         """Update the last action time to prevent timeout"""
-        self.last_action_time = asyncio.get_event_loop().time()
+        self.last_action_time = time.monotonic()
 
     def handle_webapp_move(self, user_id: int, position: int, selected: Optional[int] = None) -> bool:
-        """Handle move from WebApp"""
-        if user_id != self.players[self.current_player]:
+        """
+        Handle move from WebApp.
+
+        On success the lines through the target cell are checked once and
+        the result is left in self.winner and self.winning_pattern.
+        """
+        if user_id != self.current_player_id():
             return False
-            
-        row, col = position // 4, position % 4
-        
+
         if self.phase == "placement":
-            if self.board[row][col] != " ":
-                return False
-                
-            self.board[row][col] = self.current_player
-            self.pieces[self.current_player] += 1
-            return True
-            
-        elif self.phase == "movement" and selected is not None:
-            old_row, old_col = selected // 4, selected % 4
-            if self.board[old_row][old_col] != self.current_player:
-                return False
-                
-            if self.board[row][col] != " ":
-                return False
-                
-            self.board[old_row][old_col] = " "
-            self.board[row][col] = self.current_player
-            return True
-            
-        return False
-
-    # Might need to remove below code 
+            moved = self._handle_placement(position)
+        elif self.phase == "movement":
+            moved = self._handle_movement(position, selected)
+        else:
+            return False
+
+        if moved:
+            with span("win_check"):
+                self.winner, self.winning_pattern = check_win_after_move(self, position)
+            self.version += 1
+        return moved
+
+    def advance_turn(self) -> None:
+        """Pass the turn, switching to the movement phase once all pieces are placed"""
+        if self.phase == "placement" and self.placed_x == 4 and self.placed_o == 4:
+            self.phase = "movement"
+            self.current_player = "X"
+        else:
+            self.current_player = "O" if self.current_player == "X" else "X"
+
     def _handle_placement(self, position: int) -> bool:
-        row, col = position // 4, position % 4
-        if self.board[row][col] != " ":
+        if not self.board.place(self.current_player, position):
             return False
-            
-        self.board[row][col] = self.current_player
-        self.pieces[self.current_player] += 1
+        if self.current_player == "X":
+            self.placed_x += 1
+        else:
+            self.placed_o += 1
         return True
 
     def _handle_movement(self, position: int, selected: Optional[int]) -> bool:
         if selected is None:
             return False
-            
-        old_row, old_col = selected // 4, selected % 4
-        new_row, new_col = position // 4, position % 4
-        
-        if self.board[old_row][old_col] != self.current_player:
-            return False
-            
-        if self.board[new_row][new_col] != " ":
-            return False
-            
-        self.board[old_row][old_col] = " "
-        self.board[new_row][new_col] = self.current_player
-        return True
\ No newline at end of file
+        return self.board.move(self.current_player, selected, position)
@@ -0,0 +1,20 @@
+from typing import Optional
+
+from src.games.replays.archive import ReplayArchive, ReplayWriter
+from src.games.replays.format import Replay, decode_replay, encode_replay, replay_from_game
+
+
+def open_replay_writer(path: str) -> Optional[ReplayWriter]:
+    """Open the archive at path for appending, or None if archiving is off (empty path)."""
+    return ReplayWriter(path) if path else None
+
+
+def get_replays(context) -> Optional[ReplayWriter]:
+    """Return the replay archive from a handler context or an Application, if there is one."""
+    return context.bot_data.get("replays")
+
+
+__all__ = [
+    'Replay', 'ReplayArchive', 'ReplayWriter', 'decode_replay', 'encode_replay', 'replay_from_game',
+    'open_replay_writer', 'get_replays',
+]
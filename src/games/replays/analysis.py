@@ -0,0 +1,296 @@
+"""
+Batch analysis over the replay archive.
+
+    python -m src.games.replays.analysis data/replays --openings 4
+    python -m src.games.replays.analysis data/replays --suspicious --workers 8 --since 2026-10-01
+
+Replays stream out of the memory-mapped archive through generators into
+analyzers; nothing holds more than one replay at a time. The archive is
+cut into chunks of records that a process pool works through in
+parallel, each worker mapping the same files, and the partial results
+are merged at the end.
+
+An analyzer has add(replay) and merge(other). OpeningStats counts results
+by the position reached after the first few moves, with symmetric
+positions counted together. EngineAgreement measures, per player, how
+often a move was among the best ones whenever the choice mattered; with
+the solution table that is perfect play, without it the move a shallow
+search picks. Players who agree with the engine almost always over many
+decisions are reported as suspicious.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from src.games.logic.ai import Searcher, TranspositionTable, apply_move, generate_moves
+from src.games.logic.bitboard import canonical_pair, winning_mask_through
+from src.games.logic.solution_table import DRAW, LOSS, load_solution_table
+from src.games.replays.archive import ReplayArchive
+from src.games.replays.format import Replay, play_moves
+from src.games.store.codec import encode_move
+
+DEFAULT_CHUNK = 20_000
+# Positions a judge remembers before starting over
+_JUDGE_CACHE_SIZE = 500_000
+
+
+def board_text(x: int, o: int) -> str:
+    """Four rows of X, O and . for a position"""
+    cells = ["X" if x >> cell & 1 else "O" if o >> cell & 1 else "." for cell in range(16)]
+    return "/".join("".join(cells[row * 4:row * 4 + 4]) for row in range(4))
+
+
+class OpeningStats:
+    """Games and wins by the (symmetry-reduced) position after the first plies moves."""
+
+    def __init__(self, plies: int = 4):
+        self.plies = plies
+        self.openings: Dict[int, List[int]] = {}  # canonical key -> [games, X wins, O wins]
+
+    def add(self, replay: Replay) -> None:
+        if len(replay.moves) < self.plies:
+            return
+        key, _ = canonical_pair(*play_moves(replay.moves[:self.plies]))
+        counts = self.openings.get(key)
+        if counts is None:
+            counts = self.openings[key] = [0, 0, 0]
+        counts[0] += 1
+        if replay.winner == "X":
+            counts[1] += 1
+        elif replay.winner == "O":
+            counts[2] += 1
+
+    def merge(self, other: "OpeningStats") -> None:
+        for key, (games, x_wins, o_wins) in other.openings.items():
+            counts = self.openings.setdefault(key, [0, 0, 0])
+            counts[0] += games
+            counts[1] += x_wins
+            counts[2] += o_wins
+
+    def top(self, count: int) -> List[Tuple[str, int, int, int]]:
+        """Most played openings as (board text, games, X wins, O wins)."""
+        ranked = sorted(self.openings.items(), key=lambda item: -item[1][0])[:count]
+        return [(board_text(key >> 16, key & 0xFFFF), *counts) for key, counts in ranked]
+
+
+class TableJudge:
+    """Best moves by perfect play, from the solution table."""
+
+    def __init__(self, table):
+        self.table = table
+        self._cache: Dict[Tuple[int, int, str], Optional[FrozenSet[int]]] = {}
+
+    def best_moves(self, x: int, o: int, player: str) -> Optional[FrozenSet[int]]:
+        """
+        Packed moves that keep the best result available, or None if every
+        move leads to the same result (no decision to judge).
+        """
+        key = (x, o, player)
+        if key in self._cache:
+            return self._cache[key]
+        mover, other = (x, o) if player == "X" else (o, x)
+        opponent = "O" if player == "X" else "X"
+        classes = {}
+        for move in generate_moves(mover, other):
+            moved = apply_move(mover, move)
+            if winning_mask_through(moved, move[1]) is not None:
+                value = 3
+            else:
+                evaluation = self.table.probe(*((moved, other) if player == "X" else (other, moved)), opponent)
+                if evaluation is None:
+                    return None
+                # The opponent's result after the move, from the mover's side
+                value = 2 if evaluation.outcome == LOSS else 1 if evaluation.outcome == DRAW else 0
+            classes[encode_move(move[1], move[0])] = value
+        best = max(classes.values(), default=None)
+        result = None
+        if best is not None and min(classes.values()) != best:
+            result = frozenset(move for move, value in classes.items() if value == best)
+        if len(self._cache) >= _JUDGE_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = result
+        return result
+
+
+class SearchJudge:
+    """The move a depth-limited search picks; cheaper and only approximate."""
+
+    def __init__(self, depth: int = 3):
+        self.depth = depth
+        self._searcher = Searcher(TranspositionTable(1 << 16))
+        self._cache: Dict[Tuple[int, int, str], FrozenSet[int]] = {}
+
+    def best_moves(self, x: int, o: int, player: str) -> Optional[FrozenSet[int]]:
+        key = (x, o, player)
+        result = self._cache.get(key)
+        if result is None:
+            mover, other = (x, o) if player == "X" else (o, x)
+            found = self._searcher.search(mover, other, budget_ms=10_000, max_depth=self.depth)
+            result = frozenset((encode_move(found.dst, found.src),))
+            if len(self._cache) >= _JUDGE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = result
+        return result
+
+
+class EngineAgreement:
+    """Per player: decisions that mattered, and how many were engine moves."""
+
+    def __init__(self, table_path: Optional[str] = None, depth: int = 3):
+        self.table_path = table_path
+        self.depth = depth
+        self.players: Dict[int, List[int]] = {}  # user id -> [decisions, best moves]
+        self._judge = None
+
+    def __getstate__(self) -> dict:
+        # Judges hold an open table and caches; each process makes its own
+        state = self.__dict__.copy()
+        state["_judge"] = None
+        return state
+
+    def _make_judge(self):
+        table = load_solution_table(self.table_path) if self.table_path else None
+        return TableJudge(table) if table is not None else SearchJudge(self.depth)
+
+    def add(self, replay: Replay) -> None:
+        judge = self._judge
+        if judge is None:
+            judge = self._judge = self._make_judge()
+        x_counts = self.players.setdefault(replay.x_id, [0, 0])
+        o_counts = None if replay.bot else self.players.setdefault(replay.o_id, [0, 0])
+        for x, o, player, packed in replay.positions():
+            counts = x_counts if player == "X" else o_counts
+            if counts is None:
+                continue
+            best = judge.best_moves(x, o, player)
+            if best is None:
+                continue
+            counts[0] += 1
+            if packed in best:
+                counts[1] += 1
+
+    def merge(self, other: "EngineAgreement") -> None:
+        for user_id, (decisions, best) in other.players.items():
+            counts = self.players.setdefault(user_id, [0, 0])
+            counts[0] += decisions
+            counts[1] += best
+
+    def suspicious(self, min_decisions: int = 50, threshold: float = 0.9) -> List[Tuple[int, int, float]]:
+        """(user id, decisions, agreement) of players at or above threshold, highest first."""
+        flagged = [
+            (user_id, decisions, best / decisions)
+            for user_id, (decisions, best) in self.players.items()
+            if decisions >= min_decisions and best / decisions >= threshold
+        ]
+        return sorted(flagged, key=lambda item: (-item[2], -item[1]))
+
+
+def run_analyzers(archive: ReplayArchive, analyzers: Sequence, start: int = 0, stop: Optional[int] = None) -> int:
+    """Feed replays start..stop-1 to every analyzer; returns how many were read."""
+    count = 0
+    for replay in archive.range(start, stop):
+        for analyzer in analyzers:
+            analyzer.add(replay)
+        count += 1
+    return count
+
+
+def _analyze_chunk(directory: str, analyzers: Sequence, start: int, stop: int) -> Tuple[Sequence, int]:
+    archive = ReplayArchive(directory)
+    try:
+        count = run_analyzers(archive, analyzers, start, stop)
+    finally:
+        archive.close()
+    return analyzers, count
+
+
+def analyze(
+    directory: str,
+    analyzers: Sequence,
+    workers: Optional[int] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    chunk_records: int = DEFAULT_CHUNK,
+) -> int:
+    """
+    Run analyzers over the replays that ended in [since, until), in chunks
+    of chunk_records across a pool of workers processes (one process: no
+    pool). Partial results are merged into analyzers. Returns the number
+    of replays read.
+    """
+    archive = ReplayArchive(directory)
+    try:
+        start, stop = archive.time_range(since, until)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or stop - start <= chunk_records:
+            return run_analyzers(archive, analyzers, start, stop)
+    finally:
+        archive.close()
+
+    starts = list(range(start, stop, chunk_records))
+    stops = [min(first + chunk_records, stop) for first in starts]
+    total = 0
+    # Spawned like the engine's search pool: forking a process with
+    # threads running is not safe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for parts, count in pool.map(_analyze_chunk, repeat(directory), repeat(analyzers), starts, stops):
+            for analyzer, part in zip(analyzers, parts):
+                analyzer.merge(part)
+            total += count
+    return total
+
+
+def _timestamp(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main() -> None:
+    from src.config.settings import SOLUTION_TABLE_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="replay archive directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--since", type=_timestamp, help="ISO date or epoch seconds")
+    parser.add_argument("--until", type=_timestamp, help="ISO date or epoch seconds")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="replays per work item")
+    parser.add_argument("--openings", type=int, metavar="PLIES", help="results by position after PLIES moves")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--suspicious", action="store_true", help="players who nearly always play the engine move")
+    parser.add_argument("--solution-table", default=SOLUTION_TABLE_PATH)
+    parser.add_argument("--depth", type=int, default=3, help="search depth when there is no solution table")
+    parser.add_argument("--min-decisions", type=int, default=50)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    openings = OpeningStats(args.openings) if args.openings else None
+    agreement = EngineAgreement(args.solution_table, args.depth) if args.suspicious else None
+    analyzers = [analyzer for analyzer in (openings, agreement) if analyzer is not None]
+    if not analyzers:
+        parser.error("nothing to do: pass --openings and/or --suspicious")
+
+    started = time.perf_counter()
+    count = analyze(args.directory, analyzers, args.workers, args.since, args.until, args.chunk)
+    elapsed = time.perf_counter() - started
+    print(f"{count} replays in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.0f}/s, {args.workers} workers)")
+
+    if openings is not None:
+        print(f"\n{len(openings.openings)} distinct positions after {args.openings} moves; most played:")
+        for board, games, x_wins, o_wins in openings.top(args.top):
+            print(f"  {board}  {games:>8} games  X {x_wins / games:6.1%}  O {o_wins / games:6.1%}")
+    if agreement is not None:
+        flagged = agreement.suspicious(args.min_decisions, args.threshold)
+        print(f"\n{len(flagged)} of {len(agreement.players)} players at or above {args.threshold:.0%} engine agreement:")
+        for user_id, decisions, rate in flagged[:args.top]:
+            print(f"  {user_id:>14}  {decisions:>7} decisions  {rate:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
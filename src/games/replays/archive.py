@@ -0,0 +1,335 @@
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+from src.games.replays.format import HEADER, Replay, decode_replay, encode_replay
+from src.utils.fs import fsync_directory
+from src.utils.logger import logger
+
+MAGIC = b"T4GREPLY"
+# 2: move counts are 32-bit
+FORMAT_VERSION = 2
+_FILE_HEADER = struct.Struct("<8sI")  # magic, format version
+_TIME_ENTRY = struct.Struct("<QQ")    # record offset, end time
+_USER_ENTRY = struct.Struct("<qq")    # user id, record number
+_PLAYER_IDS = struct.Struct("<qq")    # X and O ids, at _PLAYERS_OFFSET in a record header
+_PLAYERS_OFFSET = 16
+_SEGMENT_PATTERN = re.compile(r"^users-(\d{10})-(\d{10})\.idx$")
+
+DATA_FILE = "replays.bin"
+TIME_INDEX = "times.idx"
+
+
+def _segment_name(start: int, stop: int) -> str:
+    return f"users-{start:010d}-{stop:010d}.idx"
+
+
+def _segments(directory: str) -> List[Tuple[int, int, str]]:
+    """(first record, record after the last, path) of each user index segment, in order."""
+    found = []
+    for name in os.listdir(directory):
+        match = _SEGMENT_PATTERN.match(name)
+        if match:
+            found.append((int(match.group(1)), int(match.group(2)), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def _words(buffer) -> array:
+    """A little-endian file of 64-bit ints as an array, copied only on big-endian hosts."""
+    if sys.byteorder == "little":
+        return memoryview(buffer).cast("q") if len(buffer) else array("q")
+    words = array("q", bytes(buffer))
+    words.byteswap()
+    return words
+
+
+def _map(path: str):
+    """Read-only map of path, or empty bytes for an empty file."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ReplayWriter:
+    """
+    Append-only archive of finished games.
+
+    replays.bin holds encode_replay records back to back after a small
+    file header. times.idx has one (offset, end time) entry per record in
+    append order, so record n is found directly and a time range by
+    binary search. The user index is written in immutable sorted
+    segments, users-<first>-<stop>.idx, each covering segment_records
+    games; readers index the records not in a segment yet themselves.
+
+    Appends go to a buffer that a background thread writes out every
+    flush_interval seconds, data before index, so the time index never
+    points past the data. On open, data beyond the last indexed record
+    (from a crash between the two writes) is cut off.
+    """
+
+    def __init__(self, directory: str, flush_interval: float = 1.0, segment_records: int = 65536,
+                 fsync: bool = True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.segment_records = segment_records
+        self.fsync = fsync
+
+        data_path = os.path.join(directory, DATA_FILE)
+        index_path = os.path.join(directory, TIME_INDEX)
+        if not os.path.exists(data_path) or os.path.getsize(data_path) < _FILE_HEADER.size:
+            with open(data_path, "wb") as f:
+                f.write(_FILE_HEADER.pack(MAGIC, FORMAT_VERSION))
+            open(index_path, "wb").close()
+        with open(data_path, "rb") as f:
+            magic, version = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{data_path} is not a version {FORMAT_VERSION} replay archive")
+        self.records, data_end = self._recover(data_path, index_path)
+
+        self._data = open(data_path, "ab")
+        self._index = open(index_path, "ab")
+        self._offset = data_end
+        segments = _segments(directory)
+        self._segmented = segments[-1][1] if segments else 0
+        # (user id, record number) for records not in a segment yet
+        self._pending: List[Tuple[int, int]] = self._scan_players(self._segmented, self.records)
+        self._lock = threading.Lock()
+        self._data_buffer = bytearray()
+        self._index_buffer = bytearray()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="replay-archive", daemon=True)
+        self._flusher.start()
+
+    def _recover(self, data_path: str, index_path: str) -> Tuple[int, int]:
+        """Trim torn tails; returns (record count, end of the last record)."""
+        index_size = os.path.getsize(index_path)
+        records = index_size // _TIME_ENTRY.size
+        end = _FILE_HEADER.size
+        if records:
+            with open(index_path, "rb") as f:
+                f.seek((records - 1) * _TIME_ENTRY.size)
+                offset, _ = _TIME_ENTRY.unpack(f.read(_TIME_ENTRY.size))
+            with open(data_path, "rb") as f:
+                f.seek(offset)
+                header = f.read(HEADER.size)
+            end = offset + HEADER.size + HEADER.unpack(header)[-1]
+        if records * _TIME_ENTRY.size != index_size:
+            os.truncate(index_path, records * _TIME_ENTRY.size)
+        if os.path.getsize(data_path) != end:
+            logger.warning(f"Cutting replay archive {data_path} back to {records} records")
+            os.truncate(data_path, end)
+        return records, end
+
+    def _scan_players(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        if start >= stop:
+            return []
+        archive = ReplayArchive(self.directory)
+        try:
+            return [(user_id, number) for number in range(start, stop)
+                    for user_id in archive.players(number)]
+        finally:
+            archive.close()
+
+    def append(self, replay: Replay) -> int:
+        """Queue a replay for writing; returns its record number."""
+        record = encode_replay(replay)
+        with self._lock:
+            number = self.records
+            self._index_buffer += _TIME_ENTRY.pack(self._offset, replay.ended)
+            self._data_buffer += record
+            self._offset += len(record)
+            self._pending.append((replay.x_id, number))
+            self._pending.append((replay.o_id, number))
+            self.records += 1
+        return number
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Replay archive flush failed: {e}")
+
+    def flush(self) -> None:
+        """Write out everything appended so far, then any user index segment that is full."""
+        with self._lock:
+            data, self._data_buffer = self._data_buffer, bytearray()
+            index, self._index_buffer = self._index_buffer, bytearray()
+            written = self.records
+            full = written - self._segmented >= self.segment_records
+            if full:
+                pending, self._pending = self._pending, []
+            if data:
+                for f, chunk in ((self._data, data), (self._index, index)):
+                    f.write(chunk)
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+        if full:
+            self._write_segment(self._segmented, written, pending)
+            self._segmented = written
+
+    def _write_segment(self, start: int, stop: int, pairs: List[Tuple[int, int]]) -> None:
+        pairs.sort()
+        path = os.path.join(self.directory, _segment_name(start, stop))
+        words = array("q", [value for pair in pairs for value in pair])
+        if sys.byteorder != "little":
+            words.byteswap()
+        with open(f"{path}.tmp", "wb") as f:
+            words.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{path}.tmp", path)
+        fsync_directory(self.directory)
+
+    def close(self) -> None:
+        """Stop the flusher and write out the buffer."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+
+class ReplayArchive:
+    """
+    Read-only, memory-mapped view of a replay archive.
+
+    Only records the writer has flushed are visible; refresh() picks up
+    newer ones. Records past the last user index segment are indexed in
+    memory on the first by-user lookup. Several processes can map the same archive and share its
+    pages through the page cache.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._maps = []
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Remap the files to see records flushed since the archive was opened."""
+        self.close()
+        self._data = _map(os.path.join(self.directory, DATA_FILE))
+        self._index_map = _map(os.path.join(self.directory, TIME_INDEX))
+        self._times = _words(self._index_map)
+        self._segments = []
+        for start, stop, path in _segments(self.directory):
+            segment_map = _map(path)
+            self._segments.append((start, stop, _words(segment_map)))
+            self._maps.append(segment_map)
+        self._maps += [self._data, self._index_map]
+        # The index may be flushed ahead of the data this process mapped
+        count = len(self._times) // 2
+        while count and not self._complete(self._times[2 * count - 2]):
+            count -= 1
+        self._count = count
+        self._segmented = self._segments[-1][1] if self._segments else 0
+        self._tail = None
+
+    def _complete(self, offset: int) -> bool:
+        data = self._data
+        return (offset + HEADER.size <= len(data)
+                and offset + HEADER.size + HEADER.unpack_from(data, offset)[-1] <= len(data))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def offset(self, number: int) -> int:
+        return self._times[2 * number]
+
+    def __getitem__(self, number: int) -> Replay:
+        if not 0 <= number < self._count:
+            raise IndexError("replay number out of range")
+        return decode_replay(self._data, self._times[2 * number])[0]
+
+    def players(self, number: int) -> Tuple[int, int]:
+        """(X id, O id) of a record, read without decoding the rest"""
+        return _PLAYER_IDS.unpack_from(self._data, self._times[2 * number] + _PLAYERS_OFFSET)
+
+    def range(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Replay]:
+        """Replays start..stop-1 in the order they were archived."""
+        stop = self._count if stop is None else min(stop, self._count)
+        if start >= stop:
+            return
+        data = self._data
+        offset = self._times[2 * start]
+        for _ in range(start, stop):
+            replay, offset = decode_replay(data, offset)
+            yield replay
+
+    def __iter__(self) -> Iterator[Replay]:
+        return self.range()
+
+    def time_range(self, since: Optional[float] = None, until: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Record numbers [start, stop) of games that ended in [since, until).
+        End times follow append order, so this is two binary searches.
+        """
+        return (self._bisect_time(since) if since is not None else 0,
+                self._bisect_time(until) if until is not None else self._count)
+
+    def _bisect_time(self, when: float) -> int:
+        times = self._times
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if times[2 * middle + 1] < when:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def between(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[Replay]:
+        """Replays of games that ended in [since, until)."""
+        return self.range(*self.time_range(since, until))
+
+    def numbers_for_user(self, user_id: int) -> List[int]:
+        """Record numbers of every game user_id played, oldest first."""
+        numbers = []
+        for _, _, words in self._segments:
+            low, high = 0, len(words) // 2
+            while low < high:
+                middle = (low + high) // 2
+                if words[2 * middle] < user_id:
+                    low = middle + 1
+                else:
+                    high = middle
+            while low < len(words) // 2 and words[2 * low] == user_id:
+                numbers.append(words[2 * low + 1])
+                low += 1
+        if self._tail is None:
+            # Records past the last segment, indexed once per refresh
+            tail = {}
+            for number in range(self._segmented, self._count):
+                for player in set(self.players(number)):
+                    tail.setdefault(player, []).append(number)
+            self._tail = tail
+        numbers += self._tail.get(user_id, ())
+        return sorted(set(numbers))
+
+    def by_user(self, user_id: int) -> Iterator[Replay]:
+        """Replays of every game user_id played, oldest first."""
+        for number in self.numbers_for_user(user_id):
+            yield self[number]
+
+    def close(self) -> None:
+        for _, _, words in getattr(self, "_segments", ()):
+            if isinstance(words, memoryview):
+                words.release()
+        times = getattr(self, "_times", None)
+        if isinstance(times, memoryview):
+            times.release()
+        for mapped in self._maps:
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._maps = []
+        self._segments = []
@@ -0,0 +1,108 @@
+import struct
+import time
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from src.games.models.game_state import GameState
+from src.games.store.codec import decode_move
+
+# Results as stored: who won, if anyone
+RESULT_NONE, RESULT_X, RESULT_O = 0, 1, 2
+_RESULTS = {None: RESULT_NONE, "X": RESULT_X, "O": RESULT_O}
+_WINNERS = (None, "X", "O")
+
+FLAG_TIMEOUT = 1  # the loser was inactive for too long
+FLAG_BOT = 2      # O was the computer
+
+# game id, chat id, X id, O id, start time (s), end time (s), result, flags,
+# move count; then one encode_move byte per move
+HEADER = struct.Struct("<qqqqIIBBI")
+
+
+class Replay(NamedTuple):
+    """A finished game: who played, when, how it ended and every move."""
+    game_id: int
+    chat_id: int
+    x_id: int
+    o_id: int
+    started: int
+    ended: int
+    winner: Optional[str]
+    timed_out: bool
+    bot: bool
+    moves: bytes
+
+    def players(self) -> Tuple[int, int]:
+        return self.x_id, self.o_id
+
+    def positions(self) -> Iterator[Tuple[int, int, str, int]]:
+        """
+        Yield (x mask, o mask, player to move, packed move) for each move,
+        with the masks as they were before it.
+        """
+        return replay_positions(self.moves)
+
+
+def replay_from_game(game: GameState, timed_out: bool = False, ended: Optional[float] = None) -> Replay:
+    """Replay record for a game that has just ended."""
+    if timed_out:
+        winner = "O" if game.current_player == "X" else "X"
+    else:
+        winner = game.winner
+    return Replay(
+        game.game_id, game.chat_id or 0, game.player_x or 0, game.player_o or 0,
+        int(game.started_at), int(time.time() if ended is None else ended),
+        winner, timed_out, game.bot_player is not None, bytes(game.moves),
+    )
+
+
+def encode_replay(replay: Replay) -> bytes:
+    flags = (FLAG_TIMEOUT if replay.timed_out else 0) | (FLAG_BOT if replay.bot else 0)
+    return HEADER.pack(
+        replay.game_id, replay.chat_id, replay.x_id, replay.o_id, replay.started, replay.ended,
+        _RESULTS[replay.winner], flags, len(replay.moves),
+    ) + replay.moves
+
+
+def decode_replay(buffer, offset: int = 0) -> Tuple[Replay, int]:
+    """Read a replay written by encode_replay; returns (replay, next offset)."""
+    game_id, chat_id, x_id, o_id, started, ended, result, flags, count = HEADER.unpack_from(buffer, offset)
+    start = offset + HEADER.size
+    return Replay(
+        game_id, chat_id, x_id, o_id, started, ended, _WINNERS[result],
+        bool(flags & FLAG_TIMEOUT), bool(flags & FLAG_BOT), bytes(buffer[start:start + count]),
+    ), start + count
+
+
+def _apply(x: int, o: int, player: str, packed: int) -> Tuple[int, int]:
+    position, selected = decode_move(packed)
+    bit = 1 << position
+    if selected is not None:
+        bit |= 1 << selected  # toggles the piece off its old cell
+    return (x ^ bit, o) if player == "X" else (x, o ^ bit)
+
+
+def replay_positions(moves: bytes) -> Iterator[Tuple[int, int, str, int]]:
+    """
+    Play moves through the bitboard rules, yielding (x mask, o mask, player
+    to move, packed move) before each one.
+
+    Moves were validated when they were played, so they are applied
+    without checking; X moves first and players alternate, both in the
+    placement and the movement phase.
+    """
+    x = o = 0
+    player = "X"
+    for packed in moves:
+        yield x, o, player, packed
+        x, o = _apply(x, o, player, packed)
+        player = "O" if player == "X" else "X"
+
+
+def play_moves(moves: bytes) -> Tuple[int, int]:
+    """(x mask, o mask) after playing moves from the empty board."""
+    x = o = 0
+    player = "X"
+    for packed in moves:
+        x, o = _apply(x, o, player, packed)
+        player = "O" if player == "X" else "X"
+    return x, o
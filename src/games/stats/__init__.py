@@ -0,0 +1,24 @@
+from src.games.stats.base import GameResult, InMemoryStatsStore, PlayerStats, StatsStore
+from src.games.stats.journal import JournaledStatsStore
+
+
+def open_stats_store(
+    backend: str = "memory", path: str = "data/stats", initial_rating: float = 1200, k_factor: float = 32
+) -> StatsStore:
+    """Create the configured stats store ("memory" or "journal")."""
+    if backend == "journal":
+        return JournaledStatsStore(path, initial_rating, k_factor)
+    if backend == "memory":
+        return InMemoryStatsStore(initial_rating, k_factor)
+    raise ValueError(f"Unknown stats store backend: {backend}")
+
+
+def get_stats(context) -> StatsStore:
+    """Return the stats store from a handler context or an Application."""
+    return context.bot_data["stats"]
+
+
+__all__ = [
+    'GameResult', 'PlayerStats', 'StatsStore', 'InMemoryStatsStore', 'JournaledStatsStore',
+    'open_stats_store', 'get_stats',
+]
@@ -0,0 +1,206 @@
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+OP_RESULT = 1  # journal record: chat id + RESULT_FIELDS + names
+
+# winner id, loser id, winner's moves, loser timed out, winner name length
+RESULT_FIELDS = struct.Struct("<qqHBH")
+
+# Index entries pack a score and a (non-negative) user id into one int,
+# highest score first: SortedList compares ints much faster than tuples
+_ID_BITS = 64
+_ID_MASK = (1 << _ID_BITS) - 1
+RATING_SCALE = 1_000_000  # ratings are ranked to a millionth of a point
+
+
+def _index_key(score: int, user_id: int) -> int:
+    return (-score << _ID_BITS) | user_id
+
+
+class GameResult(NamedTuple):
+    """Outcome of a finished game between two people."""
+    chat_id: int
+    winner_id: int
+    loser_id: int
+    moves: int  # moves the winner made
+    timed_out: bool = False  # the loser was inactive for too long
+    winner_name: Optional[str] = None
+    loser_name: Optional[str] = None
+
+
+def encode_result(result: GameResult) -> bytes:
+    """Journal payload for a result (the chat id goes in the record header)."""
+    winner_name = (result.winner_name or "").encode("utf-8")
+    loser_name = (result.loser_name or "").encode("utf-8")
+    return RESULT_FIELDS.pack(
+        result.winner_id, result.loser_id, result.moves, result.timed_out, len(winner_name)
+    ) + winner_name + loser_name
+
+
+def decode_result(chat_id: int, payload) -> GameResult:
+    winner_id, loser_id, moves, timed_out, name_length = RESULT_FIELDS.unpack_from(payload)
+    names = bytes(payload[RESULT_FIELDS.size:])
+    return GameResult(
+        chat_id, winner_id, loser_id, moves, bool(timed_out),
+        names[:name_length].decode("utf-8") or None, names[name_length:].decode("utf-8") or None
+    )
+
+
+class PlayerStats:
+    """Running totals for one player."""
+    __slots__ = ("user_id", "name", "rating", "wins", "losses", "timeouts", "board_wins", "win_moves")
+
+    def __init__(self, user_id: int, name: Optional[str], rating: float):
+        self.user_id = user_id
+        self.name = name
+        self.rating = rating
+        self.wins = 0
+        self.losses = 0
+        self.timeouts = 0    # losses by inactivity
+        self.board_wins = 0  # wins on the board, not by the opponent timing out
+        self.win_moves = 0   # moves made in board wins
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.losses
+
+    @property
+    def average_moves_to_win(self) -> Optional[float]:
+        return self.win_moves / self.board_wins if self.board_wins else None
+
+    def _key(self) -> int:
+        return _index_key(round(self.rating * RATING_SCALE), self.user_id)
+
+
+def elo_update(winner: float, loser: float, k_factor: float) -> Tuple[float, float]:
+    """New (winner, loser) Elo ratings after a decisive game."""
+    expected = 1.0 / (1.0 + 10.0 ** ((loser - winner) / 400.0))
+    change = k_factor * (1.0 - expected)
+    return winner + change, loser - change
+
+
+def fold_result(
+    players: Dict[int, PlayerStats],
+    chat_wins: Dict[int, Dict[int, int]],
+    result: GameResult,
+    initial_rating: float,
+    k_factor: float,
+) -> Tuple[PlayerStats, PlayerStats]:
+    """Add a result to the per-player and per-chat totals; returns (winner, loser)."""
+    winner = players.get(result.winner_id)
+    if winner is None:
+        winner = players[result.winner_id] = PlayerStats(result.winner_id, result.winner_name, initial_rating)
+    elif result.winner_name:
+        winner.name = result.winner_name
+    loser = players.get(result.loser_id)
+    if loser is None:
+        loser = players[result.loser_id] = PlayerStats(result.loser_id, result.loser_name, initial_rating)
+    elif result.loser_name:
+        loser.name = result.loser_name
+
+    winner.rating, loser.rating = elo_update(winner.rating, loser.rating, k_factor)
+    winner.wins += 1
+    loser.losses += 1
+    if result.timed_out:
+        loser.timeouts += 1
+    else:
+        winner.board_wins += 1
+        winner.win_moves += result.moves
+    wins = chat_wins.setdefault(result.chat_id, {})
+    wins[result.winner_id] = wins.get(result.winner_id, 0) + 1
+    return winner, loser
+
+
+class StatsStore:
+    """
+    Player statistics, updated as each game ends.
+
+    Totals are kept per player and ranked by rating in a SortedList, so
+    recording a result, a player's rank and the top of the table all cost
+    O(log n) and nothing ever scans the results. Each chat also has its own
+    table of wins in that chat. This base class keeps everything in memory
+    and persists nothing; durable backends override _record.
+    """
+
+    def __init__(self, initial_rating: float = 1200, k_factor: float = 32):
+        self.initial_rating = initial_rating
+        self.k_factor = k_factor
+        self._players: Dict[int, PlayerStats] = {}
+        self._chat_wins: Dict[int, Dict[int, int]] = {}
+        self._ranking = SortedList()  # PlayerStats._key()
+        self._chat_boards: Dict[int, SortedList] = {}  # chat id -> _index_key(wins, user id)
+        self.results = 0
+
+    def _load(self, players: Dict[int, PlayerStats], chat_wins: Dict[int, Dict[int, int]], results: int) -> None:
+        """Replace everything with recovered totals, building the indexes in one sort each."""
+        self._players = players
+        self._chat_wins = chat_wins
+        self._ranking = SortedList(player._key() for player in players.values())
+        self._chat_boards = {
+            chat_id: SortedList(_index_key(count, user_id) for user_id, count in wins.items())
+            for chat_id, wins in chat_wins.items()
+        }
+        self.results = results
+
+    def _record(self, result: GameResult) -> None:
+        """Persist one result. No-op for the in-memory store."""
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._players
+
+    def get(self, user_id: int) -> Optional[PlayerStats]:
+        return self._players.get(user_id)
+
+    def record(self, result: GameResult) -> Tuple[PlayerStats, PlayerStats]:
+        """Add a finished game to both players' totals; returns (winner, loser)."""
+        ranking = self._ranking
+        for user_id in (result.winner_id, result.loser_id):
+            player = self._players.get(user_id)
+            if player is not None:
+                ranking.remove(player._key())
+        chat_wins = self._chat_wins.get(result.chat_id)
+        previous_wins = chat_wins.get(result.winner_id, 0) if chat_wins else 0
+
+        winner, loser = fold_result(self._players, self._chat_wins, result, self.initial_rating, self.k_factor)
+
+        ranking.add(winner._key())
+        ranking.add(loser._key())
+        board = self._chat_boards.get(result.chat_id)
+        if board is None:
+            board = self._chat_boards[result.chat_id] = SortedList()
+        if previous_wins:
+            board.remove(_index_key(previous_wins, result.winner_id))
+        board.add(_index_key(previous_wins + 1, result.winner_id))
+        self.results += 1
+        self._record(result)
+        return winner, loser
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based position by rating, or None for someone who hasn't finished a game."""
+        player = self._players.get(user_id)
+        if player is None:
+            return None
+        return self._ranking.bisect_left(player._key()) + 1
+
+    def top(self, count: int, offset: int = 0) -> List[PlayerStats]:
+        """Highest rated players, best first."""
+        return [self._players[key & _ID_MASK] for key in self._ranking[offset:offset + count]]
+
+    def chat_top(self, chat_id: int, count: int) -> List[Tuple[PlayerStats, int]]:
+        """(player, wins in chat_id) for the players with most wins there."""
+        board = self._chat_boards.get(chat_id)
+        if board is None:
+            return []
+        return [(self._players[key & _ID_MASK], -(key >> _ID_BITS)) for key in board[:count]]
+
+    def close(self) -> None:
+        """Flush and release any resources held by the backend."""
+
+
+class InMemoryStatsStore(StatsStore):
+    """Statistics live only in this process and are lost on restart."""
@@ -0,0 +1,262 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+from src.games.stats.base import (
+    GameResult, OP_RESULT, PlayerStats, StatsStore, decode_result, encode_result, fold_result,
+)
+from src.games.store.journal import (
+    _gc_paused, _generations, _path, encode_record, open_journal, read_newest_snapshot, replay_journal,
+)
+from src.utils.fs import fsync_directory
+from src.utils.logger import logger
+
+SNAPSHOT_MAGIC = b"T4GSTAT1"
+JOURNAL_MAGIC = b"T4GSTATJ"
+# 2: record payload lengths are 32-bit, as in the game journal
+JOURNAL_VERSION = 2
+_SNAPSHOT_HEADER = struct.Struct("<8sQQII")  # magic, generation, results, players, chat entries
+# user id, rating, wins, losses, timeouts, board wins, win moves, name length
+_PLAYER = struct.Struct("<qdIIIIQH")
+_CHAT_WINS = struct.Struct("<qqI")  # chat id, user id, wins
+
+
+class Totals:
+    """Everything a stats snapshot holds, as folded from results."""
+    __slots__ = ("players", "chat_wins", "results", "initial_rating", "k_factor")
+
+    def __init__(self, initial_rating: float, k_factor: float):
+        self.players: Dict[int, PlayerStats] = {}
+        self.chat_wins: Dict[int, Dict[int, int]] = {}
+        self.results = 0
+        self.initial_rating = initial_rating
+        self.k_factor = k_factor
+
+
+def apply_result_record(totals: Totals, op: int, chat_id: int, payload) -> None:
+    """Replay one results journal record onto totals."""
+    if op == OP_RESULT:
+        fold_result(totals.players, totals.chat_wins, decode_result(chat_id, payload),
+                    totals.initial_rating, totals.k_factor)
+        totals.results += 1
+
+
+def read_snapshot(path: str, totals: Totals) -> None:
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _SNAPSHOT_HEADER.size + 4:
+        raise ValueError(f"{path} is not a stats snapshot")
+    magic, _, results, player_count, chat_count = _SNAPSHOT_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not a stats snapshot")
+    body = memoryview(data)[:-4]
+    if zlib.crc32(body) != struct.unpack_from("<I", data, len(data) - 4)[0]:
+        raise ValueError(f"{path} is corrupt")
+    players = totals.players
+    offset = _SNAPSHOT_HEADER.size
+    unpack = _PLAYER.unpack_from
+    for _ in range(player_count):
+        user_id, rating, wins, losses, timeouts, board_wins, win_moves, name_length = unpack(data, offset)
+        offset += _PLAYER.size
+        player = PlayerStats(user_id, data[offset:offset + name_length].decode("utf-8") or None, rating)
+        offset += name_length
+        player.wins, player.losses, player.timeouts = wins, losses, timeouts
+        player.board_wins, player.win_moves = board_wins, win_moves
+        players[user_id] = player
+    chat_wins = totals.chat_wins
+    for chat_id, user_id, wins in _CHAT_WINS.iter_unpack(data[offset:offset + chat_count * _CHAT_WINS.size]):
+        chat_wins.setdefault(chat_id, {})[user_id] = wins
+    totals.results = results
+
+
+def write_snapshot(path: str, generation: int, totals: Totals) -> None:
+    """Write totals to path atomically (temp file, fsync, rename)."""
+    parts = [b""]
+    pack = _PLAYER.pack
+    for player in totals.players.values():
+        name = (player.name or "").encode("utf-8")
+        parts.append(pack(player.user_id, player.rating, player.wins, player.losses, player.timeouts,
+                          player.board_wins, player.win_moves, len(name)) + name)
+    chat_count = 0
+    for chat_id, wins in totals.chat_wins.items():
+        for user_id, count in wins.items():
+            parts.append(_CHAT_WINS.pack(chat_id, user_id, count))
+        chat_count += len(wins)
+    parts[0] = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, generation, totals.results, len(totals.players), chat_count)
+    body = b"".join(parts)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+        f.write(struct.pack("<I", zlib.crc32(body)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(os.path.dirname(path) or ".")
+
+
+def load_totals(directory: str, initial_rating: float, k_factor: float, below: Optional[int] = None) -> Tuple[Totals, int]:
+    """
+    Recover totals from the newest snapshot plus the journals written after
+    it, ignoring generations at or above below. Returns (totals, newest
+    generation found).
+
+    Raises:
+        ValueError: the newest snapshot or a journal can't be read
+    """
+    snapshots, journals = _generations(directory)
+    if below is not None:
+        snapshots = [g for g in snapshots if g < below]
+        journals = [g for g in journals if g < below]
+    totals = Totals(initial_rating, k_factor)
+    base = 0
+    with _gc_paused():
+        if snapshots:
+            base = snapshots[-1]
+            read_newest_snapshot(_path(directory, "snapshot", base), lambda path: read_snapshot(path, totals))
+        for generation in journals:
+            if generation >= base:
+                replay_journal(
+                    _path(directory, "journal", generation), totals, apply_result_record,
+                    JOURNAL_MAGIC, JOURNAL_VERSION,
+                )
+    newest = max(snapshots[-1:] + journals[-1:] + [0])
+    return totals, newest
+
+
+class JournaledStatsStore(StatsStore):
+    """
+    Durable statistics: snapshots of the totals plus an append-only journal
+    of results, laid out like JournaledGameStore's files.
+
+    Results are appended to an in-memory buffer and written and fsynced in
+    batches by a background thread every flush_interval seconds, so ending
+    a game never waits on disk. Once the journal grows past compact_bytes
+    (or snapshot_interval seconds pass) a new one is started and a
+    background compaction folds the old snapshot and journals into a new
+    snapshot, working from the files alone.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        initial_rating: float = 1200,
+        k_factor: float = 32,
+        flush_interval: float = 0.5,
+        snapshot_interval: float = 600.0,
+        compact_bytes: int = 16 * 1024 * 1024,
+        fsync: bool = True,
+    ):
+        super().__init__(initial_rating, k_factor)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+
+        started = time.perf_counter()
+        totals, newest = load_totals(directory, initial_rating, k_factor)
+        self._load(totals.players, totals.chat_wins, totals.results)
+        logger.info(
+            f"Recovered stats for {len(self)} players ({self.results} games) "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+
+        self._lock = threading.Lock()  # guards the buffer
+        self._io_lock = threading.Lock()  # guards the journal file
+        self._buffer = bytearray()
+        self._generation = newest + 1
+        self._journal = open_journal(_path(directory, "journal", self._generation), JOURNAL_MAGIC, JOURNAL_VERSION)
+        self._journal_bytes = 0
+        self._last_rotation = time.monotonic()
+        self._compactor: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="stats-journal", daemon=True)
+        self._flusher.start()
+        self._start_compaction(self._generation)
+
+    def _record(self, result: GameResult) -> None:
+        record = encode_record(OP_RESULT, result.chat_id, encode_result(result))
+        with self._lock:
+            self._buffer += record
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+                self._maybe_rotate()
+            except Exception as e:
+                logger.error(f"Stats journal flush failed: {e}")
+
+    def flush(self) -> None:
+        """Write and fsync every result recorded so far, without holding up _record()."""
+        with self._io_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                data, self._buffer = self._buffer, bytearray()
+            journal = self._journal
+            journal.write(data)
+            journal.flush()
+            if self.fsync:
+                os.fsync(journal.fileno())
+            self._journal_bytes += len(data)
+
+    def _maybe_rotate(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        due = time.monotonic() - self._last_rotation >= self.snapshot_interval
+        if self._journal_bytes >= self.compact_bytes or (due and self._journal_bytes):
+            self.rotate()
+
+    def rotate(self) -> None:
+        """Start a new journal generation and compact the previous ones."""
+        with self._io_lock:
+            self._journal.close()
+            self._generation += 1
+            self._journal = open_journal(
+                _path(self.directory, "journal", self._generation), JOURNAL_MAGIC, JOURNAL_VERSION
+            )
+            self._journal_bytes = 0
+            self._last_rotation = time.monotonic()
+            generation = self._generation
+        self._start_compaction(generation)
+
+    def _start_compaction(self, generation: int) -> None:
+        self._compactor = threading.Thread(
+            target=self._compact, args=(generation,), name="stats-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def _compact(self, generation: int) -> None:
+        """Write snapshot-<generation> from older files, then delete them."""
+        try:
+            snapshots, journals = _generations(self.directory)
+            older = [g for g in snapshots + journals if g < generation]
+            if not older:
+                return
+            totals, _ = load_totals(self.directory, self.initial_rating, self.k_factor, below=generation)
+            write_snapshot(_path(self.directory, "snapshot", generation), generation, totals)
+            for g in snapshots:
+                if g < generation:
+                    os.remove(_path(self.directory, "snapshot", g))
+            for g in journals:
+                if g < generation:
+                    os.remove(_path(self.directory, "journal", g))
+        except Exception as e:
+            logger.error(f"Stats snapshot compaction failed: {e}")
+
+    def close(self) -> None:
+        """Stop the background threads and flush the journal."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        if self._compactor is not None:
+            self._compactor.join()
+        self.flush()
+        with self._io_lock:
+            self._journal.close()
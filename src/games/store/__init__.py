@@ -0,0 +1,19 @@
+from src.games.store.base import GameStore, InMemoryGameStore, set_worker_index
+from src.games.store.journal import JournaledGameStore
+
+
+def open_game_store(backend: str = "memory", path: str = "data/games") -> GameStore:
+    """Create the configured game store ("memory" or "journal")."""
+    if backend == "journal":
+        return JournaledGameStore(path)
+    if backend == "memory":
+        return InMemoryGameStore()
+    raise ValueError(f"Unknown game store backend: {backend}")
+
+
+def get_store(context) -> GameStore:
+    """Return the game store from a handler context or an Application."""
+    return context.bot_data["store"]
+
+
+__all__ = ['GameStore', 'InMemoryGameStore', 'JournaledGameStore', 'open_game_store', 'get_store', 'set_worker_index']
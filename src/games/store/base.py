@@ -0,0 +1,233 @@
+import itertools
+import struct
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.games.models.game_state import GameState
+from src.games.store.codec import encode_game, encode_move
+from src.utils.tracing import span
+
+# Journal operations. Every state change a handler makes goes through one
+# of the GameStore methods below and is described by exactly one record,
+# keyed by game id.
+OP_CREATE = 1   # payload: creator id (q), chat id (q), start time (I) + name
+OP_JOIN = 2     # payload: player id (q), is bot (B) + name
+OP_MOVE = 3     # payload: packed move (B)
+OP_MESSAGE = 4  # payload: message id (q)
+OP_REMOVE = 5   # no payload
+OP_PUT = 6      # payload: encode_game record
+
+USER_ID = struct.Struct("<q")
+CREATE_FIELDS = struct.Struct("<qqI")
+JOIN_FIELDS = struct.Struct("<qB")
+MOVE_FIELD = struct.Struct("<B")
+
+# Game ids start from the clock so a restarted process doesn't hand out
+# ids that are still on keyboards from before the restart. The low bits
+# are the worker index, so games handed between workers never collide.
+WORKER_BITS = 8
+_game_ids = itertools.count(int(time.time() * 1000) << 8)
+_worker = 0
+
+
+def set_worker_index(index: int) -> None:
+    """Tag the ids this process hands out with its worker index."""
+    global _worker
+    if not 0 <= index < 1 << WORKER_BITS:
+        raise ValueError(f"Worker index {index} doesn't fit in a game id")
+    _worker = index
+
+
+def new_game_id() -> int:
+    return next(_game_ids) << WORKER_BITS | _worker
+
+
+class GameStore:
+    """
+    Storage for games in progress, keyed by game id.
+
+    A chat can hold any number of games at once; _chats indexes them by
+    chat (oldest first) and _players maps each human player to the game
+    they are in, so an update from either resolves to its game in O(1).
+    A player is in at most one game at a time: handlers check for_player()
+    before seating anyone, and the index follows the newest game.
+
+    Handlers read and change games only through these methods so a
+    backend can persist each change. This base class keeps games in a
+    dict and persists nothing; durable backends override _record.
+
+    on_player, if set, is called with a player's id whenever the game they
+    are in may have changed: they were seated or unseated, or their game
+    started. A worker process uses it to tell the supervisor where each
+    player's game lives.
+    """
+
+    def __init__(self):
+        self._games: Dict[int, GameState] = {}
+        self._chats: Dict[int, Dict[int, GameState]] = {}
+        self._players: Dict[int, GameState] = {}
+        self._phases: Dict[str, int] = {}
+        self.on_player: Optional[Callable[[int], None]] = None
+
+    def _count(self, phase: Optional[str], delta: int) -> None:
+        if phase is not None:
+            self._phases[phase] = self._phases.get(phase, 0) + delta
+
+    def _reindex(self) -> None:
+        """Rebuild the indexes and per-phase counts after _games was replaced wholesale."""
+        games, self._games = self._games, {}
+        self._chats = {}
+        self._players = {}
+        self._phases = {}
+        for game in games.values():
+            self._add(game)
+
+    def _add(self, game: GameState) -> None:
+        replaced = self._games.get(game.game_id)
+        if replaced is not None:
+            if replaced is not game:
+                raise ValueError(f"Game id {game.game_id} already belongs to a game in chat {replaced.chat_id}")
+            self._drop(replaced)
+        self._games[game.game_id] = game
+        self._chats.setdefault(game.chat_id, {})[game.game_id] = game
+        for symbol in ("X", "O"):
+            self._index_player(game, symbol)
+        self._count(game.phase, 1)
+
+    def _index_player(self, game: GameState, symbol: str) -> None:
+        player_id = game.players[symbol]
+        if player_id is not None and symbol != game.bot_player:
+            self._players[player_id] = game
+            if self.on_player is not None:
+                self.on_player(player_id)
+
+    def _drop(self, game: GameState) -> None:
+        del self._games[game.game_id]
+        chat = self._chats[game.chat_id]
+        del chat[game.game_id]
+        if not chat:
+            del self._chats[game.chat_id]
+        for player_id in (game.player_x, game.player_o):
+            if self._players.get(player_id) is game:
+                del self._players[player_id]
+                if self.on_player is not None:
+                    self.on_player(player_id)
+        self._count(game.phase, -1)
+
+    def phase_counts(self) -> Dict[str, int]:
+        """Number of games in each phase, kept up to date as games change."""
+        return dict(self._phases)
+
+    def _record(self, op: int, game_id: int, payload: bytes = b"") -> None:
+        """Persist one change. No-op for the in-memory store."""
+
+    def get(self, game_id: int) -> Optional[GameState]:
+        return self._games.get(game_id)
+
+    def for_player(self, user_id: int) -> Optional[GameState]:
+        """The game user_id is playing, if any"""
+        return self._players.get(user_id)
+
+    def seated(self) -> List[Tuple[int, GameState]]:
+        """(player id, game) for every human player in a game"""
+        return list(self._players.items())
+
+    def in_chat(self, chat_id: int) -> List[GameState]:
+        """Games in chat_id, oldest first"""
+        chat = self._chats.get(chat_id)
+        return list(chat.values()) if chat else []
+
+    def open_game(self, chat_id: int, user_id: Optional[int] = None) -> Optional[GameState]:
+        """Oldest game in chat_id still waiting for an opponent, other than user_id's own"""
+        for game in self._chats.get(chat_id, {}).values():
+            if game.phase == "waiting" and game.player_o is None and game.player_x != user_id:
+                return game
+        return None
+
+    def __contains__(self, game_id: int) -> bool:
+        return game_id in self._games
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __iter__(self) -> Iterator[GameState]:
+        return iter(list(self._games.values()))
+
+    def create(self, chat_id: int, user_id: int, user_name: Optional[str]) -> GameState:
+        """Start a new game in chat_id with user_id as player X."""
+        game = GameState(chat_id, new_game_id())
+        game.player_x = user_id
+        game.name_x = user_name
+        self._add(game)
+        self._record(
+            OP_CREATE, game.game_id,
+            CREATE_FIELDS.pack(user_id, chat_id, int(game.started_at)) + (user_name or "").encode("utf-8")
+        )
+        return game
+
+    def join(self, game: GameState, user_id: int, user_name: Optional[str], bot: bool = False) -> None:
+        """Seat user_id as player O and start the placement phase."""
+        game.player_o = user_id
+        game.name_o = user_name
+        game.bot_player = "O" if bot else None
+        self._count(game.phase, -1)
+        game.phase = "placement"
+        self._count(game.phase, 1)
+        game.version += 1
+        self._index_player(game, "O")
+        if self.on_player is not None and game.player_x is not None:
+            self.on_player(game.player_x)
+        self._record(OP_JOIN, game.game_id, JOIN_FIELDS.pack(user_id, bot) + (user_name or "").encode("utf-8"))
+
+    def play(self, game: GameState, user_id: int, position: int, selected: Optional[int] = None) -> bool:
+        """
+        Apply a move for user_id. On success either the game is won
+        (phase "finished", winner set) or the turn passes.
+        """
+        phase = game.phase
+        with span("validate"):
+            moved = game.handle_webapp_move(user_id, position, selected)
+        if not moved:
+            return False
+        packed = encode_move(position, selected)
+        game.moves.append(packed)
+        if game.winner:
+            game.phase = "finished"
+        else:
+            game.advance_turn()
+        if game.phase != phase:
+            self._count(phase, -1)
+            self._count(game.phase, 1)
+        self._record(OP_MOVE, game.game_id, MOVE_FIELD.pack(packed))
+        return True
+
+    def set_message(self, game: GameState, message_id: int) -> None:
+        """Remember the message that shows the game's board."""
+        if game.message_id != message_id:
+            game.message_id = message_id
+            self._record(OP_MESSAGE, game.game_id, USER_ID.pack(message_id))
+
+    def remove(self, game_id: int) -> Optional[GameState]:
+        """Forget a game; returns it if it existed."""
+        game = self._games.get(game_id)
+        if game is not None:
+            self._drop(game)
+            self._record(OP_REMOVE, game_id)
+        return game
+
+    def put(self, game: GameState) -> None:
+        """
+        Adopt an existing game object as is.
+
+        Raises:
+            ValueError: If its id belongs to another game in the store
+        """
+        self._add(game)
+        self._record(OP_PUT, game.game_id, encode_game(game))
+
+    def close(self) -> None:
+        """Flush and release any resources held by the backend."""
+
+
+class InMemoryGameStore(GameStore):
+    """Games live only in this process and are lost on restart."""
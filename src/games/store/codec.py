@@ -0,0 +1,84 @@
+import struct
+from typing import Optional, Tuple
+
+from src.games.models.game_state import GameState
+
+PHASES = ("waiting", "placement", "movement", "finished")
+_PHASE_CODES = {phase: code for code, phase in enumerate(PHASES)}
+_SYMBOL_CODES = {None: 0, "X": 1, "O": 2}
+_SYMBOLS = (None, "X", "O")
+
+# chat_id, game id, X id, O id, message id, phase, current player, X mask,
+# O mask, X placed, O placed, bot symbol, version, start time (s), X name
+# length, O name length, move count; then the names and the moves
+_GAME = struct.Struct("<qqqqqBBHHBBBIIHHI")
+
+
+def encode_move(position: int, selected: Optional[int] = None) -> int:
+    """Pack a move into one byte: from << 4 | to, with from == to for a placement."""
+    return (position if selected is None else selected) << 4 | position
+
+
+def decode_move(packed: int) -> Tuple[int, Optional[int]]:
+    """Unpack a move byte into (position, selected)."""
+    src, dst = packed >> 4, packed & 0xF
+    return dst, (None if src == dst else src)
+
+
+def encode_game(game: GameState) -> bytes:
+    """Serialize the durable part of a game into a compact record."""
+    x_name = (game.name_x or "").encode("utf-8")
+    o_name = (game.name_o or "").encode("utf-8")
+    return _GAME.pack(
+        game.chat_id or 0,
+        game.game_id,
+        game.player_x or 0,
+        game.player_o or 0,
+        game.message_id or 0,
+        _PHASE_CODES[game.phase],
+        0 if game.current_player == "X" else 1,
+        game.board.x,
+        game.board.o,
+        game.placed_x,
+        game.placed_o,
+        _SYMBOL_CODES[game.bot_player],
+        game.version,
+        int(game.started_at),
+        len(x_name),
+        len(o_name),
+        len(game.moves),
+    ) + x_name + o_name + game.moves
+
+
+def decode_game(buffer, offset: int = 0) -> Tuple[GameState, int]:
+    """Rebuild a game from encode_game output; returns (game, next offset)."""
+    (chat_id, game_id, x_id, o_id, message_id, phase, current, x_bits, o_bits,
+     x_placed, o_placed, bot, version, started_at, x_len, o_len, move_count) = _GAME.unpack_from(buffer, offset)
+    offset += _GAME.size
+    x_name = str(buffer[offset:offset + x_len], "utf-8") if x_len else None
+    offset += x_len
+    o_name = str(buffer[offset:offset + o_len], "utf-8") if o_len else None
+    offset += o_len
+    moves = bytes(buffer[offset:offset + move_count])
+    offset += move_count
+
+    game = GameState.restore(
+        chat_id,
+        x_bits,
+        o_bits,
+        "X" if current == 0 else "O",
+        PHASES[phase],
+        x_id or None,
+        o_id or None,
+        x_name,
+        o_name,
+        x_placed,
+        o_placed,
+        message_id or None,
+        _SYMBOLS[bot],
+        version,
+        game_id,
+        started_at,
+        moves,
+    )
+    return game, offset
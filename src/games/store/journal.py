@@ -0,0 +1,371 @@
+import gc
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.games.models.game_state import GameState
+from src.games.store.base import (
+    GameStore, OP_CREATE, OP_JOIN, OP_MOVE, OP_MESSAGE, OP_REMOVE, OP_PUT,
+    CREATE_FIELDS, JOIN_FIELDS, MOVE_FIELD, USER_ID,
+)
+from src.games.store.codec import decode_game, decode_move, encode_game
+from src.utils.fs import fsync_directory
+from src.utils.logger import logger
+
+# 2: records carry the state version, 3: and the game id, 4: and start time and
+# moves, 5: games (and journal records) are keyed by game id, not chat id,
+# 6: move counts and record payload lengths are 32-bit
+SNAPSHOT_MAGIC = b"T4GSNAP6"
+_SNAPSHOT_HEADER = struct.Struct("<8sQI")  # magic, generation, game count
+# Journal files start with a magic and format version; records follow. The
+# version follows the snapshot's: record payloads change with the layout.
+JOURNAL_MAGIC = b"T4GJOURN"
+JOURNAL_VERSION = 6
+_JOURNAL_HEADER = struct.Struct("<8sI")    # magic, format version
+_RECORD_HEADER = struct.Struct("<IBqI")    # crc32, op, game id, payload length
+_CRC_OFFSET = 4
+_FILE_PATTERN = re.compile(r"^(snapshot|journal)-(\d{8})\.bin$")
+
+
+def _path(directory: str, kind: str, generation: int) -> str:
+    return os.path.join(directory, f"{kind}-{generation:08d}.bin")
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Suspend the cyclic GC while bulk-loading games. Recovery allocates
+    hundreds of thousands of objects and none of them form cycles, so
+    collections would only rescan them over and over.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def encode_record(op: int, key: int, payload: bytes = b"") -> bytes:
+    """Frame one journal record, checksummed so a torn tail is detected."""
+    body = _RECORD_HEADER.pack(0, op, key, len(payload))[_CRC_OFFSET:] + payload
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def open_journal(path: str, magic: bytes = JOURNAL_MAGIC, version: int = JOURNAL_VERSION):
+    """Open a journal file for appending, writing its header if it is new."""
+    journal = open(path, "ab")
+    if journal.tell() == 0:
+        journal.write(_JOURNAL_HEADER.pack(magic, version))
+        journal.flush()
+    return journal
+
+
+def _generations(directory: str) -> Tuple[List[int], List[int]]:
+    snapshots, journals = [], []
+    for name in os.listdir(directory):
+        match = _FILE_PATTERN.match(name)
+        if match:
+            (snapshots if match.group(1) == "snapshot" else journals).append(int(match.group(2)))
+    return sorted(snapshots), sorted(journals)
+
+
+def read_snapshot(path: str) -> Dict[int, GameState]:
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, _, count = _SNAPSHOT_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or len(data) < _SNAPSHOT_HEADER.size + 4:
+        raise ValueError(f"{path} is not a game snapshot")
+    body = memoryview(data)[:-4]
+    if zlib.crc32(body) != struct.unpack_from("<I", data, len(data) - 4)[0]:
+        raise ValueError(f"{path} is corrupt")
+    games = {}
+    offset = _SNAPSHOT_HEADER.size
+    for _ in range(count):
+        game, offset = decode_game(body, offset)
+        games[game.game_id] = game
+    return games
+
+
+def write_snapshot(path: str, generation: int, games) -> None:
+    """Write games to path atomically (temp file, fsync, rename)."""
+    parts = [b""]
+    count = 0
+    for game in games:
+        parts.append(encode_game(game))
+        count += 1
+    parts[0] = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, generation, count)
+    body = b"".join(parts)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+        f.write(struct.pack("<I", zlib.crc32(body)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(os.path.dirname(path) or ".")
+
+
+def apply_record(games: Dict[int, GameState], op: int, game_id: int, payload) -> None:
+    """Replay one journal record onto games (keyed by game id)."""
+    if op == OP_CREATE:
+        user_id, chat_id, started_at = CREATE_FIELDS.unpack_from(payload)
+        game = GameState(chat_id, game_id)
+        game.started_at = started_at
+        game.player_x = user_id
+        game.name_x = bytes(payload[CREATE_FIELDS.size:]).decode("utf-8") or None
+        games[game_id] = game
+        return
+    if op == OP_PUT:
+        game, _ = decode_game(payload)
+        games[game_id] = game
+        return
+    if op == OP_REMOVE:
+        games.pop(game_id, None)
+        return
+
+    game = games.get(game_id)
+    if game is None:
+        return
+    if op == OP_JOIN:
+        user_id, bot = JOIN_FIELDS.unpack_from(payload)
+        game.player_o = user_id
+        game.name_o = bytes(payload[JOIN_FIELDS.size:]).decode("utf-8") or None
+        game.bot_player = "O" if bot else None
+        game.phase = "placement"
+        game.version += 1
+    elif op == OP_MOVE:
+        packed = MOVE_FIELD.unpack_from(payload)[0]
+        position, selected = decode_move(packed)
+        if game.handle_webapp_move(game.current_player_id(), position, selected):
+            game.moves.append(packed)
+            if game.winner:
+                game.phase = "finished"
+            else:
+                game.advance_turn()
+    elif op == OP_MESSAGE:
+        game.message_id = USER_ID.unpack_from(payload)[0]
+
+
+def replay_journal(
+    path: str, games, apply: Callable = apply_record, magic: bytes = JOURNAL_MAGIC, version: int = JOURNAL_VERSION
+) -> int:
+    """
+    Apply every intact record in a journal file with apply; returns the count applied.
+
+    Raises:
+        ValueError: the file is not a journal of this format version
+    """
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+    if len(data) < _JOURNAL_HEADER.size:
+        # Created but the header never reached the disk: nothing was recorded
+        return 0
+    found_magic, found_version = _JOURNAL_HEADER.unpack_from(data, 0)
+    if found_magic != magic or found_version != version:
+        raise ValueError(
+            f"{path} is not a version {version} journal (written by an incompatible version of the bot)"
+        )
+    offset = _JOURNAL_HEADER.size
+    applied = 0
+    header_size = _RECORD_HEADER.size
+    while offset + header_size <= len(data):
+        crc, op, key, length = _RECORD_HEADER.unpack_from(data, offset)
+        end = offset + header_size + length
+        if end > len(data) or zlib.crc32(data[offset + _CRC_OFFSET:end]) != crc:
+            logger.warning(f"Ignoring torn journal tail in {path} at byte {offset}")
+            break
+        apply(games, op, key, data[offset + header_size:end])
+        offset = end
+        applied += 1
+    return applied
+
+
+def read_newest_snapshot(path: str, read: Callable):
+    """
+    Read the newest snapshot with read(path), refusing to go on without it.
+
+    Compaction deletes everything older than a snapshot once it is written,
+    so recovering without the newest one would silently drop every game it
+    holds, and the next compaction would delete the unreadable file too.
+    """
+    try:
+        return read(path)
+    except (OSError, ValueError, struct.error) as e:
+        raise ValueError(
+            f"Cannot read {path} ({e}); refusing to start without it. Restore it, or move it out of "
+            f"the directory to recover only from the files left"
+        ) from e
+
+
+def load_games(directory: str) -> Tuple[Dict[int, GameState], int]:
+    """
+    Recover games from the newest snapshot plus the journals written after it.
+    Returns (games, newest generation found).
+
+    Raises:
+        ValueError: the newest snapshot or a journal can't be read
+    """
+    snapshots, journals = _generations(directory)
+    games: Dict[int, GameState] = {}
+    base = 0
+    with _gc_paused():
+        if snapshots:
+            base = snapshots[-1]
+            games = read_newest_snapshot(_path(directory, "snapshot", base), read_snapshot)
+        for generation in journals:
+            if generation >= base:
+                replay_journal(_path(directory, "journal", generation), games)
+    newest = max(snapshots[-1:] + journals[-1:] + [0])
+    return games, newest
+
+
+class JournaledGameStore(GameStore):
+    """
+    Durable game store: periodic snapshots plus an append-only journal.
+
+    Records are appended to an in-memory buffer and written and fsynced by a
+    background thread every flush_interval seconds, so handlers never wait
+    on disk. Once the current journal grows past compact_bytes (or
+    snapshot_interval seconds pass) it is closed, a new one is started and
+    a background compaction folds the old snapshot and journal into a new
+    snapshot. Compaction works from the files alone, never from live games.
+
+    Files are snapshot-N.bin (state before journal-N) and journal-N.bin.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        flush_interval: float = 0.05,
+        snapshot_interval: float = 300.0,
+        compact_bytes: int = 16 * 1024 * 1024,
+        fsync: bool = True,
+    ):
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.compact_bytes = compact_bytes
+        self.fsync = fsync
+
+        started = time.perf_counter()
+        self._games, newest = load_games(directory)
+        self._reindex()
+        logger.info(f"Recovered {len(self._games)} games in {time.perf_counter() - started:.3f}s")
+
+        self._lock = threading.Lock()  # guards the buffer; held only to append or swap it
+        self._io_lock = threading.Lock()  # guards the journal file
+        self._buffer = bytearray()
+        self._generation = newest + 1
+        self._journal = open_journal(_path(directory, "journal", self._generation))
+        self._journal_bytes = 0
+        self._last_rotation = time.monotonic()
+        self._compactor: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="game-journal", daemon=True)
+        self._flusher.start()
+        # Fold whatever the previous run left behind into one snapshot.
+        self._start_compaction(self._generation)
+
+    def _record(self, op: int, game_id: int, payload: bytes = b"") -> None:
+        record = encode_record(op, game_id, payload)
+        with self._lock:
+            self._buffer += record
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+                self._maybe_rotate()
+            except Exception as e:
+                logger.error(f"Game journal flush failed: {e}")
+
+    def flush(self) -> None:
+        """
+        Write and fsync everything appended so far.
+
+        Only swapping the buffer takes the lock _record() waits on; the
+        write and fsync run under the I/O lock, so handlers can keep
+        appending while the disk works.
+        """
+        with self._io_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                data, self._buffer = self._buffer, bytearray()
+            journal = self._journal
+            journal.write(data)
+            journal.flush()
+            if self.fsync:
+                os.fsync(journal.fileno())
+            self._journal_bytes += len(data)
+
+    def _maybe_rotate(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        due = time.monotonic() - self._last_rotation >= self.snapshot_interval
+        if self._journal_bytes >= self.compact_bytes or (due and self._journal_bytes):
+            self.rotate()
+
+    def rotate(self) -> None:
+        """Start a new journal generation and compact the previous ones."""
+        with self._io_lock:
+            self._journal.close()
+            self._generation += 1
+            self._journal = open_journal(_path(self.directory, "journal", self._generation))
+            self._journal_bytes = 0
+            self._last_rotation = time.monotonic()
+            generation = self._generation
+        self._start_compaction(generation)
+
+    def _start_compaction(self, generation: int) -> None:
+        self._compactor = threading.Thread(
+            target=self._compact, args=(generation,), name="game-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def _compact(self, generation: int) -> None:
+        """Write snapshot-<generation> from older files, then delete them."""
+        try:
+            snapshots, journals = _generations(self.directory)
+            older = [g for g in snapshots + journals if g < generation]
+            if not older:
+                return
+            games: Dict[int, GameState] = {}
+            base = 0
+            with _gc_paused():
+                if snapshots and snapshots[0] < generation:
+                    base = max(g for g in snapshots if g < generation)
+                    games = read_snapshot(_path(self.directory, "snapshot", base))
+                for g in journals:
+                    if base <= g < generation:
+                        replay_journal(_path(self.directory, "journal", g), games)
+            write_snapshot(_path(self.directory, "snapshot", generation), generation, games.values())
+            for g in snapshots:
+                if g < generation:
+                    os.remove(_path(self.directory, "snapshot", g))
+            for g in journals:
+                if g < generation:
+                    os.remove(_path(self.directory, "journal", g))
+        except Exception as e:
+            logger.error(f"Game snapshot compaction failed: {e}")
+
+    def close(self) -> None:
+        """Stop the background threads and flush the journal."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        if self._compactor is not None:
+            self._compactor.join()
+        self.flush()
+        with self._io_lock:
+            self._journal.close()
@@ -0,0 +1,197 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def seed_order(size: int) -> List[int]:
+    """
+    Seeds (1 = best) for the first-round slots of a size-player bracket,
+    left to right, such that seeds 1 and 2 can only meet in the final and
+    each first-round match adds up to size + 1.
+    """
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for first in order for seed in (first, total - first)]
+    return order
+
+
+class Bracket:
+    """
+    Single-elimination bracket laid out as an implicit binary heap.
+
+    Node 1 is the final, node n's match is between the winners of nodes
+    2n and 2n + 1, and the first-round slots are the leaves size..2size-1.
+    A bracket with fewer entrants than a power of two fills the rest with
+    byes; a player facing a bye goes through without a game, and since
+    byes are the lowest seeds they only ever meet the highest seeds in
+    round one. Reporting a result is O(1) apart from the byes it passes.
+    """
+
+    def __init__(self, entrants: List[int]):
+        """entrants: player ids, best seed first"""
+        if len(entrants) < 2:
+            raise ValueError("A bracket needs at least two entrants")
+        self.size = 1 << (len(entrants) - 1).bit_length()
+        self.rounds = self.size.bit_length() - 1
+        self.entrants = len(entrants)
+        self.eliminated = 0
+        self._winner: List[Optional[int]] = [None] * (2 * self.size)
+        self._decided = bytearray(2 * self.size)
+        self._left = [0] + [self.size >> round_ for round_ in range(1, self.rounds + 1)]
+        for leaf, seed in enumerate(seed_order(self.size)):
+            self._winner[self.size + leaf] = entrants[seed - 1] if seed <= len(entrants) else None
+            self._decided[self.size + leaf] = 1
+
+        # Matches that can be played straight away
+        self.ready: List[int] = []
+        for leaf in range(self.size, 2 * self.size, 2):
+            node = self._advance(leaf)
+            if node is not None:
+                self.ready.append(node)
+
+    def round_of(self, node: int) -> int:
+        """Round of a match, 1 for the first round and rounds for the final"""
+        return self.size.bit_length() - node.bit_length()
+
+    def players(self, node: int) -> Tuple[Optional[int], Optional[int]]:
+        """The two players of a match, None where they are not decided yet"""
+        return self._winner[2 * node], self._winner[2 * node + 1]
+
+    def decided(self, node: int) -> bool:
+        return bool(self._decided[node])
+
+    def left(self, round_: int) -> int:
+        """Matches of a round still to be decided"""
+        return self._left[round_]
+
+    @property
+    def remaining(self) -> int:
+        """Players still in"""
+        return self.entrants - self.eliminated
+
+    @property
+    def champion(self) -> Optional[int]:
+        return self._winner[1] if self._decided[1] else None
+
+    def report(self, node: int, winner: int) -> Optional[int]:
+        """
+        Record the result of a match.
+
+        Returns:
+            The match winner plays next if their opponent is already known,
+            else None (also after the final)
+        """
+        if self._decided[node] or not self._decided[2 * node] or not self._decided[2 * node + 1]:
+            raise ValueError(f"Match {node} is not being played")
+        if winner not in self.players(node):
+            raise ValueError(f"Player {winner} is not in match {node}")
+        self._decide(node, winner)
+        self.eliminated += 1
+        return self._advance(node)
+
+    def _decide(self, node: int, winner: Optional[int]) -> None:
+        self._winner[node] = winner
+        self._decided[node] = 1
+        self._left[self.round_of(node)] -= 1
+
+    def _advance(self, node: int) -> Optional[int]:
+        """After node was decided, settle byes above it; returns a match that became playable."""
+        while node > 1:
+            sibling = node ^ 1
+            if not self._decided[sibling]:
+                return None
+            parent = node >> 1
+            if self._winner[node] is not None and self._winner[sibling] is not None:
+                return parent
+            # A bye: whoever is there goes through
+            self._decide(parent, self._winner[node] if self._winner[node] is not None else self._winner[sibling])
+            node = parent
+        return None
+
+
+class Tournament:
+    """A chat's tournament: registration, then its bracket and the games in play."""
+
+    __slots__ = ("chat_id", "organizer", "entrants", "bracket", "games", "announced")
+
+    def __init__(self, chat_id: int, organizer: int):
+        self.chat_id = chat_id
+        self.organizer = organizer
+        self.entrants: Dict[int, str] = {}  # user id -> name, in order of entry
+        self.bracket: Optional[Bracket] = None
+        self.games: Dict[int, int] = {}  # game id -> bracket node
+        self.announced = 0  # rounds whose end has been announced
+
+    @property
+    def state(self) -> str:
+        if self.bracket is None:
+            return "open"
+        return "finished" if self.bracket.champion is not None else "running"
+
+    def name(self, user_id: int) -> str:
+        return self.entrants.get(user_id) or str(user_id)
+
+    def begin(self, rating: Callable[[int], float]) -> Bracket:
+        """Close registration and seed the bracket by rating, earlier entry first on ties."""
+        seeds = sorted(self.entrants, key=lambda user_id: -rating(user_id))
+        self.bracket = Bracket(seeds)
+        return self.bracket
+
+
+class Tournaments:
+    """Tournaments in progress, by chat and by the games they are playing."""
+
+    def __init__(self):
+        self._chats: Dict[int, Tournament] = {}
+        self._games: Dict[int, Tournament] = {}
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    def get(self, chat_id: int) -> Optional[Tournament]:
+        return self._chats.get(chat_id)
+
+    def open(self, chat_id: int, organizer: int) -> Optional[Tournament]:
+        """Start registration in chat_id; None if the chat already has a tournament."""
+        if chat_id in self._chats:
+            return None
+        tournament = self._chats[chat_id] = Tournament(chat_id, organizer)
+        return tournament
+
+    def add(self, tournament: Tournament) -> None:
+        """Take over a tournament, with its games in play, from another registry."""
+        self._chats[tournament.chat_id] = tournament
+        for game_id in tournament.games:
+            self._games[game_id] = tournament
+
+    def track(self, tournament: Tournament, game_id: int, node: int) -> None:
+        """Note that game_id is the game for a bracket match."""
+        tournament.games[game_id] = node
+        self._games[game_id] = tournament
+
+    def playing(self, game_id: int) -> bool:
+        return game_id in self._games
+
+    def finish(self, game_id: int) -> Optional[Tuple[Tournament, int]]:
+        """Forget a match's game; returns its tournament and bracket node."""
+        tournament = self._games.pop(game_id, None)
+        if tournament is None:
+            return None
+        return tournament, tournament.games.pop(game_id)
+
+    def close(self, chat_id: int) -> Optional[Tournament]:
+        tournament = self._chats.pop(chat_id, None)
+        if tournament is not None:
+            for game_id in tournament.games:
+                self._games.pop(game_id, None)
+        return tournament
+
+    def chats(self) -> List[int]:
+        return list(self._chats)
+
+    def stats(self) -> dict:
+        return {"tournaments": len(self._chats), "matches": len(self._games)}
+
+
+def get_tournaments(context) -> Tournaments:
+    """Return the tournament registry from a handler context or an Application."""
+    return context.bot_data["tournaments"]
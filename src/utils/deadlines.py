@@ -0,0 +1,113 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.utils.logger import logger
+
+
+class DeadlineScheduler:
+    """
+    Fires a callback for each key at its own deadline.
+
+    Deadlines live in a min-heap with at most one live entry per key. Entries
+    are invalidated lazily: when one comes due, get_deadline(key) is asked for
+    the current deadline and the entry is dropped (None), pushed back (later
+    deadline, e.g. after activity), or expired. Keeping a deadline fresh
+    therefore costs nothing until it is actually reached, and each expiry
+    costs O(log n).
+    """
+
+    def __init__(
+        self,
+        get_deadline: Callable[[Hashable], Optional[float]],
+        on_expire: Callable[[Hashable], Awaitable[None]],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._get_deadline = get_deadline
+        self._on_expire = on_expire
+        self._clock = clock
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._queued: Dict[Hashable, float] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def schedule(self, key: Hashable, deadline: Optional[float] = None) -> None:
+        """Make sure key is checked no later than its current deadline."""
+        if deadline is None:
+            deadline = self._get_deadline(key)
+            if deadline is None:
+                return
+        queued = self._queued.get(key)
+        if queued is not None and queued <= deadline:
+            # The queued entry fires first and re-reads the deadline then.
+            return
+        self._push(key, deadline)
+        if self._heap[0][2] == key:
+            self._wakeup.set()
+
+    def _push(self, key: Hashable, deadline: float) -> None:
+        self._queued[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), key))
+
+    def next_deadline(self) -> Optional[float]:
+        """Deadline of the earliest live entry, discarding superseded ones."""
+        heap = self._heap
+        while heap and self._queued.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_expired(self, now: Optional[float] = None) -> List[Hashable]:
+        """Remove and return every key whose current deadline has passed."""
+        if now is None:
+            now = self._clock()
+        heap = self._heap
+        expired = []
+        while heap and heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(heap)
+            if self._queued.get(key) != deadline:
+                continue  # superseded by an earlier entry for the same key
+            del self._queued[key]
+            current = self._get_deadline(key)
+            if current is None:
+                continue
+            if current > now:
+                self._push(key, current)
+            else:
+                expired.append(key)
+        return expired
+
+    async def run(self) -> None:
+        """Sleep until the next deadline, fire expiries, repeat until stopped."""
+        self._running = True
+        while self._running:
+            self._wakeup.clear()
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - self._clock())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+            except asyncio.TimeoutError:
+                pass
+            for key in self.pop_expired():
+                self.expired += 1
+                try:
+                    await self._on_expire(key)
+                except Exception as e:
+                    logger.error(f"Error expiring {key}: {e}")
+
+    def start(self) -> None:
+        """Run the scheduler as a background task on the current event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self) -> None:
+        self._running = False
+        self._wakeup.set()
@@ -0,0 +1,14 @@
+import os
+
+
+def fsync_directory(directory: str) -> None:
+    """
+    Flush a directory's entries to disk, so files just created or renamed
+    in it survive a crash. A no-op where directories can't be opened (Windows).
+    """
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,112 @@
+import asyncio
+from http import HTTPStatus
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from src.utils.logger import logger
+
+# (method, path, headers with lower-case names, body) -> (status, content type, body)
+Handler = Callable[[str, str, Dict[str, str], bytes], Awaitable[Tuple[int, str, bytes]]]
+
+MAX_HEADER_BYTES = 16 * 1024
+
+
+class HttpServer:
+    """
+    Minimal HTTP/1.1 server on asyncio streams for local endpoints.
+
+    Enough for Telegram's webhook deliveries and a scrape endpoint:
+    Content-Length bodies, keep-alive, one handler per exact path. Meant
+    to sit behind a TLS-terminating proxy, not to face the internet alone.
+    """
+
+    def __init__(self, routes: Dict[str, Handler], max_body: int = 16 * 1024 * 1024):
+        self.routes = routes
+        self.max_body = max_body
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def port(self) -> Optional[int]:
+        """Bound port (useful when started on port 0)"""
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(
+            self._serve, host, port, limit=MAX_HEADER_BYTES
+        )
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                keep_alive = await self._respond(head, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Read one request body, run its handler and write the response."""
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            self._write(writer, HTTPStatus.BAD_REQUEST, "text/plain", b"", False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        keep_alive = (headers.get("connection", "").lower() != "close") and version == "HTTP/1.1"
+
+        if "chunked" in headers.get("transfer-encoding", ""):
+            self._write(writer, HTTPStatus.LENGTH_REQUIRED, "text/plain", b"", False)
+            return False
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            length = -1
+        if length < 0 or length > self.max_body:
+            self._write(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "text/plain", b"", False)
+            return False
+        body = await reader.readexactly(length) if length else b""
+
+        self.requests += 1
+        handler = self.routes.get(target.split("?", 1)[0])
+        if handler is None:
+            status, content_type, payload = HTTPStatus.NOT_FOUND, "text/plain", b""
+        else:
+            try:
+                status, content_type, payload = await handler(method, target, headers, body)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error handling {method} {target}: {e}")
+                status, content_type, payload = HTTPStatus.INTERNAL_SERVER_ERROR, "text/plain", b""
+        self._write(writer, status, content_type, payload, keep_alive)
+        return keep_alive
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes, keep_alive: bool) -> None:
+        status = HTTPStatus(status)
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
@@ -1,50 +1,217 @@
+import atexit
+import json
 import logging
-import sys
-from datetime import datetime
 import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Dict, Optional
+
+# Logging settings are read here rather than in src.config.settings so the
+# logger can be imported before (and without) the bot configuration.
+LOG_DIR = os.getenv('LOG_DIR', 'logs')
+LOG_FILE = os.path.join(LOG_DIR, 'tictactoe_bot.log')
+# File records as JSON lines ('1') or plain text ('0')
+LOG_JSON = os.getenv('LOG_JSON', '1') == '1'
+# Rotated files kept (one per day)
+LOG_BACKUP_DAYS = int(os.getenv('LOG_BACKUP_DAYS', '14'))
+# Records waiting for the writer thread; beyond this they are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Keep 1 in N INFO/DEBUG records per event type, e.g. "click=10,webapp=10"
+LOG_SAMPLE = os.getenv('LOG_SAMPLE', 'click=10,webapp=10')
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listeners: Dict[str, QueueListener] = {}
+
 
-def setup_logger() -> logging.Logger:
+class BotLogger(logging.Logger):
     """
-    Configure and return the application logger.
-    
-    Returns:
-        logging.Logger: Configured logger instance
+    The bot's logger. No format used here shows the caller, so it skips
+    the stack walk that finds it for every record; other loggers in the
+    process are left as they are.
     """
-    # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
 
-    # Create logger
-    logger = logging.getLogger('TicTacToeBot')
-    logger.setLevel(logging.INFO)
+    def findCaller(self, stack_info=False, stacklevel=1):
+        return "(unknown file)", 0, "(unknown function)", None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, message and any extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in N records of each sampled event type (extra={"event": ...}).
+
+    Only INFO and below are sampled; warnings and errors always pass. Kept
+    records carry "sample": N so counts can be scaled back up.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self._seen: Dict[str, int] = dict.fromkeys(rates, 0)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        rate = self.rates.get(event) if event is not None else None
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        seen = self._seen[event]
+        self._seen[event] = seen + 1
+        if seen % rate:
+            return False
+        record.sample = rate
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a QueueListener thread without formatting them.
+
+    The default QueueHandler formats in the calling thread so records can
+    be pickled; here the listener is in the same process, so message
+    formatting happens on the writer thread instead of the event loop. When
+    the writer falls behind, records are dropped rather than blocking.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(spec: str) -> Dict[str, int]:
+    """Parse "click=10,webapp=5" into {"click": 10, "webapp": 5}."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        if int(rate) > 1:
+            rates[event.strip()] = int(rate)
+    return rates
 
-    # Create formatters
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def _file_handler(path: str, json_records: bool) -> logging.Handler:
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    handler = TimedRotatingFileHandler(
+        path, when='midnight', backupCount=LOG_BACKUP_DAYS, encoding='utf-8', delay=True
     )
-    console_formatter = logging.Formatter(
-        '%(levelname)s: %(message)s'
+    handler.setFormatter(
+        JsonFormatter() if json_records
+        else logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     )
+    return handler
 
-    # File handler (with daily rotation)
-    current_date = datetime.now().strftime('%Y-%m-%d')
-    file_handler = logging.FileHandler(
-        f'logs/tictactoe_bot_{current_date}.log',
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(file_formatter)
 
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(console_formatter)
+def setup_logger(
+    name: str = 'TicTacToeBot',
+    log_file: Optional[str] = LOG_FILE,
+    json_records: bool = LOG_JSON,
+    sample: str = LOG_SAMPLE,
+    console: bool = True,
+) -> logging.Logger:
+    """
+    Configure and return the application logger.
+
+    Records go through a bounded queue to a listener thread that writes
+    the rotating log file and the console, so a log call on the event loop
+    never waits for I/O. Pass arguments %-style (logger.info("... %s", x))
+    to leave formatting to that thread, and tag high-volume records with
+    extra={"event": ...} so they can be sampled.
+
+    Returns:
+        logging.Logger: Configured logger instance
+    """
+    logger_class = logging.getLoggerClass()
+    logging.setLoggerClass(BotLogger)
+    try:
+        logger = logging.getLogger(name)
+    finally:
+        logging.setLoggerClass(logger_class)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    handlers = []
+    if log_file:
+        handlers.append(_file_handler(log_file, json_records))
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
+        handlers.append(console_handler)
 
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    rates = parse_sample_rates(sample)
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
 
+    previous = _listeners.pop(name, None)
+    if previous is not None:
+        _stop_listener(previous)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
     return logger
 
+
+def set_log_file(path: str, name: str = 'TicTacToeBot') -> None:
+    """Write name's log to path from now on (e.g. one file per worker process)."""
+    listener = _listeners[name]
+    listener.stop()
+    handlers = []
+    for handler in listener.handlers:
+        if isinstance(handler, logging.FileHandler):
+            json_records = isinstance(handler.formatter, JsonFormatter)
+            handler.close()
+            handler = _file_handler(path, json_records)
+        handlers.append(handler)
+    listener.handlers = tuple(handlers)
+    listener.start()
+
+
+def _stop_listener(listener: QueueListener) -> None:
+    """Flush queued records and close the listener's handlers."""
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+@atexit.register
+def _flush_logs() -> None:
+    for listener in _listeners.values():
+        _stop_listener(listener)
+    _listeners.clear()
+
+
 # Create and export logger instance
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
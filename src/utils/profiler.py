@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from src.utils.logger import logger
+
+# One capture at a time per process
+_capturing = threading.Lock()
+_active: Optional["SamplingProfiler"] = None
+
+
+def _stack(frame) -> str:
+    """Collapse a frame's stack to "file:function;..." from the outermost call."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler for one thread.
+
+    A background thread wakes every interval seconds and records the target
+    thread's current stack. Nothing is hooked into the profiled code, so the
+    cost is one stack walk per sample: at the default 100 Hz it is well
+    under 1% of a core and safe to run against a live bot.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.01):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+
+    def run(self, seconds: float) -> Counter:
+        """Sample for seconds (blocking) and return stack -> sample count."""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.stacks[_stack(frame)] += 1
+            self.samples += 1
+            del frame
+            if self.stopped.wait(self.interval):
+                break
+        return self.stacks
+
+
+def top_functions(stacks: Counter, count: int = 10) -> List[Tuple[str, int]]:
+    """Functions with the most samples at the top of the stack (self time)."""
+    leaves: Counter = Counter()
+    for stack, samples in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += samples
+    return leaves.most_common(count)
+
+
+def capture_profile(
+    seconds: float, directory: str, thread_id: int, interval: float = 0.01
+) -> Optional[Tuple[str, SamplingProfiler]]:
+    """
+    Profile thread_id for seconds and write the samples to directory.
+
+    The file holds one "stack count" line per distinct stack (the folded
+    format flamegraph.pl and speedscope read). Blocks the calling thread;
+    run it in an executor. Returns None if a capture is already running.
+
+    Returns:
+        (path, profiler) of the finished capture
+    """
+    global _active
+    if not _capturing.acquire(blocking=False):
+        return None
+    try:
+        profiler = _active = SamplingProfiler(thread_id, interval)
+        profiler.run(seconds)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, samples in profiler.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+        logger.info(f"Wrote CPU profile ({profiler.samples} samples) to {path}")
+        return path, profiler
+    finally:
+        _active = None
+        _capturing.release()
+
+
+def stop_capture() -> None:
+    """End a running capture early; it still writes what it sampled."""
+    profiler = _active
+    if profiler is not None:
+        profiler.stopped.set()
@@ -0,0 +1,61 @@
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class Trace:
+    """
+    Stage timings for one update.
+
+    Spans add their duration to a per-stage total, so a stage that runs
+    twice (two sends, say) is reported once with its combined time. Spans
+    nest: an outer stage's time includes its inner stages.
+    """
+    __slots__ = ("name", "started", "stages", "ended")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.ended: Optional[float] = None
+
+    def add(self, stage: str, seconds: float) -> None:
+        if self.ended is None:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def finish(self) -> float:
+        """Close the trace; later spans (e.g. from tasks it spawned) are ignored."""
+        self.ended = time.perf_counter()
+        return self.ended - self.started
+
+    def summary(self) -> Dict[str, float]:
+        """Stage durations in milliseconds, slowest first"""
+        return {
+            stage: round(seconds * 1000, 3)
+            for stage, seconds in sorted(self.stages.items(), key=lambda item: -item[1])
+        }
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+class span:
+    """
+    Time a stage of the current update: `with span("render"): ...`
+
+    Without a current trace this costs one context variable read.
+    """
+    __slots__ = ("stage", "trace", "started")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> "span":
+        self.trace = current_trace.get()
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.trace is not None:
+            self.trace.add(self.stage, time.perf_counter() - self.started)
@@ -0,0 +1,7 @@
+import os
+
+# Settings are read at import time; give the tests a token and keep them
+# from writing the replay archive or binding the metrics port.
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("REPLAY_ARCHIVE_PATH", "")
+os.environ.setdefault("METRICS_PORT", "0")
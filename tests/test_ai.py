@@ -0,0 +1,34 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.games.logic import ai
+from src.games.logic.bitboard import Bitboard
+
+
+def _cells(*cells) -> int:
+    return sum(1 << cell for cell in cells)
+
+
+def test_search_takes_an_immediate_win_over_blocking():
+    # Both players have three in a row; the player to move finishes theirs
+    result = ai.Searcher(ai.TranspositionTable(1000)).search(_cells(0, 1, 2), _cells(8, 9, 10), budget_ms=200)
+    assert (result.src, result.dst) == (None, 3)
+    assert result.score >= ai.MATE_THRESHOLD
+
+
+def test_search_blocks_an_immediate_loss_when_moving():
+    # All pieces are down; O threatens the top row, X must move a piece into it
+    mover, other = _cells(5, 10, 12, 15), _cells(0, 1, 2, 14)
+    result = ai.Searcher(ai.TranspositionTable(1000)).search(mover, other, budget_ms=200)
+    assert result.dst == 3 and result.src in (5, 10, 12, 15)
+
+
+def test_choose_move_blocks_in_the_search_pool():
+    game = SimpleNamespace(board=Bitboard(x=_cells(0, 1, 2), o=_cells(5, 10)), current_player="O")
+    ai.configure_pool(1, 1000)
+    try:
+        result = asyncio.run(ai.choose_move(game, budget_ms=200))
+    finally:
+        ai.shutdown_pool()
+    assert (result.src, result.dst) == (None, 3)
+    assert ai.search_stats.searches >= 1
@@ -0,0 +1,75 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from src.bot.broadcast import Broadcaster
+from src.games.models.game_state import GameState
+
+
+async def _send_message(chat_id, text):
+    raise AssertionError("only the outbox sends")
+
+
+class _Outbox:
+    """Keeps (spectator, decoded message) for each enqueued send instead of sending."""
+
+    def __init__(self):
+        self.bot = SimpleNamespace(send_message=_send_message)
+        self.sent = []
+
+    def enqueue(self, chat_id, call, priority, key=None):
+        self.sent.append((chat_id, json.loads(call.args[1])))
+
+
+def _game() -> GameState:
+    game = GameState(chat_id=-1, game_id=7)
+    game.player_x, game.player_o = 10, 20
+    game.phase = "placement"
+    return game
+
+
+def test_states_published_between_fan_outs_are_coalesced():
+    outbox = _Outbox()
+    broadcaster = Broadcaster(outbox, interval=1.0)
+    game = _game()
+    assert broadcaster.watch(game, 1) and broadcaster.watch(game, 2)
+    assert [(user_id, message["version"]) for user_id, message in outbox.sent] == [(1, 0), (2, 0)]
+
+    outbox.sent.clear()
+    for cell in (0, 4, 1):
+        game.handle_webapp_move(game.current_player_id(), cell)
+        game.advance_turn()
+        broadcaster.publish(game)
+    asyncio.run(broadcaster.stop())
+    assert sorted((user_id, message["version"]) for user_id, message in outbox.sent) == [(1, 3), (2, 3)]
+    assert broadcaster.broadcasts == 1
+
+    # Nothing new to send
+    outbox.sent.clear()
+    broadcaster.publish(game)
+    asyncio.run(broadcaster.stop())
+    assert outbox.sent == [] and broadcaster.broadcasts == 1
+
+
+def test_a_full_game_turns_spectators_away():
+    broadcaster = Broadcaster(_Outbox(), max_spectators=2)
+    game = _game()
+    assert broadcaster.watch(game, 1) and broadcaster.watch(game, 2)
+    assert not broadcaster.watch(game, 3)
+    assert broadcaster.watch(game, 2)  # already watching
+    assert broadcaster.unwatch(1) is not None
+    assert broadcaster.watch(game, 3)
+    assert len(broadcaster) == 2 and broadcaster.watching(1) is None
+
+
+def test_ending_a_game_sends_the_result_and_unsubscribes():
+    outbox = _Outbox()
+    broadcaster = Broadcaster(outbox)
+    game = _game()
+    broadcaster.watch(game, 1)
+    outbox.sent.clear()
+    game.winner = "X"
+    broadcaster.end(game)
+    asyncio.run(broadcaster.stop())
+    assert len(broadcaster) == 0
+    assert [message["final"]["winner"] for _, message in outbox.sent] == ["X"]
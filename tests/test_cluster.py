@@ -0,0 +1,100 @@
+import asyncio
+import pickle
+import queue
+from types import SimpleNamespace
+
+from src.bot.broadcast import Broadcaster
+from src.cluster.link import ClusterLink, RemoteStats
+from src.cluster.ring import HashRing, SeatIndex, command_name
+from src.cluster.worker import adopt, hand_off
+from src.games.stats import GameResult
+from src.games.store import InMemoryGameStore
+from src.games.tournament import Tournaments
+
+
+def test_ring_moves_about_a_share_of_keys_when_a_worker_joins():
+    before, after = HashRing([0, 1, 2]), HashRing([0, 1, 2, 3])
+    moved = [key for key in range(-10_000, 0) if before.node_for(key) != after.node_for(key)]
+    assert all(after.node_for(key) == 3 for key in moved)
+    assert 1500 < len(moved) < 3500
+
+
+def test_command_name():
+    def name(text):
+        return command_name({"message": {"text": text}})
+
+    assert [name(text) for text in ("/queue", "/Leave@SomeBot now", "/", "queue")] == ["queue", "leave", None, None]
+    assert command_name({"callback_query": {"data": "queue"}}) is None
+
+
+def test_seat_index_follows_reports_and_handoffs():
+    seats = SeatIndex()
+    seats.reset(1, [(10, "waiting"), (11, "placement")])
+    seats.update(2, [(12, "movement")])
+    seats.update(1, [(10, None), (12, None)])  # 12 is seated on worker 2, not 1
+    assert (seats.get(10), seats.get(12)) == (None, (2, "movement"))
+    assert seats.move(11, 2) == "placement" and seats.move(99, 2) is None
+    assert sorted(seats.seated_on(2)) == [(11, "placement"), (12, "movement")]
+    seats.reset(2, [])
+    assert len(seats) == 0
+
+
+def test_other_workers_send_results_and_ask_for_ratings():
+    outbox = queue.Queue()
+    link = ClusterLink(2, outbox)
+    RemoteStats(link).record(GameResult(-1, 10, 11, 4))
+    assert outbox.get_nowait() == ("result", 2, GameResult(-1, 10, 11, 4))
+
+    async def run():
+        asking = asyncio.ensure_future(link.ratings([10, 11]))
+        await asyncio.sleep(0)
+        kind, index, (request_id, user_ids) = outbox.get_nowait()
+        assert (kind, index, user_ids) == ("ratings", 2, [10, 11])
+        link.answer(request_id, {10: 1216.0})
+        return await asking
+
+    assert asyncio.run(run()) == {10: 1216.0}
+
+
+async def _send_message(chat_id, text):
+    raise AssertionError("only the outbox sends")
+
+
+class _Outbox:
+    def __init__(self):
+        self.bot = SimpleNamespace(send_message=_send_message)
+        self.sent = []
+
+    def enqueue(self, chat_id, call, priority, key=None):
+        self.sent.append(chat_id)
+
+
+def _worker_data() -> SimpleNamespace:
+    return SimpleNamespace(bot_data={
+        "store": InMemoryGameStore(), "tournaments": Tournaments(), "broadcaster": Broadcaster(_Outbox()),
+    })
+
+
+def test_tournaments_and_spectators_move_with_their_chat():
+    ring = HashRing([0, 1])
+    chat_id = next(key for key in range(-1, -1000, -1) if ring.node_for(key) == 1)
+    old, new = _worker_data(), _worker_data()
+    tournament = old.bot_data["tournaments"].open(chat_id, 10)
+    tournament.entrants.update({10: "A", 11: "B"})
+    tournament.begin(lambda user_id: 0.0)
+    game = old.bot_data["store"].create(chat_id, 10, "A")
+    old.bot_data["store"].join(game, 11, "B")
+    old.bot_data["tournaments"].track(tournament, game.game_id, 1)
+    old.bot_data["broadcaster"].watch(game, 99)
+
+    records, tournaments = hand_off(old, ring, 0)
+    assert len(records) == 1 and len(old.bot_data["tournaments"]) == 0
+    assert len(old.bot_data["broadcaster"]) == 0
+    # Handoffs cross a process boundary
+    adopt(new, *pickle.loads(pickle.dumps((records, tournaments))))
+    moved = new.bot_data["tournaments"]
+    assert moved.get(chat_id).entrants == {10: "A", 11: "B"}
+    assert moved.finish(game.game_id) == (moved.get(chat_id), 1)
+    # The spectator is sent the state again by the new owner
+    assert new.bot_data["broadcaster"].watching(99) == game.game_id
+    assert new.bot_data["broadcaster"].outbox.sent == [99]
@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.bot.handlers.error_handlers import create_timeout_scheduler, timeout_handler
+from src.config.settings import GAME_TIMEOUT_SECONDS, MESSAGES
+from src.games.store import InMemoryGameStore
+from src.utils.deadlines import DeadlineScheduler
+
+
+async def _never(key):
+    raise AssertionError(f"{key} expired")
+
+
+def test_activity_pushes_a_deadline_back():
+    deadlines = {"a": 10.0, "b": 20.0}
+    scheduler = DeadlineScheduler(deadlines.get, _never, clock=lambda: 0.0)
+    for key in deadlines:
+        scheduler.schedule(key)
+    deadlines["a"] = 25.0  # activity since it was scheduled
+    assert scheduler.pop_expired(now=12.0) == []
+    assert scheduler.next_deadline() == 20.0 and len(scheduler) == 2
+    assert scheduler.pop_expired(now=24.0) == ["b"]
+    assert scheduler.pop_expired(now=25.0) == ["a"]
+    assert len(scheduler) == 0
+
+
+def test_an_earlier_deadline_supersedes_the_queued_one():
+    deadlines = {"a": 30.0}
+    scheduler = DeadlineScheduler(deadlines.get, _never, clock=lambda: 0.0)
+    scheduler.schedule("a")
+    deadlines["a"] = 5.0
+    scheduler.schedule("a")
+    assert scheduler.next_deadline() == 5.0
+    assert scheduler.pop_expired(now=6.0) == ["a"]
+    assert scheduler.pop_expired(now=31.0) == []  # the stale entry is discarded
+
+
+def test_removed_games_are_skipped():
+    deadlines = {"a": 1.0, "b": 2.0}
+    scheduler = DeadlineScheduler(deadlines.get, _never, clock=lambda: 0.0)
+    for key in deadlines:
+        scheduler.schedule(key)
+    del deadlines["a"]  # game over: there's no deadline to read any more
+    assert scheduler.pop_expired(now=3.0) == ["b"]
+
+
+def test_run_expires_at_the_deadline_not_before():
+    expired = []
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        deadlines = {}
+
+        async def on_expire(key):
+            expired.append((key, loop.time() - deadlines[key]))
+
+        scheduler = DeadlineScheduler(deadlines.get, on_expire, clock=loop.time)
+        scheduler.start()
+        deadlines["a"] = loop.time() + 0.05
+        scheduler.schedule("a")
+        await asyncio.sleep(0.02)
+        deadlines["a"] = loop.time() + 0.05  # re-armed by activity
+        await asyncio.sleep(0.1)
+        scheduler.stop()
+
+    asyncio.run(run())
+    assert len(expired) == 1
+    assert expired[0][0] == "a" and expired[0][1] >= 0
+
+
+class _Outbox:
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def test_a_game_nobody_joins_expires_without_a_result():
+    store = InMemoryGameStore()
+    application = SimpleNamespace(bot_data={
+        "store": store, "outbox": _Outbox(), "broadcaster": SimpleNamespace(end=lambda game, timed_out: None),
+    })
+    game = store.create(-1, 10, "X")
+    scheduler = create_timeout_scheduler(application)
+    scheduler.schedule(game.game_id)
+    assert scheduler.next_deadline() == game.last_action_time + GAME_TIMEOUT_SECONDS
+
+    asyncio.run(timeout_handler(application, game.game_id))
+    assert store.get(game.game_id) is None
+    assert application.bot_data["outbox"].sent == [(-1, MESSAGES['waiting_expired'])]
@@ -0,0 +1,117 @@
+import pytest
+
+from src.games.logic.bitboard import (
+    BOARD_CELLS, WIN_MASKS, Bitboard, iter_cells, mask_to_positions, winning_mask, winning_mask_through,
+)
+from src.games.models.game_state import GameState
+from src.games.tournament import Bracket, seed_order
+
+
+def test_win_masks_are_rows_columns_diagonals_and_squares():
+    assert len(WIN_MASKS) == 19
+    assert len(set(WIN_MASKS)) == 19
+    assert all(bin(mask).count("1") == 4 for mask in WIN_MASKS)
+    assert 0x000F in WIN_MASKS and 0x1111 in WIN_MASKS  # top row, left column
+    assert 0x8421 in WIN_MASKS and 0x1248 in WIN_MASKS  # both diagonals
+    assert 0x0033 in WIN_MASKS and 0xCC00 in WIN_MASKS  # corner squares
+    assert mask_to_positions(0x8421) == [(0, 0), (1, 1), (2, 2), (3, 3)]
+
+
+@pytest.mark.parametrize("mask", WIN_MASKS)
+def test_every_win_mask_is_found_through_each_of_its_cells(mask):
+    assert winning_mask(mask) == mask
+    for cell in iter_cells(mask):
+        assert winning_mask_through(mask, cell) == mask
+        assert winning_mask(mask & ~(1 << cell)) is None
+
+
+def test_find_win_reports_the_owner():
+    board = Bitboard(o=0x0660)
+    assert board.find_win() == ("O", 0x0660)
+    assert Bitboard(x=0x0007, o=0x0070).find_win() == (None, None)
+
+
+def test_place_and_move():
+    board = Bitboard()
+    assert board.place("X", 5)
+    assert not board.place("O", 5)  # occupied
+    assert board.owns("X", 5) and board.is_empty(6)
+    assert board.move("X", 5, 6)
+    assert board.is_empty(5) and board.owns("X", 6)
+    assert not board.move("O", 6, 7)  # not O's piece
+    assert not board.move("X", 6, 6)  # target occupied
+    assert board.to_string() == "      X         "
+
+
+@pytest.mark.parametrize("cell", [-1, BOARD_CELLS, 99])
+def test_cells_off_the_board_are_refused(cell):
+    board = Bitboard(x=1)
+    assert not board.place("X", cell)
+    assert not board.move("X", 0, cell)
+    assert not board.move("X", cell, 1)
+    assert board == Bitboard(x=1)
+
+
+def _game() -> GameState:
+    game = GameState(chat_id=-1, game_id=1)
+    game.player_x, game.player_o = 10, 20
+    game.phase = "placement"
+    return game
+
+
+def test_placement_then_movement():
+    game = _game()
+    for x_cell, o_cell in ((0, 4), (2, 6), (8, 12), (11, 15)):
+        assert game.handle_webapp_move(10, x_cell)
+        game.advance_turn()
+        assert not game.handle_webapp_move(10, 3)  # not X's turn
+        assert game.handle_webapp_move(20, o_cell)
+        game.advance_turn()
+    assert game.phase == "movement" and game.current_player == "X"
+    assert game.version == 8
+
+    assert not game.handle_webapp_move(10, 1)  # a movement needs a source
+    assert not game.handle_webapp_move(10, 1, selected=4)  # O's piece
+    assert game.handle_webapp_move(10, 1, selected=11)
+    assert game.board.owns("X", 1) and game.board.is_empty(11)
+    assert game.winner is None
+
+
+def test_winning_move_sets_winner_and_pattern():
+    game = _game()
+    for x_cell, o_cell in ((0, 8), (1, 9), (4, 14)):
+        game.handle_webapp_move(10, x_cell)
+        game.advance_turn()
+        game.handle_webapp_move(20, o_cell)
+        game.advance_turn()
+    assert game.handle_webapp_move(10, 5)
+    assert game.winner == "X"
+    assert sorted(game.winning_pattern) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+
+
+def test_seed_order_keeps_the_top_seeds_apart():
+    assert seed_order(2) == [1, 2]
+    assert seed_order(8) == [1, 8, 4, 5, 2, 7, 3, 6]
+    assert all(a + b == 9 for a, b in zip(seed_order(8)[::2], seed_order(8)[1::2]))
+
+
+def test_bracket_with_byes_plays_to_a_champion():
+    bracket = Bracket([101, 102, 103, 104, 105])  # 8 slots: seeds 1-3 get byes
+    assert (bracket.size, bracket.rounds) == (8, 3)
+    assert bracket.ready == [5, 3]
+    assert bracket.players(5) == (104, 105)  # the only first-round game
+    assert bracket.players(3) == (102, 103)  # seeds 2 and 3 went through on byes
+    assert (bracket.left(1), bracket.left(2)) == (1, 2)
+
+    with pytest.raises(ValueError):
+        bracket.report(5, 101)  # not in that match
+    assert bracket.report(5, 105) == 2  # now seed 1 knows their opponent
+    assert bracket.players(2) == (101, 105)
+    assert bracket.report(3, 103) is None  # the final still waits for node 2
+    with pytest.raises(ValueError):
+        bracket.report(3, 103)  # already decided
+    assert bracket.report(2, 101) == 1
+    assert bracket.report(1, 103) is None
+    assert bracket.champion == 103
+    assert bracket.remaining == 1
+    assert [bracket.left(round_) for round_ in (1, 2, 3)] == [0, 0, 0]
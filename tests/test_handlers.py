@@ -0,0 +1,115 @@
+import asyncio
+import json
+from collections import Counter
+
+from telegram import Update
+
+from src.bot.application import create_application, drain_updates
+from src.cluster.fake import FakeUpdateSource, LoadHarness, OfflineRequest
+from src.config.settings import MESSAGES
+from src.games.store import get_store
+
+
+async def _with_application(request: OfflineRequest, body, concurrent_updates: int = 16):
+    """Run body(application) against a started offline Application, then shut it down."""
+    application = create_application(request, updater=False, concurrent_updates=concurrent_updates)
+    await application.initialize()
+    try:
+        await application.post_init(application)
+        await application.start()
+        result = await body(application)
+        await drain_updates(application)
+        return result
+    finally:
+        if application.running:
+            await application.stop()
+        await application.post_stop(application)
+        await application.shutdown()
+        await application.post_shutdown(application)
+
+
+def test_load_harness_smoke_run():
+    request = OfflineRequest(seed=3)
+
+    async def body(application):
+        harness = LoadHarness(application, max_moves=60, timeout=10, seed=3)
+        await asyncio.gather(*(harness.play_chat(n, buttons=n % 2 == 0) for n in range(8)))
+        return harness, application.bot_data["stats"].results
+
+    harness, results = asyncio.run(_with_application(request, body))
+    assert harness.timeouts == 0
+    assert harness.finished > 0
+    assert results == harness.finished
+    assert len(harness.latencies["click"]) > 0 and len(harness.latencies["webapp"]) > 0
+    assert request.calls["answerCallbackQuery"] == len(harness.latencies["click"]) + 4  # plus the button joins
+
+
+def test_fake_update_source_games_are_played_out():
+    source = FakeUpdateSource(12, seed=5)
+    updates = list(source.updates())
+    moves = Counter(
+        update["message"]["chat"]["id"] for update in updates
+        if json.loads(update["message"]["web_app_data"]["data"])["action"] == "move"
+    )
+
+    async def body(application):
+        for data in updates:
+            await application.update_queue.put(Update.de_json(data, application.bot))
+        await drain_updates(application)
+        store = get_store(application)
+        return {chat_id: store.in_chat(chat_id) for chat_id in moves}, application.bot_data["stats"].results
+
+    games, results = asyncio.run(_with_application(OfflineRequest(), body))
+    finished = [chat_id for chat_id, in_chat in games.items() if not in_chat]
+    assert results == len(finished) > 0
+    for chat_id, in_chat in games.items():
+        if in_chat:
+            # O joining and every move of an unfinished game were applied, in order
+            assert [game.version for game in in_chat] == [1 + moves[chat_id]]
+
+
+def test_clicks_on_old_or_off_board_cells_are_answered_as_stale():
+    request = OfflineRequest(record=True)
+    player = {"id": 501, "is_bot": False, "first_name": "X"}
+    rival = {"id": 502, "is_bot": False, "first_name": "O"}
+
+    async def body(application):
+        harness = LoadHarness(application, timeout=10)
+        await harness.send("start", harness.command(-9, player, "/start"))
+        await harness.send("join", harness.web_app(-9, player, '{"action":"join"}'))
+        await harness.send("join", harness.click(-9, rival, "join_game", 1))
+        game = get_store(application).for_player(player["id"])
+        tag = f"{game.game_id:x}.{game.version:x}"
+        await harness.send("click", harness.click(-9, player, f"{tag}.0", 1))
+        version = game.version  # one past the version of tag
+        await harness.send("click", harness.click(-9, rival, f"{tag}.1", 1))  # drawn before X moved
+        await harness.send("click", harness.click(-9, rival, f"{game.game_id:x}.{game.version:x}.10", 1))
+        await harness.send("click", harness.click(-9, rival, "9,9", 1))
+        return game, version
+
+    game, version = asyncio.run(_with_application(request, body))
+    assert game.version == version == 2 and game.board.owns("X", 0)
+    answers = [params.get("text") for _, method, params in request.recorded if method == "answerCallbackQuery"]
+    assert answers[-3:] == [MESSAGES["stale_board"]] * 3
+
+
+def test_players_matched_across_chats_both_get_the_webapp_button():
+    request = OfflineRequest(record=True)
+    host = {"id": 601, "is_bot": False, "first_name": "Host"}
+    guest = {"id": 602, "is_bot": False, "first_name": "Guest"}
+
+    async def body(application):
+        harness = LoadHarness(application, timeout=10)
+        await harness.send("queue", harness.command(-21, host, "/queue"))
+        await harness.send("queue", harness.command(-22, guest, "/queue"))
+        return get_store(application).for_player(guest["id"])
+
+    game = asyncio.run(_with_application(request, body))
+    assert (game.chat_id, game.players["X"], game.players["O"]) == (-21, 601, 602)
+    buttons = {
+        params["chat_id"]: params["reply_markup"]["inline_keyboard"][0][0]
+        for _, method, params in request.recorded
+        if method == "sendMessage" and "reply_markup" in params
+    }
+    assert set(buttons) == {601, 602}
+    assert all("web_app" in button for button in buttons.values())
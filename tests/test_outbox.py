@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from telegram.error import RetryAfter
+
+from src.bot.outbox import ANIMATION, MESSAGE, MOVE, OutboundScheduler
+
+
+def _scheduler(**kwargs) -> OutboundScheduler:
+    # Rates high enough that only the behaviour under test delays anything
+    options = dict(global_rate=1000.0, chat_rate=1000.0, group_rate=1000.0, chat_burst=1000.0)
+    options.update(kwargs)
+    return OutboundScheduler(bot=None, **options)
+
+
+def _call(log: list, name: str):
+    async def call():
+        log.append(name)
+    return call
+
+
+def test_waiting_edits_coalesce_and_moves_go_first():
+    sent = []
+
+    async def run():
+        outbox = _scheduler()
+        outbox.enqueue(1, _call(sent, "result"), MESSAGE)
+        for frame in range(3):
+            outbox.enqueue(2, _call(sent, f"board {frame}"), MOVE, key=(2, 10))
+        assert outbox.waiting((2, 10))
+        outbox.start()
+        await outbox.stop()
+        return outbox
+
+    outbox = asyncio.run(run())
+    assert sent == ["board 2", "result"]
+    assert (outbox.enqueued, outbox.coalesced, outbox.sent) == (4, 2, 2)
+    assert not outbox.waiting((2, 10))
+
+
+def test_animation_frames_are_dropped_when_the_queue_is_full():
+    outbox = _scheduler(max_queue=2)
+    sent = []
+    outbox.enqueue(1, _call(sent, "a"), MESSAGE, key="a")
+    outbox.enqueue(2, _call(sent, "b"), MESSAGE)
+    outbox.enqueue(3, _call(sent, "frame"), ANIMATION)
+    outbox.enqueue(1, _call(sent, "a2"), ANIMATION, key="a")  # merges, so it's kept
+    outbox.enqueue(4, _call(sent, "message"), MESSAGE)  # only cosmetic jobs are dropped
+    assert (outbox.dropped, outbox.coalesced, len(outbox)) == (1, 1, 3)
+
+
+def test_429_pauses_the_chat_and_requeues_the_job():
+    sent = []
+    attempts = []
+
+    async def limited():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RetryAfter(0.05)
+        sent.append("limited")
+
+    async def run():
+        outbox = _scheduler()
+        outbox.enqueue(1, limited, MOVE)
+        outbox.enqueue(2, _call(sent, "other chat"), MESSAGE)
+        outbox.start()
+        await outbox.stop()
+        return outbox
+
+    outbox = asyncio.run(run())
+    # The other chat isn't held up by the paused one
+    assert sent == ["other chat", "limited"]
+    assert attempts[1] - attempts[0] >= 0.05
+    assert (outbox.retried, outbox.sent, outbox.failed) == (1, 2, 0)
+
+
+def test_per_chat_rate_is_respected():
+    times = []
+
+    async def call():
+        times.append(time.monotonic())
+
+    async def run():
+        outbox = _scheduler(chat_rate=50.0, chat_burst=1.0)
+        for _ in range(3):
+            outbox.enqueue(7, call)
+        outbox.start()
+        await outbox.stop()
+
+    asyncio.run(run())
+    assert len(times) == 3
+    assert times[2] - times[0] >= 2 / 50 * 0.9
@@ -0,0 +1,70 @@
+import os
+
+from src.games.replays.archive import DATA_FILE, TIME_INDEX, ReplayArchive, ReplayWriter
+from src.games.replays.format import HEADER, Replay, decode_replay, encode_replay, play_moves
+from src.games.store.codec import encode_move
+
+
+def _replay(game_id: int, ended: int, moves=(0, 4, 1, 5)) -> Replay:
+    return Replay(game_id, -game_id, 100 + game_id, 200 + game_id, ended - 60, ended,
+                  "X", False, game_id % 2 == 0, bytes(encode_move(cell) for cell in moves))
+
+
+def _writer(directory) -> ReplayWriter:
+    # Flushing is driven by the tests, not the background thread
+    return ReplayWriter(str(directory), flush_interval=3600, segment_records=4, fsync=False)
+
+
+def test_replay_round_trip():
+    replays = [_replay(1, 1_000), _replay(2, 2_000, moves=()), Replay(3, 0, 1, 2, 5, 9, None, True, False, b"\x12"),
+               Replay(4, 0, 1, 2, 5, 9, "O", False, False, bytes(70_000))]
+    buffer = b"".join(encode_replay(replay) for replay in replays)
+    offset = 0
+    for replay in replays:
+        decoded, offset = decode_replay(buffer, offset)
+        assert decoded == replay
+    assert offset == len(buffer)
+    assert play_moves(replays[0].moves) == (0b0011, 0b0011_0000)
+
+
+def test_archive_lookups(tmp_path):
+    writer = _writer(tmp_path)
+    for game_id in range(1, 11):
+        assert writer.append(_replay(game_id, game_id * 100)) == game_id - 1
+    writer.close()
+
+    archive = ReplayArchive(str(tmp_path))
+    try:
+        assert len(archive) == 10 and archive[3].game_id == 4
+        assert [replay.game_id for replay in archive.between(250, 550)] == [3, 4, 5]
+        # Records 0-7 are in segments, 8 and 9 are not yet
+        assert [replay.game_id for replay in archive.by_user(103)] == [3]
+        assert [replay.game_id for replay in archive.by_user(210)] == [10]
+    finally:
+        archive.close()
+
+
+def test_torn_tails_are_trimmed_on_open(tmp_path):
+    writer = _writer(tmp_path)
+    for game_id in range(1, 4):
+        writer.append(_replay(game_id, game_id * 100))
+    writer.close()
+    data_path = os.path.join(tmp_path, DATA_FILE)
+    index_path = os.path.join(tmp_path, TIME_INDEX)
+    size = os.path.getsize(data_path)
+
+    # A crash after writing part of the next record and half an index entry
+    with open(data_path, "ab") as f:
+        f.write(encode_replay(_replay(4, 400))[:HEADER.size + 1])
+    with open(index_path, "ab") as f:
+        f.write(b"\x00" * 5)
+
+    writer = _writer(tmp_path)
+    assert writer.records == 3 and os.path.getsize(data_path) == size
+    writer.append(_replay(5, 500))
+    writer.close()
+    archive = ReplayArchive(str(tmp_path))
+    try:
+        assert [replay.game_id for replay in archive] == [1, 2, 3, 5]
+    finally:
+        archive.close()
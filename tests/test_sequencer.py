@@ -0,0 +1,87 @@
+import asyncio
+
+from src.bot.sequencer import ChatSequencer
+
+
+def test_updates_for_one_key_run_in_order_and_keys_run_side_by_side():
+    running = {}
+    overlap = []
+    order = []
+
+    async def handle(key: str, n: int):
+        running[key] = running.get(key, 0) + 1
+        overlap.append(dict(running))
+        await asyncio.sleep(0.001 * (5 - n))  # earlier updates take longer
+        order.append((key, n))
+        running[key] -= 1
+
+    async def run():
+        sequencer = ChatSequencer(16, key=lambda update: update[0])
+        await asyncio.gather(*(
+            sequencer.process_update((key, n), handle(key, n))
+            for n in range(5) for key in ("a", "b")
+        ))
+        await sequencer.drain()
+        return sequencer
+
+    sequencer = asyncio.run(run())
+    assert [n for key, n in order if key == "a"] == list(range(5))
+    assert [n for key, n in order if key == "b"] == list(range(5))
+    assert all(count <= 1 for state in overlap for count in state.values())
+    assert any(state.get("a") and state.get("b") for state in overlap)
+    assert sequencer.deferred == 8 and len(sequencer) == 0
+
+
+def test_unkeyed_updates_are_not_sequenced():
+    async def run():
+        sequencer = ChatSequencer(4, key=lambda update: None)
+        started = []
+
+        async def handle(n):
+            started.append(n)
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(sequencer.process_update(n, handle(n)) for n in range(3)))
+        return sequencer
+
+    assert asyncio.run(run()).deferred == 0
+
+
+def test_a_full_mailbox_drops_updates():
+    ran = []
+
+    async def run():
+        sequencer = ChatSequencer(16, key=lambda update: "game", mailbox_limit=2)
+        gate = asyncio.Event()
+
+        async def handle(n):
+            if n == 0:
+                await gate.wait()
+            ran.append(n)
+
+        tasks = [asyncio.ensure_future(sequencer.process_update(n, handle(n))) for n in range(5)]
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.gather(*tasks)
+        return sequencer
+
+    sequencer = asyncio.run(run())
+    assert ran == [0, 1, 2]
+    assert (sequencer.deferred, sequencer.dropped) == (2, 2)
+
+
+def test_a_failing_update_does_not_strand_its_mailbox():
+    ran = []
+
+    async def handle(n):
+        if n == 0:
+            raise RuntimeError("boom")
+        ran.append(n)
+
+    async def run():
+        sequencer = ChatSequencer(4, key=lambda update: "chat")
+        await asyncio.gather(*(sequencer.process_update(n, handle(n)) for n in range(3)))
+        await asyncio.wait_for(sequencer.drain(), 1)
+
+    asyncio.run(run())
+    assert ran == [1, 2]
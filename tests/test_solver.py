@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from src.games.logic.bitboard import SYMMETRIES, transform, winning_mask
+from src.games.logic.solution_table import (
+    LAYER_OFFSETS, LOSS, TABLE_ENTRIES, WIN, Evaluation, SolutionTable, layer_size, table_index,
+)
+from src.games.logic.solver import solve, write_table
+
+
+def _cells(*cells) -> int:
+    return sum(1 << cell for cell in cells)
+
+
+@pytest.fixture(scope="module")
+def solved(tmp_path_factory):
+    """The whole game solved once (about half a minute on one core)."""
+    entries = solve(workers=1, log=lambda message: None)
+    path = tmp_path_factory.mktemp("solution") / "table.bin"
+    write_table(entries, str(path))
+    table = SolutionTable(str(path))
+    yield entries, table, path
+    table.close()
+
+
+def test_table_index_numbers_a_layer_without_gaps():
+    offset = LAYER_OFFSETS[(1, 1, "X")]
+    indexes = {table_index(1 << x, 1 << o, "X") for x in range(16) for o in range(16) if x != o}
+    assert indexes == set(range(offset, offset + layer_size(1, 1)))
+    assert table_index(_cells(0, 1), 0, "X") is None  # X can't have two pieces before O has one
+
+
+def test_written_table_reads_back(solved):
+    entries, table, _ = solved
+    assert len(entries) == TABLE_ENTRIES
+    for index in random.Random(1).sample(range(TABLE_ENTRIES), 1000):
+        assert table._entry(index) == entries[index]
+
+
+def test_truncated_table_is_refused(solved, tmp_path):
+    _, _, path = solved
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(path.read_bytes()[:-2])
+    with pytest.raises(ValueError, match="truncated"):
+        SolutionTable(str(truncated))
+
+
+def test_known_positions(solved):
+    _, table, _ = solved
+    # O completed the top row with its last move: X to move has lost
+    x = _cells(4, 6, 9, 15)
+    assert winning_mask(x) is None
+    assert table.probe(x, _cells(0, 1, 2, 3), "X") == Evaluation(LOSS, 0)
+    # X places its fourth piece to finish the top row
+    assert table.probe(_cells(0, 1, 2), _cells(8, 10, 13), "X") == Evaluation(WIN, 1)
+    # All pieces down: X slides its fourth piece into the top row
+    o = _cells(5, 7, 12, 14)
+    assert winning_mask(o) is None
+    assert table.probe(_cells(0, 1, 2, 8), o, "X") == Evaluation(WIN, 1)
+
+
+def test_symmetric_positions_have_the_same_value(solved):
+    _, table, _ = solved
+    rng = random.Random(2)
+    for _ in range(200):
+        cells = rng.sample(range(16), 8)
+        x, o = _cells(*cells[:4]), _cells(*cells[4:])
+        player = rng.choice("XO")
+        expected = table.probe(x, o, player)
+        for symmetry in range(len(SYMMETRIES)):
+            assert table.probe(transform(x, symmetry), transform(o, symmetry), player) == expected
@@ -0,0 +1,150 @@
+import os
+
+import pytest
+
+from src.games.models.game_state import GameState
+from src.games.store import InMemoryGameStore, JournaledGameStore, base
+from src.games.store.base import WORKER_BITS, new_game_id, set_worker_index
+from src.games.store.journal import _JOURNAL_HEADER, _generations, _path, load_games
+
+
+def _open(directory) -> JournaledGameStore:
+    # Flushing and rotation are driven by the tests, not the background thread
+    return JournaledGameStore(str(directory), flush_interval=3600, fsync=False)
+
+
+def _play(store, chat_id: int, moves) -> object:
+    game = store.create(chat_id, chat_id * 10, "X player")
+    store.join(game, chat_id * 10 + 1, "O player")
+    for position in moves:
+        assert store.play(game, game.current_player_id(), position)
+    return game
+
+
+def _state(game) -> tuple:
+    return (game.game_id, game.chat_id, game.phase, game.current_player, game.board.x, game.board.o,
+            game.players["X"], game.players["O"], game.version, list(game.moves))
+
+
+def test_games_survive_a_restart(tmp_path):
+    store = _open(tmp_path)
+    played = _play(store, -1, [0, 5, 10])
+    waiting = store.create(-2, 99, "Waiting")
+    removed = _play(store, -3, [1])
+    store.remove(removed.game_id)
+    expected = sorted(_state(game) for game in store)
+    store.close()
+
+    reopened = _open(tmp_path)
+    try:
+        assert sorted(_state(game) for game in reopened) == expected
+        assert reopened.for_player(played.players["O"]).game_id == played.game_id
+        assert reopened.open_game(-2).game_id == waiting.game_id
+        assert reopened.get(removed.game_id) is None
+        # New games don't reuse the ids of recovered ones
+        assert reopened.create(-4, 7, "New").game_id not in {played.game_id, waiting.game_id, removed.game_id}
+    finally:
+        reopened.close()
+
+
+def test_rotation_compacts_into_a_snapshot(tmp_path):
+    store = _open(tmp_path)
+    _play(store, -1, [0, 5])
+    store.flush()
+    store.rotate()
+    _play(store, -2, [3])
+    store.close()
+    snapshots, journals = _generations(str(tmp_path))
+    assert len(snapshots) == 1 and min(journals) >= snapshots[0]
+
+    games, _ = load_games(str(tmp_path))
+    assert sorted(game.chat_id for game in games.values()) == [-2, -1]
+
+
+def test_long_games_survive_a_restart(tmp_path):
+    store = _open(tmp_path)
+    game = _play(store, -1, [0, 5])
+    # Past what a 16-bit move count or record length can hold
+    game.moves.extend(bytes(70_000))
+    store.put(game)
+    store.close()
+    games, _ = load_games(str(tmp_path))
+    assert len(games[game.game_id].moves) == 70_002
+
+
+def test_torn_tail_is_ignored(tmp_path):
+    store = _open(tmp_path)
+    game = _play(store, -1, [0, 5])
+    store.flush()
+    path = store._journal.name
+    size = os.path.getsize(path)
+    store.play(game, game.current_player_id(), 10)
+    store.close()
+
+    # The last record was only half written when the process died
+    with open(path, "r+b") as f:
+        f.truncate(size + (os.path.getsize(path) - size) // 2)
+    games, _ = load_games(str(tmp_path))
+    assert list(games[game.game_id].moves) == list(game.moves)[:2]
+
+
+def test_journal_from_another_format_is_refused(tmp_path):
+    store = _open(tmp_path)
+    _play(store, -1, [0])
+    store.close()
+    _, journals = _generations(str(tmp_path))
+    path = _path(str(tmp_path), "journal", journals[-1])
+    with open(path, "r+b") as f:
+        f.write(_JOURNAL_HEADER.pack(b"T4GJOURN", 4))
+
+    with pytest.raises(ValueError, match="not a version"):
+        _open(tmp_path)
+    assert os.path.exists(path)
+
+
+def test_unreadable_snapshot_is_refused_and_kept(tmp_path):
+    store = _open(tmp_path)
+    _play(store, -1, [0])
+    store.close()
+    _open(tmp_path).close()  # compacts everything into one snapshot
+    snapshots, _ = _generations(str(tmp_path))
+    path = _path(str(tmp_path), "snapshot", snapshots[-1])
+    with open(path, "r+b") as f:
+        f.write(b"garbage!")
+
+    with pytest.raises(ValueError, match="refusing to start"):
+        _open(tmp_path)
+    assert os.path.exists(path)
+
+
+def test_indexes_follow_the_games():
+    store = InMemoryGameStore()
+    first = store.create(-1, 1, "A")
+    second = store.create(-1, 2, "B")
+    assert store.open_game(-1).game_id == first.game_id
+    assert store.open_game(-1, user_id=1).game_id == second.game_id  # not your own game
+    store.join(first, 3, "C")
+    assert store.for_player(3) is first
+    assert [game.game_id for game in store.in_chat(-1)] == [first.game_id, second.game_id]
+    store.remove(first.game_id)
+    assert store.for_player(1) is None and store.for_player(3) is None
+    assert store.in_chat(-1) == [second]
+
+
+def test_an_id_belongs_to_one_game():
+    store = InMemoryGameStore()
+    game = store.create(-1, 1, "A")
+    stranger = GameState(-2, game.game_id)
+    with pytest.raises(ValueError, match="already belongs"):
+        store.put(stranger)
+    assert store.get(game.game_id) is game
+    store.put(game)  # putting the same game again is fine
+    assert store.in_chat(-1) == [game] and store.in_chat(-2) == []
+
+
+def test_ids_carry_the_worker_index(monkeypatch):
+    monkeypatch.setattr(base, "_worker", 0)
+    set_worker_index(3)
+    assert new_game_id() % (1 << WORKER_BITS) == 3
+    with pytest.raises(ValueError):
+        set_worker_index(1 << WORKER_BITS)
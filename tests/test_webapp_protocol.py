@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from src.bot.webapp_protocol import ProtocolError, WebAppAction, encode_compact_move, parse_webapp_data
+
+
+def test_json_messages_are_validated():
+    assert parse_webapp_data('{"action": "join"}') == WebAppAction("join")
+    assert parse_webapp_data('{"action": "join", "opponent": "bot"}') == WebAppAction("join", opponent="bot")
+    assert parse_webapp_data('{"action": "move", "position": 5}') == WebAppAction("move", 5)
+    assert parse_webapp_data('{"action": "move", "position": 6, "selected": 2}') == WebAppAction("move", 6, 2)
+    assert parse_webapp_data('{"action": "sync", "extra": 1}') == WebAppAction("sync")
+
+
+@pytest.mark.parametrize("data", [
+    "",
+    "not json",
+    "[]",
+    '{"position": 5}',
+    '{"action": 1}',
+    '{"action": "resign"}',
+    '{"action": "move"}',
+    '{"action": "move", "position": null}',
+    '{"action": "move", "position": 16}',
+    '{"action": "move", "position": -1}',
+    '{"action": "move", "position": "5"}',
+    '{"action": "move", "position": true}',
+    '{"action": "move", "position": 5, "selected": 5.0}',
+    '{"action": "join", "opponent": "human"}',
+    "~",
+    "~x",
+    "~m",
+    "~m1g",
+    "~m100",
+])
+def test_bad_payloads_are_refused(data):
+    with pytest.raises(ProtocolError):
+        parse_webapp_data(data)
+
+
+@pytest.mark.parametrize("compact, full", [
+    ("~j", {"action": "join"}),
+    ("~jb", {"action": "join", "opponent": "bot"}),
+    ("~s", {"action": "sync"}),
+    ("~w", {"action": "watch"}),
+    ("~u", {"action": "unwatch"}),
+])
+def test_compact_messages_match_their_json_form(compact, full):
+    assert parse_webapp_data(compact) == parse_webapp_data(json.dumps(full))
+
+
+def test_compact_moves_round_trip():
+    for position in range(16):
+        assert parse_webapp_data(encode_compact_move(position)) == WebAppAction("move", position)
+        for selected in range(16):
+            if selected != position:
+                message = parse_webapp_data(encode_compact_move(position, selected))
+                assert message == WebAppAction("move", position, selected)
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import main
+from src.bot.application import create_application
+from src.bot.webhook import SECRET_HEADER, serve_webhook
+from src.cluster.fake import FakeUpdateSource, OfflineRequest
+
+
+async def _serve(request: OfflineRequest, **kwargs):
+    """Start serve_webhook on a free port; returns (port, stop event, serving task)."""
+    application = create_application(request, updater=False, concurrent_updates=16)
+    stop = asyncio.Event()
+    ready = asyncio.get_running_loop().create_future()
+    task = asyncio.ensure_future(serve_webhook(
+        application, listen="127.0.0.1", port=0, path="/hook", stop=stop, ready=ready, **kwargs
+    ))
+    port = await asyncio.wait_for(ready, 10)
+    return port, stop, task
+
+
+def test_recorded_batch_is_processed():
+    updates = list(FakeUpdateSource(5, seed=1).updates())
+    request = OfflineRequest()
+
+    async def run():
+        port, stop, task = await _serve(request, url="", secret_token="s3cret")
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            refused = await client.post("/hook", json=updates)
+            accepted = await client.post("/hook", json=updates, headers={SECRET_HEADER: "s3cret"})
+            malformed = await client.post("/hook", content=b"[{", headers={SECRET_HEADER: "s3cret"})
+        stop.set()
+        return refused, accepted, malformed, await task
+
+    refused, accepted, malformed, ingress = asyncio.run(run())
+    assert refused.status_code == 403
+    assert accepted.status_code == 200
+    assert malformed.status_code == 400
+    assert (ingress.batches, ingress.updates, ingress.rejected) == (1, len(updates), 2)
+    # Every join and move was handled and answered with a state message
+    assert request.calls.get("sendMessage", 0) > 0
+
+
+def test_secret_is_generated_when_the_url_is_public():
+    request = OfflineRequest(record=True)
+
+    async def run():
+        port, stop, task = await _serve(request, url="https://bot.example", secret_token="")
+        registered = [params for _, method, params in request.recorded if method == "setWebhook"]
+        update = next(FakeUpdateSource(1).updates())
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            anonymous = await client.post("/hook", json=update)
+            signed = await client.post(
+                "/hook", json=update, headers={SECRET_HEADER: registered[0]["secret_token"]}
+            )
+        stop.set()
+        await task
+        return registered, anonymous, signed
+
+    registered, anonymous, signed = asyncio.run(run())
+    assert len(registered) == 1
+    assert registered[0]["url"] == "https://bot.example/hook"
+    assert len(registered[0]["secret_token"]) >= 32
+    assert anonymous.status_code == 403
+    assert signed.status_code == 200
+
+
+def test_webhook_is_refused_with_worker_processes(monkeypatch):
+    monkeypatch.setattr(main, "BOT_WORKERS", 2)
+    monkeypatch.setattr(main, "WEBHOOK_URL", "https://bot.example.com")
+    with pytest.raises(ValueError, match="BOT_WORKERS"):
+        main.main()